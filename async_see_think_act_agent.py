@@ -0,0 +1,376 @@
+"""
+asyncio-native See-Think-Act Agent
+Same loop as SeeThinkActAgent with awaitable phases, so several agents (and
+other I/O such as metrics or uploads) can share one event loop and one
+connection pool to the Ollama server
+"""
+import asyncio
+import json
+import time
+from typing import Optional, Dict, Any, List
+
+from see_think_act_agent import SeeThinkActAgent
+from utils.ollama_client import AsyncOllamaVisionClient
+from utils.model_router import STRONG
+from utils.speculation import Speculation
+from utils.planner import parse_plan, parse_point
+from utils.trajectory_store import TrajectoryReplayer
+
+
+class AsyncSeeThinkActAgent(SeeThinkActAgent):
+    """
+    See-Think-Act Agent driven by asyncio
+    
+    - see(): capture and change detection run in a worker thread
+    - think(): awaits the model through AsyncOllamaVisionClient
+    - act(): input synthesis and the post-action settle run in a worker thread
+    
+    Cancelling the task awaiting run() aborts an in-flight model request and
+    still flushes screenshots and closes the session recording.
+    """
+    
+    ollama_client_class = AsyncOllamaVisionClient
+    
+    def __init__(self, *args, think_timeout: Optional[float] = None, **kwargs):
+        """
+        Initialize the agent
+        
+        Args:
+            *args, **kwargs: Same as SeeThinkActAgent
+            think_timeout: Deadline for one model call (seconds); None leaves
+                only the HTTP read timeout (config.OLLAMA_TIMEOUT)
+        """
+        super().__init__(*args, **kwargs)
+        for client in self._model_clients():
+            client.request_timeout = think_timeout
+    
+    async def see(self):
+        """
+        Capture the current screen
+        
+        Returns:
+            Captured Frame
+        """
+        return await asyncio.to_thread(self._capture_current_state)
+    
+    async def think(self, task: str, screenshot, note: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Send screenshot to model and get decision
+        
+        Args:
+            task: The user's task
+            screenshot: Frame (or PIL Image) of current screen
+            note: Optional extra context appended to the prompt
+        
+        Returns:
+            Response from the model
+        """
+        self.logger.info("Thinking and deciding next action...")
+        
+        # Prompt, history and cache key (hashing the screenshot) off the loop
+        request, cache_key = await asyncio.to_thread(self._prepare_request, task, screenshot, note)
+        
+        # Identical task, prompt and screen: reuse the earlier decision
+        start = time.perf_counter()
+        response = self._cached_response(cache_key)
+        if response is not None:
+            self._discard_speculation('cached')
+            self._record_inference(response, time.perf_counter() - start, cached=True)
+            return response
+        
+        try:
+            tier, client = self._select_model()
+            speculated = await self._await_speculation(client)
+            if speculated is not None:
+                response, wall_time = speculated
+            else:
+                start = time.perf_counter()
+                response = await client.chat_with_image(**request)
+                wall_time = time.perf_counter() - start
+            self._record_inference(response, wall_time, tier=tier, client=client)
+            
+            # Unusable or unsure fast-tier answer: ask the large model instead
+            if self._needs_escalation(tier, client, response):
+                start = time.perf_counter()
+                response = await self.ollama_client.chat_with_image(**request)
+                self._record_inference(response, time.perf_counter() - start, tier=STRONG)
+            
+            self._store_response(cache_key, response)
+            return response
+        
+        except asyncio.TimeoutError:
+            self.logger.error(f"Model inference exceeded {self.ollama_client.request_timeout}s")
+            raise
+        except Exception as e:
+            self.logger.error(f"Error in model inference: {e}")
+            raise
+    
+    async def plan_step(self, task: str, screenshot) -> Dict[str, Any]:
+        """
+        Decide the next action in planner mode (see SeeThinkActAgent._plan_step)
+        
+        Args:
+            task: The user's task
+            screenshot: Frame (or PIL Image) of current screen
+        
+        Returns:
+            Response with the step's tool call
+        """
+        note = self._verify_planned_step()
+        for _ in range(2):
+            if note is not None or self.plan is None or self.plan.finished:
+                if not self._may_plan(note):
+                    break
+                request = await asyncio.to_thread(self._plan_request, task, screenshot, note)
+                start = time.perf_counter()
+                response = await self.ollama_client.chat_with_image(**request)
+                self._record_inference(response, time.perf_counter() - start, purpose='plan')
+                self._set_plan(parse_plan(response))
+                note = None
+                if self.plan.finished:
+                    break
+            
+            goal = self.plan.current
+            if not goal.needs_grounding:
+                return self._planned_response(goal)
+            
+            coordinate = await asyncio.to_thread(self._cached_location, goal, screenshot)
+            if coordinate is None:
+                request = await asyncio.to_thread(self._grounding_request, goal, screenshot)
+                start = time.perf_counter()
+                response = await self.grounding_client.chat_with_image(**request)
+                self._record_inference(response, time.perf_counter() - start,
+                                       client=self.grounding_client, purpose='grounding')
+                coordinate = parse_point(response)
+                if coordinate is not None:
+                    await asyncio.to_thread(self._remember_element, goal, screenshot, coordinate)
+            if coordinate is not None:
+                return self._planned_response(goal, coordinate)
+            note = self._replan_note('target_not_found', f"'{goal.target}' was not found on the screen.")
+        
+        self.planner_counts['fallback_steps'] += 1
+        return await self.think(task, screenshot, note=self._unchanged_screen_note())
+    
+    async def _start_speculation(self, task: str, screenshot, response: Dict[str, Any]) -> None:
+        """Request the step after response's actions as a task running alongside act()"""
+        prepared = await asyncio.to_thread(self._speculation_request, task, screenshot, response)
+        if prepared is None:
+            return
+        actions, client, request = prepared
+        handle = asyncio.create_task(self._timed_chat(client, request))
+        loop = asyncio.get_running_loop()
+        # Discards may come from worker threads (e.g. _record_step)
+        self.speculator.begin(Speculation(actions, client, handle, lambda: loop.call_soon_threadsafe(handle.cancel)))
+    
+    @staticmethod
+    async def _timed_chat(client: AsyncOllamaVisionClient, request: Dict[str, Any]):
+        start = time.perf_counter()
+        response = await client.chat_with_image(**request)
+        return response, time.perf_counter() - start
+    
+    async def _await_speculation(self, client: AsyncOllamaVisionClient):
+        """
+        Wait for the pending prediction and commit it if it still applies
+        
+        Args:
+            client: Model client chosen for this step
+        
+        Returns:
+            Tuple of (response, wall time of the call), or None
+        """
+        speculation = self._check_speculation(client)
+        if speculation is None:
+            return None
+        needed_at = time.perf_counter()
+        try:
+            response, wall_time = await speculation.handle
+        except Exception as e:
+            self.logger.warning(f"Speculative request failed: {e}")
+            self._discard_speculation('error')
+            return None
+        return self._commit_speculation(response, wall_time, needed_at)
+    
+    async def act(self, response: Dict[str, Any]) -> bool:
+        """
+        Execute the action from the model's response
+        
+        Args:
+            response: Response from the model
+        
+        Returns:
+            True if action was successful, False otherwise
+        """
+        return await asyncio.to_thread(self._execute_action, response)
+    
+    async def settle(self, timeout: float, require_change: bool = False):
+        """
+        Wait (without blocking the loop) for the UI to settle
+        
+        Args:
+            timeout: Upper bound on the wait (seconds)
+            require_change: Only count as settled after something changed
+        
+        Returns:
+            SettleResult
+        """
+        return await asyncio.to_thread(self._wait_for_settle, timeout, require_change)
+    
+    async def warm_up(self, keep_alive=None) -> Dict[str, Any]:
+        """
+        Load the model before the first task
+        
+        Args:
+            keep_alive: How long the server keeps the model loaded
+                (default: config.OLLAMA_KEEP_ALIVE)
+        
+        Returns:
+            Load timing from AsyncOllamaVisionClient.warm_up (summed over
+            both models when routing)
+        """
+        reports = {}
+        for client in self._model_clients():
+            if client.model in reports:
+                continue
+            self.logger.info(f"Warming up model {client.model}...")
+            reports[client.model] = await client.warm_up(keep_alive)
+        return self._log_load(reports)
+    
+    async def run_batch(self, tasks: List[str]) -> List[Dict[str, Any]]:
+        """
+        Run several tasks with the model pinned in memory
+        
+        Args:
+            tasks: Tasks to run in order
+        
+        Returns:
+            One run() result per task
+        """
+        clients = self._model_clients()
+        keep_alive = self.ollama_client.keep_alive
+        for client in clients:
+            client.keep_alive = -1
+        try:
+            try:
+                await self.warm_up(-1)
+            except Exception as e:
+                self.logger.warning(f"Model warm-up failed: {e}")
+            return [await self.run(task) for task in tasks]
+        finally:
+            for client in clients:
+                client.keep_alive = keep_alive
+                try:
+                    await client.warm_up(keep_alive)
+                except Exception as e:
+                    self.logger.warning(f"Could not restore keep_alive of {client.model}: {e}")
+    
+    async def run(self, task: str) -> Dict[str, Any]:
+        """
+        Run the agent to complete the given task
+        
+        Args:
+            task: The task to complete
+        
+        Returns:
+            Dictionary with results including success status and message
+        """
+        if self.warm_up_model and self.load_time is None:
+            try:
+                await self.warm_up()
+            except Exception as e:
+                self.logger.warning(f"Model warm-up failed: {e}")
+        
+        start_time = await asyncio.to_thread(self._start_task, task)
+        
+        try:
+            while self.iteration_count < self.max_iterations and not self.task_completed:
+                self._begin_iteration()
+                
+                # Step 1: SEE - Capture screenshot
+                screenshot = await self.see()
+                
+                # Skip the model call while a requested wait has no visible effect yet
+                if self._should_skip_model_call():
+                    await self.settle(self.iteration_delay, require_change=True)
+                    continue
+                
+                # Replay the recorded trajectory while the screen still matches it
+                decision, response = await asyncio.to_thread(self._replay_step, screenshot)
+                if decision == TrajectoryReplayer.WAIT:
+                    await self.settle(self.post_action_delay + self.iteration_delay, require_change=True)
+                    continue
+                
+                # Step 2: THINK - Analyze and decide (unless the step was replayed)
+                if response is None and self.planner_mode:
+                    response = await self.plan_step(task, screenshot)
+                elif response is None:
+                    response = await self.think(task, screenshot, note=self._unchanged_screen_note())
+                
+                # Predict the following step while this one executes
+                if self.speculator is not None:
+                    await self._start_speculation(task, screenshot, response)
+                
+                # Step 3: ACT - Execute action
+                success = await self.act(response)
+                
+                # Remember the step for the next requests
+                await asyncio.to_thread(self._record_step, response, success)
+                
+                if not success:
+                    self.logger.warning("Action execution failed, but continuing...")
+                
+                # Give the UI a chance to settle if the action did not wait for it
+                if self.settled_frame is None and not self.task_completed:
+                    await self.settle(self.iteration_delay)
+            
+            # Task completion
+            return self._task_result(start_time)
+        
+        except asyncio.CancelledError:
+            self.logger.info("\nTask cancelled")
+            raise
+        
+        except Exception as e:
+            self.logger.error(f"Error during task execution: {e}", exc_info=True)
+            return self._failure_result('error', f'Error: {str(e)}', start_time)
+        
+        finally:
+            # Runs in a thread; shielded so cleanup completes even when cancelled
+            await asyncio.shield(asyncio.to_thread(self._finish_task))
+
+
+async def main():
+    """Example usage of the async agent"""
+    agent = AsyncSeeThinkActAgent(
+        model="qwen3-vl:235b-cloud",
+        max_iterations=30,
+        save_screenshots=True,
+        think_timeout=120
+    )
+    
+    # Test connection
+    if not await agent.ollama_client.test_connection():
+        print("\n⚠️  WARNING: Could not connect to Ollama or model not found")
+        print("Make sure Ollama is running and the model is pulled:")
+        print("  ollama run qwen3-vl:235b-cloud")
+        return
+    
+    # Example task (more agents can be awaited together with asyncio.gather)
+    task = "Open Notepad and type 'Hello from AI Agent!'"
+    
+    print(f"\nTask: {task}")
+    print("Starting agent... (Press Ctrl+C to stop)\n")
+    
+    result = await agent.run(task)
+    
+    # Print results
+    print("\n" + "=" * 80)
+    print("FINAL RESULT:")
+    print(json.dumps(result, indent=2))
+    print("=" * 80)
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        print("\nTask interrupted by user")
@@ -10,9 +10,42 @@ Customize these settings to adjust agent behavior
 # Ollama model to use
 MODEL_NAME = "qwen3-vl:235b-cloud"
 
+# Small, fast vision model for routine steps (None = MODEL_NAME for every step)
+# Steps escalate to MODEL_NAME after a failed action, an unchanged screen,
+# an unparseable response or a low self-reported confidence
+FAST_MODEL_NAME = None  # e.g. "qwen3-vl:8b"
+
+# Fast-model responses stating a lower confidence (0-1) are re-asked on MODEL_NAME
+ROUTER_CONFIDENCE_THRESHOLD = 0.6
+
+# Steps kept on MODEL_NAME after a failed or ineffective action
+ROUTER_ESCALATION_STEPS = 1
+
 # Ollama server URL (default: local)
 OLLAMA_BASE_URL = "http://localhost:11434"
 
+# Read/write timeout per model request (seconds)
+OLLAMA_TIMEOUT = 300
+
+# TCP connect timeout (seconds)
+OLLAMA_CONNECT_TIMEOUT = 10
+
+# Pooled HTTP connections to the Ollama server (shared by all agents in the process)
+OLLAMA_MAX_CONNECTIONS = 10
+
+# Seconds an idle pooled connection is kept open
+OLLAMA_KEEPALIVE_EXPIRY = 300
+
+# How long Ollama keeps the model loaded after a request ("30m", seconds, -1 = forever)
+# run_batch() pins the model (-1) for the whole batch and restores this afterwards
+OLLAMA_KEEP_ALIVE = "30m"
+
+# Load the model before the first task, so load time is not counted as step latency
+WARM_UP_MODEL = True
+
+# Stream responses and stop generation as soon as a complete tool call arrives
+STREAM_RESPONSES = True
+
 # ============================================================================
 # AGENT BEHAVIOR
 # ============================================================================
@@ -20,12 +53,76 @@ OLLAMA_BASE_URL = "http://localhost:11434"
 # Maximum number of actions before stopping
 MAX_ITERATIONS = 30
 
-# Time to wait between iterations (seconds)
+# Maximum extra time to wait between iterations (seconds)
+# The agent moves on as soon as the screen has settled
 ITERATION_DELAY = 0.5
 
-# Time to wait after each action for UI to update (seconds)
+# Maximum time to wait after each action for UI to update (seconds)
+# The agent moves on as soon as the screen has settled
 POST_ACTION_DELAY = 1.0
 
+# Time the screen must stay unchanged to count as settled (seconds)
+SETTLE_STABLE_TIME = 0.3
+
+# Interval between captures while waiting for the screen to settle (seconds)
+SETTLE_POLL_INTERVAL = 0.05
+
+# Most tool calls executed from a single model response (run in order)
+MAX_BATCH_ACTIONS = 5
+
+# Let the model attach postconditions ("expect": screen_changed,
+# region_changed, pixel_color) to the actions of a response; they are checked
+# locally on the settled frame and the model is only asked again when one
+# fails or the chunk ends
+ACTION_ASSERTIONS = False
+
+# Abort a batch when an action that should change the screen (typing) had no visible effect
+VERIFY_BATCH_STEPS = True
+
+# Ask the model for the next action while the current one executes; the
+# prediction is used only if the screen afterwards still matches it
+SPECULATIVE_STEPS = False
+
+# Largest fraction of the screen that may change for a prediction to still be used
+SPECULATION_MAX_CHANGE = 0.35
+
+# Planner/executor mode: one call to MODEL_NAME lists the sub-goals of the
+# task, each step then only asks where its target is on a downscaled
+# screenshot (keyboard and wait steps need no model call at all)
+PLANNER_MODE = False
+
+# Pixel budget of the screenshots sent with grounding calls
+GROUNDING_MAX_PIXELS = 1024 * 576
+
+# Planner calls allowed per task after the first one; further steps then
+# use the full per-step prompt
+MAX_REPLANS = 3
+
+# Remember the screen patch around every grounded click that worked and find
+# the same element again by template matching before asking the model
+# (grounding calls in planner mode)
+CACHE_ELEMENTS = False
+
+# Lowest normalized cross-correlation (0-1) accepted as a cached element match
+ELEMENT_MATCH_THRESHOLD = 0.9
+
+# sqlite file keeping element patches across runs (None = in-memory only)
+ELEMENT_CACHE_DB_PATH = None
+
+# Previous steps described to the model as text (action and outcome);
+# older steps are folded into a one-line summary
+CONTEXT_TEXT_STEPS = 8
+
+# Previous steps whose screenshots are sent again (0 = current screen only)
+CONTEXT_IMAGE_STEPS = 1
+
+# Estimated token budget per request (prompt, history and images)
+CONTEXT_TOKEN_BUDGET = 16000
+
+# Steps kept in memory; older ones are appended to history_*.jsonl
+# in the screenshot directory
+HISTORY_SIZE = 50
+
 # ============================================================================
 # SCREENSHOT SETTINGS
 # ============================================================================
@@ -36,18 +133,49 @@ SAVE_SCREENSHOTS = True
 # Directory to save screenshots
 SCREENSHOT_DIR = "agent_screenshots"
 
-# Screenshot format (PNG, JPEG)
+# How screenshots are stored:
+#   "session" - one delta-compressed recording per task (utils/session_recorder.py)
+#   "files"   - one image file per iteration
+SCREENSHOT_STORAGE = "session"
+
+# Full keyframe every N recorded frames (session storage)
+SESSION_KEYFRAME_INTERVAL = 10
+
+# Background threads writing screenshots to disk
+SCREENSHOT_WRITER_WORKERS = 1
+
+# Maximum screenshots waiting to be written
+SCREENSHOT_QUEUE_SIZE = 8
+
+# What to do when the write queue is full: "drop", "block" or "thumbnail"
+SCREENSHOT_OVERFLOW_POLICY = "thumbnail"
+
+# Screenshot format sent to the model (PNG, PNG_PALETTE, JPEG, WEBP)
+# Run `python -m utils.image_encoder --budget <bytes>` to pick one for your display
 SCREENSHOT_FORMAT = "PNG"
 
+# PNG compression level (0 = fastest, 9 = smallest)
+PNG_COMPRESS_LEVEL = 1
+
 # Monitor to capture (1 = primary monitor)
 MONITOR_NUMBER = 1
 
+# Capture continuously on a background thread into a ring buffer
+CONTINUOUS_CAPTURE = False
+
+# Background capture rate (frames per second)
+CAPTURE_FPS = 10
+
+# Number of frames kept in the capture ring buffer
+CAPTURE_BUFFER_SIZE = 8
+
 # ============================================================================
 # ACTION EXECUTOR SETTINGS
 # ============================================================================
 
 # Default pause between pyautogui actions (seconds)
-PYAUTOGUI_PAUSE = 0.5
+# Kept short: waiting for the UI is handled by settle detection
+PYAUTOGUI_PAUSE = 0.1
 
 # Enable pyautogui failsafe (move mouse to corner to abort)
 PYAUTOGUI_FAILSAFE = True
@@ -142,7 +270,7 @@ MIN_CONFIDENCE = 0.7
 # Enable multi-monitor support
 MULTI_MONITOR_SUPPORT = False
 
-# Screenshot compression quality (1-100, higher = better quality)
+# Screenshot compression quality for JPEG/WEBP (1-100, higher = better quality)
 SCREENSHOT_QUALITY = 95
 
 # ============================================================================
@@ -187,11 +315,39 @@ VISUALIZATION_COLOR = (0, 255, 0)  # Green
 # Use faster screenshot method (may reduce quality)
 FAST_SCREENSHOT = False
 
-# Compress screenshots before sending to model
+# Downscale screenshots onto the model's patch grid before sending
 COMPRESS_SCREENSHOTS = True
 
-# Maximum screenshot resolution (width, height)
+# Maximum screenshot resolution (width, height); used as a pixel budget,
+# the aspect ratio of the screen is preserved
 MAX_SCREENSHOT_RESOLUTION = (1920, 1080)
 
 # Cache model responses (not recommended for dynamic tasks)
+# Keyed by task, prompt/tools and a perceptual hash of the screenshot
 CACHE_RESPONSES = False
+
+# Responses kept in memory (least recently used are evicted)
+CACHE_MAX_ENTRIES = 256
+
+# Seconds a cached response stays valid (None = forever)
+CACHE_TTL = 3600
+
+# sqlite file shared across processes (None = in-memory cache only)
+CACHE_DB_PATH = None
+
+# Screenshot hash bits that may differ for a cache hit (0 = identical screens only)
+CACHE_MAX_DISTANCE = 0
+
+# Record the actions of successful runs (with a hash of the screen before
+# each step) and replay them for the same task while the screens match;
+# the model takes over at the first divergence
+REPLAY_TRAJECTORIES = False
+
+# sqlite file holding recorded trajectories (None = kept in memory only)
+TRAJECTORY_DB_PATH = None
+
+# Screenshot hash bits that may differ for a recorded step to be replayed
+REPLAY_MAX_DISTANCE = 8
+
+# Settle waits per step before a mismatching screen counts as a divergence
+REPLAY_MAX_WAITS = 2
@@ -5,16 +5,46 @@ Autonomous agent that captures screenshots, analyzes with Qwen3-VL via Ollama, a
 import time
 import json
 import logging
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 from typing import Optional, Dict, Any, List
 from pathlib import Path
 from datetime import datetime
 
-from utils.screenshot_capture import ScreenshotCapture
-from utils.ollama_client import OllamaVisionClient
+import config
+from utils.screenshot_capture import ScreenshotCapture, Frame
+from utils.change_detector import ChangeDetector
+from utils.settle_detector import SettleDetector
+from utils.ollama_client import OllamaVisionClient, RequestCancel
+from utils.image_encoder import get_encoder, encode_thumbnail
+from utils.screenshot_writer import ScreenshotWriter
+from utils.session_recorder import SessionRecorder
+from utils.response_cache import ResponseCache
+from utils.element_cache import ElementCache
+from utils.trajectory_store import TrajectoryStore, TrajectoryStep, TrajectoryReplayer
+from utils.conversation_context import ConversationContext, CHARS_PER_TOKEN
+from utils.inference_metrics import InferenceMetrics
+from utils.model_router import ModelRouter, FAST, STRONG, CONFIDENCE_INSTRUCTION
+from utils.speculation import Speculator, Speculation
+from utils.action_assertions import (
+    Assertion, PostconditionChecker, parse_assertions, EXPECT_PARAMETER, CHUNK_INSTRUCTION
+)
+from utils.planner import Plan, SubGoal, PLANNER_PROMPT, GROUNDING_PROMPT, parse_plan, parse_point
 from utils.action_executor import ActionExecutor
+from utils.action_parser import Action
 from utils.agent_function_call import ComputerUse
 
 
+# Actions that must visibly change the screen before a batch may continue
+BATCH_CHANGE_EXPECTED = ('type',)
+
+# Actions after which the next step is not predicted speculatively
+NOT_SPECULATED = ('terminate', 'answer', 'wait')
+
+# Values of screenshot_storage (see config.SCREENSHOT_STORAGE)
+SCREENSHOT_STORAGES = ('session', 'files')
+
+
 class SeeThinkActAgent:
     """
     Autonomous AI Agent that can See, Think, and Act
@@ -28,7 +58,39 @@ class SeeThinkActAgent:
                  max_iterations: int = 50,
                  save_screenshots: bool = True,
                  screenshot_dir: str = "screenshots",
-                 log_level: str = "INFO"):
+                 log_level: str = "INFO",
+                 detect_screen_changes: bool = True,
+                 max_unchanged_waits: int = 2,
+                 post_action_delay: float = config.POST_ACTION_DELAY,
+                 iteration_delay: float = config.ITERATION_DELAY,
+                 settle_time: float = config.SETTLE_STABLE_TIME,
+                 continuous_capture: bool = config.CONTINUOUS_CAPTURE,
+                 capture_fps: float = config.CAPTURE_FPS,
+                 screenshot_writer_workers: int = config.SCREENSHOT_WRITER_WORKERS,
+                 screenshot_queue_size: int = config.SCREENSHOT_QUEUE_SIZE,
+                 screenshot_overflow: str = config.SCREENSHOT_OVERFLOW_POLICY,
+                 screenshot_storage: str = config.SCREENSHOT_STORAGE,
+                 stream_responses: bool = config.STREAM_RESPONSES,
+                 cache_responses: bool = config.CACHE_RESPONSES,
+                 response_cache: Optional[ResponseCache] = None,
+                 replay_trajectories: bool = config.REPLAY_TRAJECTORIES,
+                 trajectory_store: Optional[TrajectoryStore] = None,
+                 context_steps: int = config.CONTEXT_TEXT_STEPS,
+                 context_images: int = config.CONTEXT_IMAGE_STEPS,
+                 warm_up_model: bool = config.WARM_UP_MODEL,
+                 max_batch_actions: int = config.MAX_BATCH_ACTIONS,
+                 action_assertions: bool = config.ACTION_ASSERTIONS,
+                 verify_batch_steps: bool = config.VERIFY_BATCH_STEPS,
+                 fast_model: Optional[str] = config.FAST_MODEL_NAME,
+                 confidence_threshold: float = config.ROUTER_CONFIDENCE_THRESHOLD,
+                 escalation_steps: int = config.ROUTER_ESCALATION_STEPS,
+                 speculate: bool = config.SPECULATIVE_STEPS,
+                 speculation_max_change: float = config.SPECULATION_MAX_CHANGE,
+                 planner_mode: bool = config.PLANNER_MODE,
+                 grounding_max_pixels: int = config.GROUNDING_MAX_PIXELS,
+                 max_replans: int = config.MAX_REPLANS,
+                 cache_elements: bool = config.CACHE_ELEMENTS,
+                 element_cache: Optional[ElementCache] = None):
         """
         Initialize the See-Think-Act Agent
         
@@ -38,6 +100,62 @@ class SeeThinkActAgent:
             save_screenshots: Whether to save screenshots
             screenshot_dir: Directory to save screenshots
             log_level: Logging level
+            detect_screen_changes: Compare consecutive frames and avoid
+                redundant model calls when the screen did not change
+            max_unchanged_waits: Consecutive model calls skipped while the
+                screen stays unchanged after a 'wait' action
+            post_action_delay: Maximum wait for the UI to settle after an action
+            iteration_delay: Maximum extra wait between iterations
+            settle_time: Time the screen must be unchanged to count as settled
+            continuous_capture: Capture on a background thread during run(),
+                shared by screenshots, settle and change detection
+            capture_fps: Background capture rate
+            screenshot_writer_workers: Threads writing screenshots to disk
+            screenshot_queue_size: Maximum screenshots waiting to be written
+            screenshot_overflow: Policy when the write queue is full
+                ('drop', 'block' or 'thumbnail')
+            screenshot_storage: 'session' for one delta-compressed recording
+                per run, 'files' for one image file per iteration
+            stream_responses: Stream model output and act on the first
+                complete tool call without waiting for the rest
+            cache_responses: Reuse model responses for identical task, prompt
+                and screen (skips inference on a hit)
+            response_cache: Cache instance to use, e.g. one shared by several
+                agents (default: built from config.py when cache_responses)
+            replay_trajectories: Record successful runs and replay their
+                actions without the model while the screens still match
+            trajectory_store: Trajectory store to use, e.g. one shared by
+                several agents (default: built from config.py when
+                replay_trajectories)
+            context_steps: Previous steps described to the model as text
+            context_images: Previous steps whose screenshots are resent
+            warm_up_model: Load the model before the first task; the load
+                time is reported separately from step latency
+            max_batch_actions: Most tool calls executed from one response
+            action_assertions: Let the model attach postconditions to each
+                action of a response, checked locally after the action settles
+            verify_batch_steps: Abort a batch when an action that should
+                change the screen (e.g. typing) had no visible effect
+            fast_model: Small vision model for routine steps; model then
+                only handles escalated steps (None = model for every step)
+            confidence_threshold: Fast-model responses stating a lower
+                confidence are re-asked on model
+            escalation_steps: Steps kept on model after a failed or
+                ineffective action
+            speculate: Ask for the next action while the current one
+                executes; the prediction is used only if the screen afterwards
+                still matches it (needs detect_screen_changes)
+            speculation_max_change: Largest fraction of the screen that may
+                change for a prediction to still be used
+            planner_mode: Plan the task's sub-goals with one call to model and
+                only ask where each step's target is (grounding) per step
+            grounding_max_pixels: Pixel budget of grounding screenshots
+            max_replans: Planner calls per task after the first one; later
+                steps fall back to the full per-step prompt
+            cache_elements: Locate elements clicked before by template
+                matching instead of a grounding call (planner mode)
+            element_cache: Element cache to use, e.g. one shared by several
+                agents (default: built from config.py when cache_elements)
         """
         # Setup logging
         logging.basicConfig(
@@ -48,23 +166,94 @@ class SeeThinkActAgent:
         
         # Initialize components
         self.screenshot_capture = ScreenshotCapture()
-        self.ollama_client = OllamaVisionClient(model=model)
+        self.ollama_client = self._create_ollama_client(model)
+        
+        # Optional fast tier; the router decides which model answers each step
+        self.fast_client = None
+        self.router = None
+        if fast_model:
+            self.fast_client = self._create_ollama_client(fast_model)
+            self.router = ModelRouter(confidence_threshold, escalation_steps)
+        
+        # Speculative next-step requests run on their own thread (started on
+        # first use, stopped by close())
+        self.speculator = Speculator(speculation_max_change) if speculate else None
+        self._speculation_pool = None
+        
+        # Planner mode: grounding calls go to the fast model on a downscaled screenshot
+        self.planner_mode = planner_mode
+        self.max_replans = max_replans
+        self.grounding_client = None
+        if planner_mode:
+            self.grounding_client = self._create_ollama_client(fast_model or model, max_pixels=grounding_max_pixels)
+        if element_cache is None and cache_elements:
+            element_cache = ElementCache(
+                threshold=config.ELEMENT_MATCH_THRESHOLD,
+                db_path=config.ELEMENT_CACHE_DB_PATH
+            )
+        self.element_cache = element_cache
         
         # Get actual screen size
         screen_width, screen_height = self.screenshot_capture.get_screen_size()
         self.action_executor = ActionExecutor(
             screen_width=screen_width,
-            screen_height=screen_height
+            screen_height=screen_height,
+            pause=config.PYAUTOGUI_PAUSE
         )
         
         # Configuration
         self.max_iterations = max_iterations
         self.save_screenshots = save_screenshots
         self.screenshot_dir = Path(screenshot_dir)
+        self.detect_screen_changes = detect_screen_changes
+        self.max_unchanged_waits = max_unchanged_waits
+        self.post_action_delay = post_action_delay
+        self.continuous_capture = continuous_capture
+        self.capture_fps = capture_fps
+        self.iteration_delay = iteration_delay
+        self.stream_responses = stream_responses
+        if response_cache is None and cache_responses:
+            response_cache = ResponseCache(
+                max_entries=config.CACHE_MAX_ENTRIES,
+                ttl=config.CACHE_TTL,
+                db_path=config.CACHE_DB_PATH,
+                max_distance=config.CACHE_MAX_DISTANCE
+            )
+        self.response_cache = response_cache
+        if trajectory_store is None and replay_trajectories:
+            trajectory_store = TrajectoryStore(db_path=config.TRAJECTORY_DB_PATH)
+        self.trajectory_store = trajectory_store
+        self.replayer = None
+        if trajectory_store is not None:
+            self.replayer = TrajectoryReplayer(config.REPLAY_MAX_DISTANCE, config.REPLAY_MAX_WAITS)
+        self.context_steps = context_steps
+        self.context_images = context_images
+        self.warm_up_model = warm_up_model
+        self.max_batch_actions = max_batch_actions
+        self.verify_batch_steps = verify_batch_steps
+        self.postconditions = PostconditionChecker() if action_assertions else None
+        self.load_time = None
+        self.change_detector = ChangeDetector()
+        self.settle_detector = SettleDetector(
+            self.screenshot_capture,
+            detector=self.change_detector,
+            stable_time=settle_time,
+            poll_interval=config.SETTLE_POLL_INTERVAL
+        )
         
         # Create screenshot directory
         if self.save_screenshots:
             self.screenshot_dir.mkdir(exist_ok=True)
+        if screenshot_storage not in SCREENSHOT_STORAGES:
+            raise ValueError(f"Unknown screenshot storage: {screenshot_storage} "
+                             f"(choose from {', '.join(SCREENSHOT_STORAGES)})")
+        self.screenshot_storage = screenshot_storage
+        self.session_recorder = None
+        self.screenshot_writer = ScreenshotWriter(
+            workers=screenshot_writer_workers,
+            max_queue=screenshot_queue_size,
+            overflow=screenshot_overflow
+        )
         
         # Initialize computer use tool
         self.computer_use = ComputerUse(
@@ -78,14 +267,58 @@ class SeeThinkActAgent:
         self.iteration_count = 0
         self.task_completed = False
         self.task_status = None
-        self.conversation_history = []
+        self.context = self._create_context()
+        self.conversation_history = self.context.history
+        self.current_frame = None
+        self.settled_frame = None
+        self.last_change = None
+        self.last_action = None
+        self.last_batch = []
+        self.last_step_failed = False
+        self.failed_assertion = None
+        self.unchanged_streak = 0
+        self.think_time = 0.0
+        self.inference_metrics = InferenceMetrics()
+        self.request_estimate = {'image_tokens': 0, 'text_tokens': 0}
+        self.task = None
+        self.trajectory = []
+        self.plan = None
+        self.dispatched_goal = None
+        self.pending_element = None
+        self.done_goals = []
+        self.planner_counts = Counter()
+        self.replan_reasons = Counter()
         
         self.logger.info(f"Agent initialized with model: {model}")
         self.logger.info(f"Screen size: {screen_width}x{screen_height}")
     
+    # Model client class; AsyncSeeThinkActAgent swaps in the asyncio client
+    ollama_client_class = OllamaVisionClient
+    
+    def _create_ollama_client(self, model: str, max_pixels: Optional[int] = None) -> OllamaVisionClient:
+        """Build the model client from config.py settings (max_pixels overrides the screenshot budget)"""
+        if max_pixels is None and config.COMPRESS_SCREENSHOTS:
+            max_width, max_height = config.MAX_SCREENSHOT_RESOLUTION
+            max_pixels = max_width * max_height
+        return self.ollama_client_class(
+            model=model,
+            max_pixels=max_pixels,
+            encoder=get_encoder(
+                config.SCREENSHOT_FORMAT,
+                quality=config.SCREENSHOT_QUALITY,
+                compress_level=config.PNG_COMPRESS_LEVEL
+            ),
+            host=config.OLLAMA_BASE_URL,
+            timeout=config.OLLAMA_TIMEOUT,
+            connect_timeout=config.OLLAMA_CONNECT_TIMEOUT,
+            max_connections=config.OLLAMA_MAX_CONNECTIONS,
+            keepalive_expiry=config.OLLAMA_KEEPALIVE_EXPIRY,
+            keep_alive=config.OLLAMA_KEEP_ALIVE
+        )
+    
     def _get_system_prompt(self) -> str:
         """Get the system prompt for the agent"""
-        return """You are a helpful AI assistant that can see, think, and act on a Windows 11 computer.
+        prompt = """You are a helpful AI assistant that can see, think, and act on a Windows 11 computer.
 
 Your capabilities:
 1. SEE: You receive screenshots of the current desktop state
@@ -115,94 +348,703 @@ You have access to a 'computer' tool that allows you to:
 - Wait for changes
 - Terminate when done
 """
+        if self.postconditions is not None:
+            prompt += CHUNK_INSTRUCTION
+        if self.router is not None:
+            prompt += CONFIDENCE_INSTRUCTION
+        return prompt
     
     def _prepare_tools(self) -> List[Dict[str, Any]]:
         """Prepare tool definitions for Ollama"""
         # Convert ComputerUse function to Ollama tool format
         computer_function = self.computer_use.function
+        parameters = computer_function["parameters"]
+        if self.postconditions is not None:
+            parameters = dict(parameters, properties=dict(parameters["properties"], expect=EXPECT_PARAMETER))
         
         tool = {
             "type": "function",
             "function": {
                 "name": computer_function["name"],
                 "description": computer_function["description"],
-                "parameters": computer_function["parameters"]
+                "parameters": parameters
             }
         }
         
         return [tool]
     
+    def _create_context(self, spill_path: Optional[Path] = None) -> ConversationContext:
+        """Build the step history sent back to the model"""
+        return ConversationContext(
+            text_steps=self.context_steps,
+            image_steps=self.context_images,
+            token_budget=config.CONTEXT_TOKEN_BUDGET,
+            history_size=config.HISTORY_SIZE,
+            spill_path=spill_path
+        )
+    
     def _save_screenshot(self, image, prefix: str = "screenshot") -> str:
-        """Save screenshot with timestamp"""
+        """
+        Queue a screenshot for writing, reusing the bytes encoded for the model
+        
+        The file is written by the background ScreenshotWriter; run() flushes
+        it before returning.
+        """
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"{prefix}_{self.iteration_count:03d}_{timestamp}.png"
+        extension = self.ollama_client.encoder.extension
+        filename = f"{prefix}_{self.iteration_count:03d}_{timestamp}.{extension}"
         filepath = self.screenshot_dir / filename
-        image.save(filepath)
-        self.logger.info(f"Screenshot saved: {filepath}")
+        to_image = image.to_image if isinstance(image, Frame) else lambda: image
+        self.screenshot_writer.submit(
+            filepath,
+            self.ollama_client.encode_for_model(image),
+            thumbnail=lambda: encode_thumbnail(to_image()),
+            thumbnail_path=filepath.with_name(f"{filepath.stem}_thumb.jpg")
+        )
+        self.logger.debug(f"Screenshot queued: {filepath}")
         return str(filepath)
     
     def _capture_current_state(self):
         """Capture current screenshot"""
-        self.logger.info("Capturing screenshot...")
-        screenshot = self.screenshot_capture.capture_screen()
+        if self.settled_frame is not None:
+            # Reuse the frame the settle wait ended on
+            frame, self.settled_frame = self.settled_frame, None
+        else:
+            self.logger.info("Capturing screenshot...")
+            frame = self.screenshot_capture.capture_frame()
+        
+        if self.detect_screen_changes:
+            self.last_change = self.change_detector.update(frame)
+            self.logger.debug(f"Screen change: {self.last_change}")
+            self.context.mark_outcome(self.last_change.changed)
+        
+        if self.current_frame is not None:
+            self.current_frame.release()
+        self.current_frame = frame
         
         if self.save_screenshots:
-            self._save_screenshot(screenshot)
+            if self.session_recorder is not None:
+                self.session_recorder.record(frame, self.iteration_count)
+            else:
+                self._save_screenshot(frame)
         
-        return screenshot
+        return frame
     
-    def _think_and_decide(self, task: str, screenshot) -> Dict[str, Any]:
+    def _wait_for_settle(self, timeout: float, require_change: bool = False, baseline=None):
+        """
+        Wait until the screen stops changing, bounded by timeout
+        
+        Args:
+            timeout: Maximum time to wait (seconds)
+            require_change: Keep waiting until the screen differs from the
+                last frame shown to the model
+            baseline: Tile signature to compare against instead of the last
+                frame shown to the model
+        
+        Returns:
+            SettleResult; its frame is reused by the next capture
+        """
+        result = self.settle_detector.wait(
+            timeout,
+            require_change=require_change,
+            baseline=self.change_detector.previous_signature if baseline is None else baseline
+        )
+        self.logger.debug(f"Settle: {result}")
+        if self.settled_frame is not None:
+            self.settled_frame.release()
+        self.settled_frame = result.frame
+        return result
+    
+    def _screen_unchanged(self) -> bool:
+        """Whether the latest capture is identical to the one before it"""
+        return (self.detect_screen_changes
+                and self.iteration_count > 1
+                and self.last_change is not None
+                and not self.last_change.changed)
+    
+    def _unchanged_screen_note(self) -> Optional[str]:
+        """Hint for the model when its previous action had no visible effect or failed a postcondition"""
+        if self.failed_assertion is not None:
+            arguments, assertion = self.failed_assertion
+            return (f"Note: expected a {assertion.describe()} after {json.dumps(arguments)}, but it did "
+                    f"not happen; the remaining actions of that response were skipped.")
+        if not self._screen_unchanged() or not self.last_action:
+            return None
+        return (f"Note: the screen did not change after the previous action "
+                f"({json.dumps(self.last_action)}). If it missed its target, "
+                f"try a different approach.")
+    
+    def _should_skip_model_call(self) -> bool:
+        """
+        Track unchanged screens and decide whether this iteration can skip the model
+        
+        Returns:
+            True while a requested wait has had no visible effect yet
+        """
+        if not self._screen_unchanged():
+            self.unchanged_streak = 0
+            return False
+        
+        self.unchanged_streak += 1
+        if (self.last_action or {}).get('action') == 'wait' \
+                and self.unchanged_streak <= self.max_unchanged_waits:
+            self.logger.info("Screen unchanged after wait, skipping model call")
+            return True
+        return False
+    
+    def _build_user_prompt(self, task: str, note: Optional[str] = None, history: Optional[str] = None) -> str:
+        """Build the user prompt for the current iteration"""
+        if self.iteration_count == 0:
+            question = "This is the current state of the desktop. What should I do first to accomplish this task?"
+        else:
+            question = "This is the current state after the previous action. What should I do next?"
+        parts = [f"Task: {task}"]
+        if history:
+            parts.append(history)
+        parts.append(question)
+        if note:
+            parts.append(note)
+        return "\n\n".join(parts)
+    
+    def _cache_key(self, task: str, user_prompt: str, tools: List[Dict[str, Any]], screenshot):
+        """Response cache key of a model call (None when caching is off)"""
+        if self.response_cache is None:
+            return None
+        prompt = f"{self._get_system_prompt()}\n{user_prompt}"
+        return self.response_cache.key(task, prompt, tools, screenshot)
+    
+    def _cached_response(self, cache_key) -> Optional[Dict[str, Any]]:
+        """Look up a cached response for the key"""
+        if cache_key is None:
+            return None
+        response = self.response_cache.get(cache_key)
+        if response is not None:
+            self.logger.info("Using cached model response")
+        return response
+    
+    def _store_response(self, cache_key, response: Dict[str, Any]) -> None:
+        """Cache a response that contains an action"""
+        if cache_key is not None and self.ollama_client.parse_actions(response):
+            self.response_cache.put(cache_key, response)
+    
+    def _prepare_request(self, task: str, screenshot, note: Optional[str] = None):
+        """
+        Build the chat_with_image arguments for the current step
+        
+        Args:
+            task: The user's task
+            screenshot: Frame (or PIL Image) of current screen
+            note: Optional extra context appended to the prompt
+        
+        Returns:
+            Tuple of (request keyword arguments, response cache key or None)
+        """
+        system_prompt = self._get_system_prompt()
+        
+        # Prepare tools
+        tools = self._prepare_tools()
+        
+        # Previous steps, within what is left of the token budget
+        image_tokens = self.ollama_client.image_tokens(screenshot)
+        reserved = image_tokens + (
+            len(system_prompt) + len(json.dumps(tools)) + len(task) + len(note or '') + 200
+        ) // CHARS_PER_TOKEN
+        history_text, history = self.context.build(reserved)
+        
+        # Build the prompt
+        user_prompt = self._build_user_prompt(task, note, history_text)
+        
+        # Token estimates for the accounting record of this call
+        history_chars = sum(len(message['content']) for message in history)
+        self.request_estimate = {
+            'image_tokens': image_tokens * (1 + sum(len(message.get('images', [])) for message in history)),
+            'text_tokens': (len(system_prompt) + len(user_prompt) + len(json.dumps(tools)) + history_chars)
+            // CHARS_PER_TOKEN,
+        }
+        
+        request = {
+            'user_query': user_prompt,
+            'image': screenshot,
+            'system_prompt': system_prompt,
+            'tools': tools,
+            'history': history,
+            'stop_at_tool_call': self.stream_responses,
+            'max_tool_calls': self.max_batch_actions,
+        }
+        return request, self._cache_key(task, user_prompt, tools, screenshot)
+    
+    def _think_and_decide(self, task: str, screenshot, note: Optional[str] = None) -> Dict[str, Any]:
         """
         Send screenshot to model and get decision
         
         Args:
             task: The user's task
-            screenshot: PIL Image of current screen
+            screenshot: Frame (or PIL Image) of current screen
+            note: Optional extra context appended to the prompt
             
         Returns:
             Response from the model
         """
         self.logger.info("Thinking and deciding next action...")
         
-        # Build the prompt
-        if self.iteration_count == 0:
-            user_prompt = f"Task: {task}\n\nThis is the current state of the desktop. What should I do first to accomplish this task?"
-        else:
-            user_prompt = f"Task: {task}\n\nThis is the current state after the previous action. What should I do next?"
+        request, cache_key = self._prepare_request(task, screenshot, note)
         
-        # Prepare tools
-        tools = self._prepare_tools()
+        # Identical task, prompt and screen: reuse the earlier decision
+        start = time.perf_counter()
+        response = self._cached_response(cache_key)
+        if response is not None:
+            self._discard_speculation('cached')
+            self._record_inference(response, time.perf_counter() - start, cached=True)
+            return response
         
-        # Get response from model
+        # Get response from model (or from the prediction made during the last action)
         try:
-            response = self.ollama_client.chat_with_image(
-                user_query=user_prompt,
-                image=screenshot,
-                system_prompt=self._get_system_prompt(),
-                tools=tools
-            )
+            tier, client = self._select_model()
+            speculated = self._await_speculation(client)
+            if speculated is not None:
+                response, wall_time = speculated
+            else:
+                start = time.perf_counter()
+                response = client.chat_with_image(**request)
+                wall_time = time.perf_counter() - start
+            self._record_inference(response, wall_time, tier=tier, client=client)
             
-            self.logger.info(f"Model response: {response}")
+            # Unusable or unsure fast-tier answer: ask the large model instead
+            if self._needs_escalation(tier, client, response):
+                start = time.perf_counter()
+                response = self.ollama_client.chat_with_image(**request)
+                self._record_inference(response, time.perf_counter() - start, tier=STRONG)
+            
+            self._store_response(cache_key, response)
             return response
             
         except Exception as e:
             self.logger.error(f"Error in model inference: {e}")
             raise
     
+    def _start_speculation(self, task: str, screenshot, response: Dict[str, Any]) -> None:
+        """Request the step after response's actions while they execute"""
+        prepared = self._speculation_request(task, screenshot, response)
+        if prepared is None:
+            return
+        actions, client, request = prepared
+        cancel = RequestCancel()
+        if self._speculation_pool is None:
+            self._speculation_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix='speculation')
+        future = self._speculation_pool.submit(self._timed_chat, client, request, cancel)
+        self.speculator.begin(Speculation(actions, client, future, cancel.set))
+    
+    def _speculation_request(self, task: str, screenshot, response: Dict[str, Any]):
+        """
+        Build the speculative request for the step after response's actions
+        
+        Returns:
+            Tuple of (assumed actions, model client, chat_with_image
+            arguments), or None when the next step is not predicted
+        """
+        if self.speculator is None or self.task_completed or not self.detect_screen_changes or self.planner_mode:
+            return None
+        if self.replayer is not None and self.replayer.active:
+            return None
+        actions = self.ollama_client.parse_actions(response)[:self.max_batch_actions]
+        if not actions or any(action.kind in NOT_SPECULATED for action in actions):
+            return None
+        
+        client = self.fast_client or self.ollama_client
+        # Encode now: the frame is released once the next one is captured
+        client.encode_for_model(screenshot)
+        
+        note = (f"Assume these actions have just been executed successfully: "
+                f"{json.dumps([action.arguments for action in actions])}. What should I do after them?")
+        estimate = self.request_estimate
+        request, _ = self._prepare_request(task, screenshot, note)
+        self.request_estimate = estimate
+        request['stop_at_tool_call'] = True
+        return actions, client, request
+    
+    @staticmethod
+    def _timed_chat(client: OllamaVisionClient, request: Dict[str, Any], cancel_event: RequestCancel):
+        start = time.perf_counter()
+        response = client.chat_with_image(**request, cancel_event=cancel_event)
+        return response, time.perf_counter() - start
+    
+    def _check_speculation(self, client: OllamaVisionClient) -> Optional[Speculation]:
+        """
+        Screen check of the pending prediction before waiting for it
+        
+        Args:
+            client: Model client chosen for this step
+        
+        Returns:
+            The pending speculation if it may still apply, else None
+            (after discarding it)
+        """
+        speculation = self.speculator.pending if self.speculator is not None else None
+        if speculation is None:
+            return None
+        reason = self.speculator.screen_check(self.last_change)
+        if reason is None and speculation.client is not client:
+            reason = 'model_changed'
+        if reason is not None:
+            self._discard_speculation(reason)
+            return None
+        return speculation
+    
+    def _await_speculation(self, client: OllamaVisionClient):
+        """
+        Wait for the pending prediction and commit it if it still applies
+        
+        Args:
+            client: Model client chosen for this step
+        
+        Returns:
+            Tuple of (response, wall time of the call), or None
+        """
+        speculation = self._check_speculation(client)
+        if speculation is None:
+            return None
+        needed_at = time.perf_counter()
+        try:
+            response, wall_time = speculation.handle.result()
+        except Exception as e:
+            self.logger.warning(f"Speculative request failed: {e}")
+            self._discard_speculation('error')
+            return None
+        return self._commit_speculation(response, wall_time, needed_at)
+    
+    def _commit_speculation(self, response: Dict[str, Any], wall_time: float, needed_at: float):
+        """Commit the pending prediction unless it targets a region that changed"""
+        client = self.speculator.pending.client
+        reason = self.speculator.target_check(client.parse_actions(response), self.last_change)
+        if reason is not None:
+            self._discard_speculation(reason)
+            return None
+        self.speculator.commit(wall_time, needed_at)
+        self.logger.info(f"Using speculative prediction (waited {time.perf_counter() - needed_at:.2f}s "
+                         f"of a {wall_time:.2f}s request)")
+        return response, wall_time
+    
+    def _discard_speculation(self, reason: str) -> None:
+        if self.speculator is not None and self.speculator.pending is not None:
+            self.logger.debug(f"Discarding speculative prediction ({reason})")
+            self.speculator.discard(reason)
+    
+    def _plan_step(self, task: str, screenshot) -> Dict[str, Any]:
+        """
+        Decide the next action in planner mode
+        
+        The current sub-goal becomes a computer_use call, after a grounding
+        call for actions that need a coordinate. The planner is asked again
+        only when the previous sub-goal failed verification, its target could
+        not be found or the plan ran out; past max_replans the step falls back
+        to the full per-step prompt.
+        
+        Args:
+            task: The user's task
+            screenshot: Frame (or PIL Image) of current screen
+        
+        Returns:
+            Response with the step's tool call (built locally unless the
+            step fell back to _think_and_decide)
+        """
+        note = self._verify_planned_step()
+        for _ in range(2):
+            if note is not None or self.plan is None or self.plan.finished:
+                if not self._may_plan(note):
+                    break
+                request = self._plan_request(task, screenshot, note)
+                start = time.perf_counter()
+                response = self.ollama_client.chat_with_image(**request)
+                self._record_inference(response, time.perf_counter() - start, purpose='plan')
+                self._set_plan(parse_plan(response))
+                note = None
+                if self.plan.finished:
+                    break
+            
+            goal = self.plan.current
+            if not goal.needs_grounding:
+                return self._planned_response(goal)
+            
+            coordinate = self._cached_location(goal, screenshot)
+            if coordinate is None:
+                request = self._grounding_request(goal, screenshot)
+                start = time.perf_counter()
+                response = self.grounding_client.chat_with_image(**request)
+                self._record_inference(response, time.perf_counter() - start,
+                                       client=self.grounding_client, purpose='grounding')
+                coordinate = parse_point(response)
+                if coordinate is not None:
+                    self._remember_element(goal, screenshot, coordinate)
+            if coordinate is not None:
+                return self._planned_response(goal, coordinate)
+            note = self._replan_note('target_not_found', f"'{goal.target}' was not found on the screen.")
+        
+        self.planner_counts['fallback_steps'] += 1
+        return self._think_and_decide(task, screenshot, note=self._unchanged_screen_note())
+    
+    def _verify_planned_step(self) -> Optional[str]:
+        """
+        Check the effect of the sub-goal dispatched in the previous step
+        
+        Returns:
+            Note for the planner when the sub-goal failed, else None
+        """
+        goal, self.dispatched_goal = self.dispatched_goal, None
+        element, self.pending_element = self.pending_element, None
+        if goal is None:
+            return None
+        if self.last_step_failed:
+            note = self._replan_note('action_failed', f"The step '{goal.description}' failed.")
+        elif goal.expects_change and self._screen_unchanged():
+            note = self._replan_note('no_effect', f"The step '{goal.description}' had no visible effect.")
+        else:
+            note = None
+            self.done_goals.append(goal)
+        if element is not None:
+            self._settle_element(element, note is None)
+        return note
+    
+    def _cached_location(self, goal: SubGoal, screenshot) -> Optional[List[int]]:
+        """Location of the goal's target from the element cache, if it matches the current screen"""
+        if self.element_cache is None or not isinstance(screenshot, Frame):
+            return None
+        query = goal.target or goal.description
+        match = self.element_cache.locate(query, screenshot)
+        if match is None:
+            return None
+        self.pending_element = (query, None, True)
+        self.logger.info(f"Located '{query}' from the element cache ({match.search} match, "
+                         f"score {match.score:.2f}, {match.elapsed * 1000:.0f}ms)")
+        return match.coordinate
+    
+    def _remember_element(self, goal: SubGoal, screenshot, coordinate: List[int]) -> None:
+        """Keep the patch around a grounded target until the step is verified"""
+        if self.element_cache is None or not isinstance(screenshot, Frame):
+            return
+        patch = self.element_cache.extract(screenshot, coordinate)
+        self.pending_element = (goal.target or goal.description, patch, False)
+    
+    def _settle_element(self, element, success: bool) -> None:
+        """Store the patch of a verified click, or forget a cached location that led to a failed step"""
+        query, patch, cached = element
+        if success and patch is not None:
+            self.element_cache.put(query, patch)
+        elif not success and cached:
+            self.logger.info(f"Cached location of '{query}' did not work, removing it")
+            self.element_cache.remove(query)
+    
+    def _replan_note(self, reason: str, message: str) -> str:
+        self.replan_reasons[reason] += 1
+        self.logger.info(f"Re-planning: {message}")
+        return f"{message} Plan the remaining steps from the current screen."
+    
+    def _may_plan(self, note: Optional[str]) -> bool:
+        """Whether another planner call is allowed for this task"""
+        if self.planner_counts['plans'] > self.max_replans:
+            return False
+        if note is None and self.plan is not None:
+            self.replan_reasons['plan_finished'] += 1
+        return True
+    
+    def _plan_request(self, task: str, screenshot, note: Optional[str] = None) -> Dict[str, Any]:
+        """chat_with_image arguments of a planner call"""
+        parts = [f"Task: {task}"]
+        if self.done_goals:
+            parts.append("Steps already done:\n" + "\n".join(f"- {goal.description}" for goal in self.done_goals))
+        if note:
+            parts.append(note)
+        parts.append("List the remaining steps.")
+        user_prompt = "\n\n".join(parts)
+        self.request_estimate = {
+            'image_tokens': self.ollama_client.image_tokens(screenshot),
+            'text_tokens': (len(PLANNER_PROMPT) + len(user_prompt)) // CHARS_PER_TOKEN,
+        }
+        return {'user_query': user_prompt, 'image': screenshot, 'system_prompt': PLANNER_PROMPT}
+    
+    def _grounding_request(self, goal: SubGoal, screenshot) -> Dict[str, Any]:
+        """chat_with_image arguments of a grounding call for the goal's target"""
+        user_prompt = f"Element: {goal.target or goal.description}"
+        self.request_estimate = {
+            'image_tokens': self.grounding_client.image_tokens(screenshot),
+            'text_tokens': (len(GROUNDING_PROMPT) + len(user_prompt)) // CHARS_PER_TOKEN,
+        }
+        self.planner_counts['grounding_calls'] += 1
+        return {'user_query': user_prompt, 'image': screenshot, 'system_prompt': GROUNDING_PROMPT}
+    
+    def _set_plan(self, goals: List[SubGoal]) -> None:
+        self.plan = Plan(goals)
+        self.planner_counts['plans'] += 1
+        if goals:
+            self.logger.info(f"Plan:\n{self.plan.describe()}")
+        else:
+            self.logger.warning("Planner response contained no usable steps")
+    
+    def _planned_response(self, goal: SubGoal, coordinate: Optional[List[int]] = None) -> Dict[str, Any]:
+        """Dispatch the current sub-goal as a model-style response with one tool call"""
+        self.plan.advance()
+        self.dispatched_goal = goal
+        self.planner_counts['planned_steps'] += 1
+        self.logger.info(f"Sub-goal {self.plan.position}/{len(self.plan.goals)}: {goal.description}")
+        return self._tool_call_response([goal.to_arguments(coordinate)], goal.description)
+    
+    @staticmethod
+    def _tool_call_response(arguments: List[Dict[str, Any]], content: str = '') -> Dict[str, Any]:
+        """Model-style response carrying computer_use calls decided without inference"""
+        return {
+            'message': {
+                'role': 'assistant',
+                'content': content,
+                'tool_calls': [{'function': {'name': 'computer_use', 'arguments': args}} for args in arguments],
+            }
+        }
+    
+    def _replay_step(self, screenshot):
+        """
+        Take the next step from the recorded trajectory if the screen still matches it
+        
+        Args:
+            screenshot: Frame of current screen
+        
+        Returns:
+            Tuple of (TrajectoryReplayer decision or None when not replaying,
+            response with the recorded actions or None)
+        """
+        if self.replayer is None or not self.replayer.active:
+            return None, None
+        position = self.replayer.position
+        if self.last_step_failed:
+            self.replayer.diverge('action_failed')
+            decision, step = TrajectoryReplayer.DIVERGED, None
+        else:
+            decision, step = self.replayer.next(self.trajectory_store.screen_hash(screenshot))
+        if decision == TrajectoryReplayer.REPLAY:
+            self.logger.info(f"Replaying recorded step {position + 1}/{self.replayer.length}")
+            return decision, self._tool_call_response(step.actions, "Replayed recorded step")
+        if decision == TrajectoryReplayer.WAIT:
+            self.logger.info("Screen does not match the recorded step yet, waiting for it to change")
+        else:
+            self.logger.info(f"Replay diverged at step {position + 1} ({self.replayer.divergence}), "
+                             f"handing over to the model")
+        return decision, None
+    
+    def _planner_stats(self) -> Dict[str, Any]:
+        """Planner calls, re-plans by reason and how the steps were decided"""
+        plans = self.planner_counts['plans']
+        return {
+            'plans': plans,
+            'replans': max(plans - 1, 0),
+            'replan_reasons': dict(self.replan_reasons),
+            'planned_steps': self.planner_counts['planned_steps'],
+            'grounding_calls': self.planner_counts['grounding_calls'],
+            'fallback_steps': self.planner_counts['fallback_steps'],
+        }
+    
+    def _select_model(self):
+        """
+        Pick the model client for this step
+        
+        Returns:
+            Tuple of (routing tier or None, OllamaVisionClient)
+        """
+        if self.router is None:
+            return None, self.ollama_client
+        tier, reason = self.router.route(failed=self.last_step_failed, unchanged=self._screen_unchanged())
+        if reason is not None:
+            self.logger.info(f"Escalating to {self.ollama_client.model} ({reason})")
+        return tier, self.fast_client if tier == FAST else self.ollama_client
+    
+    def _needs_escalation(self, tier: Optional[str], client: OllamaVisionClient, response: Dict[str, Any]) -> bool:
+        """Whether a fast-tier response must be re-asked on the large model"""
+        if tier != FAST:
+            return False
+        reason = self.router.review(response, client.parse_actions(response))
+        if reason is None:
+            return False
+        self.logger.info(f"Escalating to {self.ollama_client.model} ({reason})")
+        return True
+    
+    def _record_inference(self,
+                          response: Dict[str, Any],
+                          wall_time: float,
+                          cached: bool = False,
+                          tier: Optional[str] = None,
+                          client: Optional[OllamaVisionClient] = None,
+                          purpose: str = 'step') -> None:
+        """Add the token and latency record of a model call and log it"""
+        client = client or self.ollama_client
+        record = self.inference_metrics.add(
+            response,
+            wall_time,
+            iteration=self.iteration_count,
+            cached=cached,
+            model=None if cached else client.model,
+            tier=tier,
+            purpose=purpose,
+            **self.request_estimate
+        )
+        if cached:
+            return
+        if tier is not None:
+            self.router.record(tier, wall_time)
+        
+        self.think_time += wall_time
+        if response.get('stopped_early'):
+            self.logger.debug("Generation stopped at the tool calls")
+        self.logger.info(
+            f"Model call ({client.model}, {purpose}): {wall_time:.2f}s, {record['prompt_tokens']} prompt tokens "
+            f"(~{record['image_tokens']} image), {record['output_tokens']} output tokens"
+            + (f", bottleneck {record['bottleneck']}" if record['bottleneck'] else "")
+        )
+        self.logger.debug(f"Model response: {response}")
+    
+    def _record_step(self, response: Dict[str, Any], success: bool) -> None:
+        """Add the step just executed (one entry per executed action) to the context"""
+        executed = self.last_batch or [(None, success)]
+        self.last_step_failed = not success
+        if not success:
+            self._discard_speculation('action_failed')
+        
+        screenshot = self.current_frame
+        if self.trajectory_store is not None and screenshot is not None:
+            actions = [action.arguments for action, action_success in executed if action is not None and action_success]
+            if actions:
+                self.trajectory.append(TrajectoryStep(self.trajectory_store.screen_hash(screenshot), actions))
+        
+        image, image_tokens = None, 0
+        if self.context_images > 0 and screenshot is not None:
+            image = self.ollama_client.encode_for_model(screenshot)
+            image_tokens = self.ollama_client.image_tokens(screenshot)
+        
+        for index, (action, action_success) in enumerate(executed):
+            self.context.add_step(
+                self.iteration_count,
+                action.arguments if action is not None else None,
+                action_success,
+                response=response if index == 0 else None,
+                image=image if index == 0 else None,
+                image_tokens=image_tokens if index == 0 else 0
+            )
+    
     def _execute_action(self, response: Dict[str, Any]) -> bool:
         """
-        Execute the action decided by the model
+        Execute the actions decided by the model
+        
+        All tool calls of the response run in order as one batch. Between
+        actions the UI gets a short settle, and the batch is aborted when an
+        action fails or a local check rejects its effect.
         
         Args:
             response: Response from the model
             
         Returns:
-            True if action executed successfully
+            True if every action executed successfully
         """
-        # Parse the action from response
-        action = self.ollama_client.parse_computer_use_action(response)
+        # Parse the actions from response
+        actions = self.ollama_client.parse_actions(response)
+        self.last_batch = []
+        self.failed_assertion = None
         
-        if not action:
+        if not actions:
             self.logger.warning("No action found in response")
             # Check if the model just wants to observe
             if 'message' in response and 'content' in response['message']:
@@ -218,144 +1060,451 @@ You have access to a 'computer' tool that allows you to:
             
             return False
         
-        # Extract action details
-        if 'function' in action:
-            action_details = action['function']
-            action_name = action_details.get('name')
-            
-            if isinstance(action_details.get('arguments'), str):
-                arguments = json.loads(action_details['arguments'])
-            else:
-                arguments = action_details.get('arguments', {})
-        else:
-            arguments = action.get('arguments', {})
-            action_name = action.get('name', 'computer')
+        if len(actions) > self.max_batch_actions:
+            self.logger.warning(f"Response has {len(actions)} actions, executing the first {self.max_batch_actions}")
+            actions = actions[:self.max_batch_actions]
+        elif len(actions) > 1:
+            self.logger.info(f"Executing a batch of {len(actions)} actions")
+        if self.postconditions is not None:
+            self.postconditions.record_chunk(len(actions))
+        
+        for index, action in enumerate(actions):
+            last = index == len(actions) - 1
+            success = self._execute_single_action(action, last)
+            self.last_batch.append((action, success))
+            if not success:
+                if not last:
+                    self.logger.warning(f"Aborting batch after action {index + 1}/{len(actions)}")
+                return False
+            if self.task_completed:
+                break
+        return True
+    
+    def _execute_single_action(self, action: Action, last: bool = True) -> bool:
+        """
+        Execute one action and wait for the UI to settle
+        
+        Args:
+            action: Parsed action
+            last: Whether this is the last action of its batch (full settle);
+                earlier actions get a short settle plus the local check
+        
+        Returns:
+            True if the action executed (and passed the batch check)
+        """
+        self.last_action = action.arguments
         
         # Check for termination
-        if arguments.get('action') == 'terminate':
+        if action.kind == 'terminate':
             self.task_completed = True
-            self.task_status = arguments.get('status', 'success')
+            self.task_status = action.get('status', 'success')
             self.logger.info(f"Task terminated with status: {self.task_status}")
             return True
         
         # Check for answer action (just observation)
-        if arguments.get('action') == 'answer':
-            answer_text = arguments.get('text', '')
+        if action.kind == 'answer':
+            answer_text = action.get('text', '')
             self.logger.info(f"Model's answer: {answer_text}")
             return True
         
+        # Postconditions the model attached to this action
+        assertions = self._action_assertions(action)
+        
+        # Screen before this action, for the check between batched actions
+        baseline = None
+        if assertions:
+            baseline = self._pre_action_signature()
+        elif not last and self.settled_frame is not None and self._batch_check_applies(action):
+            baseline = self.change_detector.signature(self.settled_frame)
+        
+        # Wait for something to happen on screen, up to the requested time
+        if action.kind == 'wait':
+            self.logger.info(f"Waiting up to {action.get('time', 1)} seconds for the screen to change")
+            settle = self._wait_for_settle(float(action.get('time', 1)), require_change=True, baseline=baseline)
+            return self._check_assertions(action, assertions, settle, baseline)
+        
         # Execute the action
-        self.logger.info(f"Executing action: {arguments}")
-        success = self.action_executor.execute_computer_use_action({
-            'name': action_name,
-            'arguments': arguments
-        })
+        self.logger.info(f"Executing action: {action.arguments}")
+        success = self.action_executor.execute(action)
         
-        # Wait a bit after action for UI to update
-        if success and arguments.get('action') != 'wait':
-            time.sleep(1)
+        if not success:
+            return False
         
-        return success
+        # Wait for the UI to settle after the action (bounded)
+        if last:
+            settle = self._wait_for_settle(self.post_action_delay + self.iteration_delay, baseline=baseline)
+            return self._check_assertions(action, assertions, settle, baseline)
+        
+        settle = self._wait_for_settle(self.post_action_delay, baseline=baseline)
+        return self._check_batch_step(action, settle) and self._check_assertions(action, assertions, settle, baseline)
     
-    def run(self, task: str) -> Dict[str, Any]:
+    def _action_assertions(self, action: Action) -> List[Assertion]:
+        """Postconditions attached to the action (malformed ones are ignored)"""
+        if self.postconditions is None:
+            return []
+        try:
+            return parse_assertions(action.arguments)
+        except ValueError as e:
+            self.postconditions.invalid += 1
+            self.logger.warning(f"Ignoring postconditions of {action.kind}: {e}")
+            return []
+    
+    def _pre_action_signature(self):
+        """Tile signature of the screen the next action starts from"""
+        if self.settled_frame is not None:
+            return self.change_detector.signature(self.settled_frame)
+        if self.change_detector.previous_signature is not None:
+            return self.change_detector.previous_signature
+        return self.change_detector.signature(self.current_frame)
+    
+    def _check_assertions(self, action: Action, assertions: List[Assertion], settle, baseline) -> bool:
         """
-        Run the agent to complete the given task
+        Check the postconditions of an executed action on the settled frame
+        
+        Args:
+            action: Action just executed
+            assertions: Its postconditions
+            settle: SettleResult of the wait after it
+            baseline: Tile signature of the screen before the action
+        
+        Returns:
+            False (ending the chunk) if a postcondition does not hold
+        """
+        if not assertions:
+            return True
+        change, _ = self.change_detector.compare(settle.frame, baseline)
+        failed = self.postconditions.check(assertions, change, settle.frame)
+        if failed is None:
+            return True
+        self.failed_assertion = (action.arguments, failed)
+        self.logger.warning(f"Expected {failed.describe()} after {action.kind}, remaining actions skipped")
+        return False
+    
+    def _batch_check_applies(self, action: Action) -> bool:
+        return self.verify_batch_steps and action.kind in BATCH_CHANGE_EXPECTED
+    
+    def _check_batch_step(self, action: Action, settle) -> bool:
+        """
+        Cheap local check between batched actions
+        
+        Args:
+            action: Action just executed
+            settle: SettleResult of the wait after it
+        
+        Returns:
+            False to abort the rest of the batch
+        """
+        if self._batch_check_applies(action) and not settle.changed:
+            self.logger.warning(f"No visible effect after {action.kind}, remaining actions skipped")
+            return False
+        return True
+    
+    def _start_task(self, task: str) -> float:
+        """
+        Reset state and start per-task resources (recording, background capture)
         
         Args:
             task: The task to complete
             
         Returns:
-            Dictionary with results including success status and message
+            Start time (time.time())
         """
         self.logger.info(f"=" * 80)
         self.logger.info(f"Starting task: {task}")
         self.logger.info(f"=" * 80)
         
         # Reset state
+        self.task = task
+        self.trajectory = []
         self.iteration_count = 0
         self.task_completed = False
         self.task_status = None
-        self.conversation_history = []
+        self.last_action = None
+        self.unchanged_streak = 0
+        self.last_step_failed = False
+        self.failed_assertion = None
+        self.think_time = 0.0
+        self.inference_metrics.reset()
+        if self.router is not None:
+            self.router.reset()
+        if self.speculator is not None:
+            self.speculator.reset()
+        if self.postconditions is not None:
+            self.postconditions.reset()
+        if self.replayer is not None:
+            self.replayer.reset(self.trajectory_store.get(task))
+            if self.replayer.active:
+                self.logger.info(f"Replaying a recorded trajectory of {self.replayer.length} steps")
+        self.plan = None
+        self.dispatched_goal = None
+        self.pending_element = None
+        self.done_goals = []
+        self.planner_counts.clear()
+        self.replan_reasons.clear()
+        self.settled_frame = None
+        self.change_detector.reset()
         
         start_time = time.time()
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        
+        self.context = self._create_context(
+            self.screenshot_dir / f"history_{timestamp}.jsonl" if self.save_screenshots else None
+        )
+        self.conversation_history = self.context.history
+        
+        if self.save_screenshots and self.screenshot_storage == 'session':
+            self.session_recorder = SessionRecorder(
+                self.screenshot_dir / f"session_{timestamp}.strec",
+                keyframe_interval=config.SESSION_KEYFRAME_INTERVAL
+            )
+        
+        if self.continuous_capture:
+            self.screenshot_capture.start_continuous_capture(
+                fps=self.capture_fps,
+                buffer_size=config.CAPTURE_BUFFER_SIZE
+            )
+        
+        return start_time
+    
+    def _finish_task(self) -> None:
+        """Stop per-task resources, flush pending screenshots and record a successful trajectory"""
+        self._discard_speculation('task_finished')
+        if self.trajectory_store is not None and self.task_completed and self.task_status == 'success' \
+                and self.trajectory:
+            self.trajectory_store.put(self.task, self.trajectory)
+        if self.continuous_capture:
+            self.screenshot_capture.stop_continuous_capture()
+        self.screenshot_writer.flush()
+        self.context.close()
+        if self.session_recorder is not None:
+            self.session_recorder.close()
+            self.session_recorder = None
+    
+    def _begin_iteration(self) -> None:
+        """Advance the iteration counter and log it"""
+        self.iteration_count += 1
+        self.logger.info(f"\n{'=' * 80}")
+        self.logger.info(f"Iteration {self.iteration_count}/{self.max_iterations}")
+        self.logger.info(f"{'=' * 80}")
+    
+    def _task_result(self, start_time: float) -> Dict[str, Any]:
+        """Build (and log) the result of a task that ran to completion or timeout"""
+        elapsed_time = time.time() - start_time
+        
+        if self.task_completed:
+            result = {
+                'success': self.task_status == 'success',
+                'status': self.task_status,
+                'message': f'Task completed in {self.iteration_count} iterations',
+                'iterations': self.iteration_count,
+                'elapsed_time': elapsed_time
+            }
+            self.logger.info(f"\n{'=' * 80}")
+            self.logger.info(f"TASK COMPLETED: {result['message']}")
+            self.logger.info(f"Status: {self.task_status}")
+            self.logger.info(f"Time: {elapsed_time:.2f} seconds")
+            self.logger.info(f"{'=' * 80}\n")
+        else:
+            result = {
+                'success': False,
+                'status': 'timeout',
+                'message': f'Task did not complete within {self.max_iterations} iterations',
+                'iterations': self.iteration_count,
+                'elapsed_time': elapsed_time
+            }
+            self.logger.warning(f"\n{'=' * 80}")
+            self.logger.warning(f"TASK TIMEOUT: {result['message']}")
+            self.logger.warning(f"{'=' * 80}\n")
+        
+        return self._add_metrics(result)
+    
+    def _failure_result(self, status: str, message: str, start_time: float) -> Dict[str, Any]:
+        """Build the result of an interrupted or failed task"""
+        return self._add_metrics({
+            'success': False,
+            'status': status,
+            'message': message,
+            'iterations': self.iteration_count,
+            'elapsed_time': time.time() - start_time
+        })
+    
+    def _add_metrics(self, result: Dict[str, Any]) -> Dict[str, Any]:
+        """Attach component metrics to a run() result"""
+        result['think_time'] = self.think_time
+        result['inference'] = self.inference_metrics.report()
+        if self.router is not None:
+            result['routing'] = self.router.stats()
+        if self.speculator is not None:
+            result['speculation'] = self.speculator.stats()
+        if self.planner_mode:
+            result['planner'] = self._planner_stats()
+        if self.postconditions is not None:
+            result['assertions'] = self.postconditions.stats()
+        if self.element_cache is not None:
+            result['elements'] = self.element_cache.stats()
+        if self.replayer is not None:
+            result['replay'] = dict(self.replayer.stats(), recorded_steps=len(self.trajectory))
+        if self.load_time is not None:
+            result['load_time'] = self.load_time
+        if self.response_cache is not None:
+            result['cache'] = self.response_cache.stats()
+        return result
+    
+    def _model_clients(self) -> List[OllamaVisionClient]:
+        """Every model client the agent may call"""
+        return [client for client in (self.ollama_client, self.fast_client, self.grounding_client) if client is not None]
+    
+    def _log_load(self, reports: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+        """Log the load time of each model and combine them into one report"""
+        for model, report in reports.items():
+            self.logger.info(f"Model {model} loaded in {report['load_time']:.2f}s "
+                             f"(server load {report['server_load_time']:.2f}s)")
+        report = dict(reports[self.ollama_client.model])
+        if len(reports) > 1:
+            report['load_time'] = sum(r['load_time'] for r in reports.values())
+            report['server_load_time'] = sum(r['server_load_time'] for r in reports.values())
+            report['models'] = reports
+        self.load_time = report['load_time']
+        return report
+    
+    def warm_up(self, keep_alive=None) -> Dict[str, Any]:
+        """
+        Load the model before the first task
+        
+        Args:
+            keep_alive: How long the server keeps the model loaded
+                (default: config.OLLAMA_KEEP_ALIVE)
+        
+        Returns:
+            Load timing from OllamaVisionClient.warm_up (summed over both
+            models when routing, with the per-model reports under 'models')
+        """
+        reports = {}
+        for client in self._model_clients():
+            if client.model in reports:
+                continue
+            self.logger.info(f"Warming up model {client.model}...")
+            reports[client.model] = client.warm_up(keep_alive)
+        return self._log_load(reports)
+    
+    def run_batch(self, tasks: List[str]) -> List[Dict[str, Any]]:
+        """
+        Run several tasks with the model pinned in memory
+        
+        The model is loaded once with keep_alive=-1 and every request of the
+        batch keeps it pinned; afterwards config.OLLAMA_KEEP_ALIVE applies again.
+        
+        Args:
+            tasks: Tasks to run in order
+        
+        Returns:
+            One run() result per task
+        """
+        clients = self._model_clients()
+        keep_alive = self.ollama_client.keep_alive
+        for client in clients:
+            client.keep_alive = -1
+        try:
+            try:
+                self.warm_up(-1)
+            except Exception as e:
+                self.logger.warning(f"Model warm-up failed: {e}")
+            return [self.run(task) for task in tasks]
+        finally:
+            for client in clients:
+                client.keep_alive = keep_alive
+                try:
+                    client.warm_up(keep_alive)
+                except Exception as e:
+                    self.logger.warning(f"Could not restore keep_alive of {client.model}: {e}")
+    
+    def run(self, task: str) -> Dict[str, Any]:
+        """
+        Run the agent to complete the given task
+        
+        Args:
+            task: The task to complete
+        
+        Returns:
+            Dictionary with results including success status and message
+        """
+        if self.warm_up_model and self.load_time is None:
+            try:
+                self.warm_up()
+            except Exception as e:
+                self.logger.warning(f"Model warm-up failed: {e}")
+        
+        start_time = self._start_task(task)
         
         try:
             while self.iteration_count < self.max_iterations and not self.task_completed:
-                self.iteration_count += 1
-                self.logger.info(f"\n{'=' * 80}")
-                self.logger.info(f"Iteration {self.iteration_count}/{self.max_iterations}")
-                self.logger.info(f"{'=' * 80}")
+                self._begin_iteration()
                 
                 # Step 1: SEE - Capture screenshot
                 screenshot = self._capture_current_state()
                 
-                # Step 2: THINK - Analyze and decide
-                response = self._think_and_decide(task, screenshot)
+                # Skip the model call while a requested wait has no visible effect yet
+                if self._should_skip_model_call():
+                    self._wait_for_settle(self.iteration_delay, require_change=True)
+                    continue
                 
-                # Store in conversation history
-                self.conversation_history.append({
-                    'iteration': self.iteration_count,
-                    'response': response
-                })
+                # Replay the recorded trajectory while the screen still matches it
+                decision, response = self._replay_step(screenshot)
+                if decision == TrajectoryReplayer.WAIT:
+                    self._wait_for_settle(self.post_action_delay + self.iteration_delay, require_change=True)
+                    continue
+                
+                # Step 2: THINK - Analyze and decide (unless the step was replayed)
+                if response is None and self.planner_mode:
+                    response = self._plan_step(task, screenshot)
+                elif response is None:
+                    response = self._think_and_decide(task, screenshot, note=self._unchanged_screen_note())
+                
+                # Predict the following step while this one executes
+                if self.speculator is not None:
+                    self._start_speculation(task, screenshot, response)
                 
                 # Step 3: ACT - Execute action
                 success = self._execute_action(response)
                 
+                # Remember the step for the next requests
+                self._record_step(response, success)
+                
                 if not success:
                     self.logger.warning("Action execution failed, but continuing...")
                 
-                # Small delay between iterations
-                time.sleep(0.5)
+                # Give the UI a chance to settle if the action did not wait for it
+                if self.settled_frame is None and not self.task_completed:
+                    self._wait_for_settle(self.iteration_delay)
             
             # Task completion
-            elapsed_time = time.time() - start_time
-            
-            if self.task_completed:
-                result = {
-                    'success': self.task_status == 'success',
-                    'status': self.task_status,
-                    'message': f'Task completed in {self.iteration_count} iterations',
-                    'iterations': self.iteration_count,
-                    'elapsed_time': elapsed_time
-                }
-                self.logger.info(f"\n{'=' * 80}")
-                self.logger.info(f"TASK COMPLETED: {result['message']}")
-                self.logger.info(f"Status: {self.task_status}")
-                self.logger.info(f"Time: {elapsed_time:.2f} seconds")
-                self.logger.info(f"{'=' * 80}\n")
-            else:
-                result = {
-                    'success': False,
-                    'status': 'timeout',
-                    'message': f'Task did not complete within {self.max_iterations} iterations',
-                    'iterations': self.iteration_count,
-                    'elapsed_time': elapsed_time
-                }
-                self.logger.warning(f"\n{'=' * 80}")
-                self.logger.warning(f"TASK TIMEOUT: {result['message']}")
-                self.logger.warning(f"{'=' * 80}\n")
-            
-            return result
+            return self._task_result(start_time)
             
         except KeyboardInterrupt:
             self.logger.info("\nTask interrupted by user")
-            return {
-                'success': False,
-                'status': 'interrupted',
-                'message': 'Task interrupted by user',
-                'iterations': self.iteration_count,
-                'elapsed_time': time.time() - start_time
-            }
+            return self._failure_result('interrupted', 'Task interrupted by user', start_time)
         
         except Exception as e:
             self.logger.error(f"Error during task execution: {e}", exc_info=True)
-            return {
-                'success': False,
-                'status': 'error',
-                'message': f'Error: {str(e)}',
-                'iterations': self.iteration_count,
-                'elapsed_time': time.time() - start_time
-            }
+            return self._failure_result('error', f'Error: {str(e)}', start_time)
+        
+        finally:
+            self._finish_task()
+    
+    def close(self) -> None:
+        """Abort a pending speculative request and stop the speculation thread"""
+        self._discard_speculation('closed')
+        if self._speculation_pool is not None:
+            self._speculation_pool.shutdown(wait=True)
+            self._speculation_pool = None
+        for client in self._model_clients():
+            client.close()
+    
+    def __enter__(self) -> 'SeeThinkActAgent':
+        return self
+    
+    def __exit__(self, *exc) -> None:
+        self.close()
 
 
 def main():
@@ -381,7 +1530,8 @@ def main():
     print("Starting agent... (Press Ctrl+C to stop)\n")
     
     # Run the agent
-    result = agent.run(task)
+    with agent:
+        result = agent.run(task)
     
     # Print results
     print("\n" + "=" * 80)
@@ -37,7 +37,22 @@ def test_imports():
     # Test our custom modules
     custom_modules = [
         ('utils.screenshot_capture', 'Screenshot capture'),
+        ('utils.change_detector', 'Screen change detection'),
+        ('utils.settle_detector', 'UI settle detection'),
         ('utils.ollama_client', 'Ollama client wrapper'),
+        ('utils.ollama_stand_in', 'Scripted Ollama stand-in'),
+        ('utils.planner', 'Task planner and grounding'),
+        ('utils.element_cache', 'UI element location cache'),
+        ('utils.action_parser', 'Tool-call parser'),
+        ('utils.action_assertions', 'Action postconditions'),
+        ('utils.tool_call_stream', 'Streamed tool-call parsing'),
+        ('utils.response_cache', 'Response cache'),
+        ('utils.trajectory_store', 'Trajectory replay'),
+        ('utils.conversation_context', 'Multi-turn context'),
+        ('utils.image_processing', 'Model-aware resizing'),
+        ('utils.image_encoder', 'Screenshot encoders'),
+        ('utils.screenshot_writer', 'Background screenshot writer'),
+        ('utils.session_recorder', 'Session recording'),
         ('utils.action_executor', 'Action executor'),
         ('utils.agent_function_call', 'Function calling'),
     ]
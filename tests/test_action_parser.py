@@ -0,0 +1,138 @@
+"""
+Tests for tool-call parsing of model responses
+"""
+import pytest
+
+from utils.action_parser import Action, loads_lenient, parse_response, parse_text
+
+
+CLICK = {'action': 'left_click', 'coordinate': [512, 384]}
+
+
+def response(content: str = '', tool_calls=None):
+    message = {'role': 'assistant', 'content': content}
+    if tool_calls is not None:
+        message['tool_calls'] = tool_calls
+    return {'message': message}
+
+
+def test_structured_tool_calls():
+    actions = parse_response(response(tool_calls=[
+        {'function': {'name': 'computer_use', 'arguments': CLICK}},
+        {'function': {'name': 'computer_use', 'arguments': {'action': 'type', 'text': 'hi'}}},
+    ]))
+    assert actions == [Action('computer_use', CLICK), Action('computer_use', {'action': 'type', 'text': 'hi'})]
+    assert actions[0].kind == 'left_click'
+    assert actions[0].get('coordinate') == [512, 384]
+
+
+def test_structured_calls_take_precedence_over_text():
+    actions = parse_response(response(
+        '<tool_call>{"name": "computer_use", "arguments": {"action": "wait"}}</tool_call>',
+        [{'function': {'name': 'computer_use', 'arguments': CLICK}}]
+    ))
+    assert [action.kind for action in actions] == ['left_click']
+
+
+def test_string_encoded_arguments():
+    actions = parse_response(response(tool_calls=[
+        {'function': {'name': 'computer_use', 'arguments': '{"action": "left_click", "coordinate": [1, 2]}'}}
+    ]))
+    assert actions == [Action('computer_use', {'action': 'left_click', 'coordinate': [1, 2]})]
+
+
+def test_string_encoded_arguments_in_text():
+    content = '<tool_call>{"name": "computer_use", "arguments": "{\\"action\\": \\"type\\", \\"text\\": \\"it\'s\\"}"}</tool_call>'
+    assert parse_text(content) == [Action('computer_use', {'action': 'type', 'text': "it's"})]
+
+
+def test_mixed_quotes_with_apostrophe():
+    content = "<tool_call>{'name': 'computer_use', 'arguments': {'action': 'type', 'text': \"don't\"}}</tool_call>"
+    assert parse_text(content) == [Action('computer_use', {'action': 'type', 'text': "don't"})]
+
+
+def test_tool_call_blocks():
+    content = (
+        "I'll click the button.\n"
+        '<tool_call>\n{"name": "computer_use", "arguments": {"action": "left_click", "coordinate": [512, 384]}}\n</tool_call>\n'
+        '<tool_call>{"name": "computer_use", "arguments": {"action": "key", "keys": ["enter"]}}</tool_call>\n'
+        "Then I will check the result."
+    )
+    actions = parse_response(response(content))
+    assert [action.kind for action in actions] == ['left_click', 'key']
+    assert actions[1].get('keys') == ['enter']
+
+
+def test_unterminated_tool_call_block():
+    content = '<tool_call>{"name": "computer_use", "arguments": {"action": "scroll", "pixels": -3'
+    assert parse_text(content) == [Action('computer_use', {'action': 'scroll', 'pixels': -3})]
+
+
+def test_single_quotes():
+    content = "<tool_call>{'name': 'computer_use', 'arguments': {'action': 'key', 'keys': ['enter'], 'x': None}}</tool_call>"
+    assert parse_text(content) == [Action('computer_use', {'action': 'key', 'keys': ['enter'], 'x': None})]
+
+
+def test_bare_json():
+    content = 'Next: {"action": "type", "text": "hello"} and done.'
+    assert parse_text(content) == [Action('computer_use', {'action': 'type', 'text': 'hello'})]
+
+
+def test_bare_json_with_function_wrapper():
+    content = 'Calling {"name": "computer_use", "arguments": {"action": "terminate", "status": "success"}}'
+    assert parse_text(content) == [Action('computer_use', {'action': 'terminate', 'status': 'success'})]
+
+
+@pytest.mark.parametrize('content', [
+    "",
+    "The task is already done.",
+    "<tool_call></tool_call>",
+    "<tool_call>not json at all</tool_call>",
+    '{"no_action": true}',
+])
+def test_nothing_parseable(content):
+    assert parse_response(response(content)) == []
+
+
+def test_response_without_message():
+    assert parse_response({}) == []
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('{"a": 1,}', {'a': 1}),
+    ('```json\n{"a": [1, 2,],}\n```', {'a': [1, 2]}),
+    ('{"a": true, "b": null}', {'a': True, 'b': None}),
+    ("{'a': True, 'b': None}", {'a': True, 'b': None}),
+    ("{'a': true, 'b': null}", {'a': True, 'b': None}),
+    ('{"a": {"b": [1', {'a': {'b': [1]}}),
+    ('{"text": "unterminated', {'text': 'unterminated'}),
+])
+def test_loads_lenient_repairs(text, expected):
+    assert loads_lenient(text) == expected
+
+
+@pytest.mark.parametrize('text, expected', [
+    # Apostrophes inside double-quoted strings
+    ('{"text": "don\'t stop"}', {'text': "don't stop"}),
+    ('{"text": "it\'s", "n": [1,]}', {'text': "it's", 'n': [1]}),
+    ('{"text": "it\'s", "n": [1', {'text': "it's", 'n': [1]}),
+    # Escaped apostrophe inside a single-quoted string
+    ("{'text': 'don\\'t stop'}", {'text': "don't stop"}),
+    # Double quotes inside a single-quoted string
+    ("{'text': 'say \"hi\"'}", {'text': 'say "hi"'}),
+    # Repairs never touch string contents
+    ('{"text": "a,}", "b": "true",}', {'text': 'a,}', 'b': 'true'}),
+    ("{'text': 'null, true'}", {'text': 'null, true'}),
+])
+def test_loads_lenient_strings(text, expected):
+    assert loads_lenient(text) == expected
+
+
+def test_loads_lenient_string_encoded_value():
+    # A JSON string holding JSON decodes to the string, not the object
+    assert loads_lenient('"{\\"action\\": \\"wait\\"}"') == '{"action": "wait"}'
+
+
+def test_loads_lenient_failure():
+    with pytest.raises(ValueError):
+        loads_lenient('{"a": }')
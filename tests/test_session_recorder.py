@@ -0,0 +1,105 @@
+"""
+Round-trip tests for the delta-compressed session recorder
+"""
+import struct
+
+import numpy as np
+import pytest
+
+from utils.screenshot_capture import Frame
+from utils.session_recorder import SessionRecorder, SessionReader, KEYFRAME, DELTA, _FOOTER, _RECORD
+
+
+def make_frame(rgb: np.ndarray, timestamp: float) -> Frame:
+    """Frame holding an (h, w, 3) RGB array as a BGRA buffer"""
+    height, width = rgb.shape[:2]
+    bgra = np.empty((height, width, 4), dtype=np.uint8)
+    bgra[..., :3] = rgb[..., ::-1]
+    bgra[..., 3] = 255
+    return Frame(bytearray(bgra.tobytes()), width, height, timestamp=timestamp)
+
+
+@pytest.fixture
+def screens():
+    """RGB screens covering a keyframe, partial-tile changes and a size change"""
+    rng = np.random.default_rng(0)
+    # Sizes that are not multiples of the tile size exercise the edge padding
+    first = rng.integers(0, 256, (70, 100, 3), dtype=np.uint8)
+    partial = first.copy()
+    partial[40:45, 90:97] = [255, 0, 0]
+    resized = rng.integers(0, 256, (90, 130, 3), dtype=np.uint8)
+    after_resize = resized.copy()
+    after_resize[3:9, 3:9] = 0
+    # (iteration, rgb, expected record kind)
+    return [
+        (1, first, KEYFRAME),
+        (2, partial, DELTA),
+        (2, partial, DELTA),
+        (3, resized, KEYFRAME),
+        (4, after_resize, DELTA),
+    ]
+
+
+@pytest.fixture
+def recording(tmp_path, screens):
+    path = tmp_path / "session.strec"
+    with SessionRecorder(path, keyframe_interval=10, tile_size=32) as recorder:
+        for position, (iteration, rgb, _) in enumerate(screens):
+            recorder.record(make_frame(rgb, float(position)), iteration)
+    return path
+
+
+def test_round_trip(recording, screens):
+    with SessionReader(recording) as reader:
+        assert len(reader) == len(screens)
+        assert [entry['kind'] for entry in reader.index] == [kind for _, _, kind in screens]
+        assert reader.iterations == [1, 2, 3, 4]
+        for position, (_, rgb, _) in enumerate(screens):
+            image = reader.read(position)
+            assert image.size == (rgb.shape[1], rgb.shape[0])
+            assert image.tobytes() == rgb.tobytes()
+
+
+def test_read_iteration_returns_last_frame(recording, screens):
+    with SessionReader(recording) as reader:
+        assert reader.read_iteration(2).tobytes() == screens[2][1].tobytes()
+        assert reader.read_iteration(4).tobytes() == screens[4][1].tobytes()
+        with pytest.raises(KeyError):
+            reader.read_iteration(5)
+
+
+def test_random_access_out_of_order(recording, screens):
+    with SessionReader(recording) as reader:
+        for position in (4, 1, 3, 0, 2):
+            assert reader.read(position).tobytes() == screens[position][1].tobytes()
+
+
+def test_rescan_without_index(recording, screens):
+    data = recording.read_bytes()
+    index_offset, _ = _FOOTER.unpack(data[-_FOOTER.size:])
+    recording.write_bytes(data[:index_offset])
+    
+    with SessionReader(recording) as reader:
+        assert len(reader) == len(screens)
+        for position, (_, rgb, _) in enumerate(screens):
+            assert reader.read(position).tobytes() == rgb.tobytes()
+
+
+def test_rescan_drops_truncated_record(recording, screens):
+    data = recording.read_bytes()
+    with SessionReader(recording) as reader:
+        last_offset = reader.index[-1]['offset']
+    # Cut the last record in the middle of its payload
+    recording.write_bytes(data[:last_offset + _RECORD.size + 5])
+    
+    with SessionReader(recording) as reader:
+        assert len(reader) == len(screens) - 1
+        for position, (_, rgb, _) in enumerate(screens[:-1]):
+            assert reader.read(position).tobytes() == rgb.tobytes()
+
+
+def test_rejects_other_files(tmp_path):
+    path = tmp_path / "other.bin"
+    path.write_bytes(struct.pack('<8s', b'NOTAREC!'))
+    with pytest.raises(ValueError):
+        SessionReader(path)
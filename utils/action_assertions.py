@@ -0,0 +1,234 @@
+"""
+Postconditions for action chunks
+The model may return several tool calls at once and attach cheap checks to
+each ("expect"). The agent evaluates them locally on the settled frame and
+its tile diff against the frame before the action, and only goes back to the
+model when a check fails or the chunk ends.
+"""
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from utils.change_detector import ChangeResult
+from utils.screenshot_capture import Frame
+from utils.speculation import COORDINATE_SCALE
+
+
+SCREEN_CHANGED = 'screen_changed'
+REGION_CHANGED = 'region_changed'
+PIXEL_COLOR = 'pixel_color'
+
+# Largest per-channel difference for a pixel_color check to pass
+DEFAULT_COLOR_TOLERANCE = 24
+
+# Added to the computer_use parameters when postconditions are enabled
+EXPECT_PARAMETER = {
+    "description": (
+        "Optional checks that must hold once the UI has settled after this action; the remaining "
+        "actions of the response are skipped if one fails. A list of objects: "
+        "{\"type\": \"screen_changed\"}, "
+        "{\"type\": \"region_changed\", \"region\": [x1, y1, x2, y2]}, "
+        "{\"type\": \"pixel_color\", \"coordinate\": [x, y], \"color\": \"#RRGGBB\"}."
+    ),
+    "type": "array",
+}
+
+# Appended to the system prompt so the model knows it may chain actions
+CHUNK_INSTRUCTION = """
+When the next few actions do not depend on seeing the result of each other
+(e.g. type a query, press enter, wait), return them together as several tool
+calls in one response. Give each action an "expect" list with the checks that
+show it worked (screen_changed, region_changed, pixel_color); you will get a new
+screenshot when a check fails or after the last action.
+"""
+
+
+class Assertion:
+    """One postcondition of an action"""
+    
+    __slots__ = ('kind', 'region', 'coordinate', 'color', 'tolerance')
+    
+    def __init__(self,
+                 kind: str,
+                 region: Optional[Tuple[int, int, int, int]] = None,
+                 coordinate: Optional[Tuple[int, int]] = None,
+                 color: Optional[Tuple[int, int, int]] = None,
+                 tolerance: int = DEFAULT_COLOR_TOLERANCE):
+        """
+        Args:
+            kind: SCREEN_CHANGED, REGION_CHANGED or PIXEL_COLOR
+            region: (x1, y1, x2, y2) in model coordinates (region_changed)
+            coordinate: (x, y) in model coordinates (pixel_color)
+            color: Expected (r, g, b) (pixel_color)
+            tolerance: Largest per-channel difference (pixel_color)
+        """
+        self.kind = kind
+        self.region = region
+        self.coordinate = coordinate
+        self.color = color
+        self.tolerance = tolerance
+    
+    def describe(self) -> str:
+        if self.kind == REGION_CHANGED:
+            return f"change in region {list(self.region)}"
+        if self.kind == PIXEL_COLOR:
+            return f"color #{bytes(self.color).hex()} at {list(self.coordinate)}"
+        return "screen change"
+    
+    def __repr__(self) -> str:
+        return f"Assertion({self.describe()!r})"
+
+
+def _numbers(value: Any, count: int, name: str) -> Tuple[int, ...]:
+    if not isinstance(value, (list, tuple)) or len(value) != count:
+        raise ValueError(f"{name} needs {count} numbers, got {value!r}")
+    return tuple(int(round(float(number))) for number in value)
+
+
+def _color(value: Any) -> Tuple[int, int, int]:
+    if isinstance(value, str):
+        text = value.lstrip('#')
+        if len(text) != 6:
+            raise ValueError(f"color must be #RRGGBB, got {value!r}")
+        return tuple(bytes.fromhex(text))
+    return _numbers(value, 3, 'color')
+
+
+def parse_assertion(spec: Any) -> Assertion:
+    """
+    Parse one entry of an action's "expect" list
+    
+    Args:
+        spec: {"type": ...} object, or just the type name
+    
+    Returns:
+        Assertion
+    
+    Raises:
+        ValueError: Unknown type or missing/malformed fields
+    """
+    if isinstance(spec, str):
+        spec = {'type': spec}
+    if not isinstance(spec, dict):
+        raise ValueError(f"Unsupported postcondition: {spec!r}")
+    kind = spec.get('type')
+    if kind == SCREEN_CHANGED:
+        return Assertion(kind)
+    if kind == REGION_CHANGED:
+        return Assertion(kind, region=_numbers(spec.get('region'), 4, 'region'))
+    if kind == PIXEL_COLOR:
+        return Assertion(
+            kind,
+            coordinate=_numbers(spec.get('coordinate'), 2, 'coordinate'),
+            color=_color(spec.get('color')),
+            tolerance=int(spec.get('tolerance', DEFAULT_COLOR_TOLERANCE))
+        )
+    raise ValueError(f"Unknown postcondition type: {kind!r}")
+
+
+def parse_assertions(arguments: Dict[str, Any]) -> List[Assertion]:
+    """
+    Parse the "expect" argument of an action
+    
+    Args:
+        arguments: Tool call arguments
+    
+    Returns:
+        Assertions in order (empty if the action has none)
+    
+    Raises:
+        ValueError: An entry could not be parsed
+    """
+    expect = arguments.get('expect')
+    if not expect:
+        return []
+    if not isinstance(expect, list):
+        expect = [expect]
+    return [parse_assertion(spec) for spec in expect]
+
+
+def _to_pixel(x: int, y: int, frame_size: Tuple[int, int]) -> Tuple[int, int]:
+    width, height = frame_size
+    px = min(max(int(x * width / COORDINATE_SCALE), 0), width - 1)
+    py = min(max(int(y * height / COORDINATE_SCALE), 0), height - 1)
+    return px, py
+
+
+def check_assertion(assertion: Assertion, change: ChangeResult, frame: Frame) -> bool:
+    """
+    Evaluate a postcondition
+    
+    Args:
+        assertion: Postcondition to check
+        change: Tile diff between the frame before the action and frame
+        frame: Settled frame after the action
+    
+    Returns:
+        True if the postcondition holds
+    """
+    if assertion.kind == SCREEN_CHANGED:
+        return change.changed
+    
+    if assertion.kind == REGION_CHANGED:
+        x1, y1, x2, y2 = assertion.region
+        left, top = _to_pixel(min(x1, x2), min(y1, y2), change.frame_size)
+        right, bottom = _to_pixel(max(x1, x2), max(y1, y2), change.frame_size)
+        tile = change.tile_size
+        return bool(change.dirty_mask[top // tile:bottom // tile + 1, left // tile:right // tile + 1].any())
+    
+    x, y = _to_pixel(*assertion.coordinate, frame.size)
+    actual = frame.bgra[y, x, 2::-1].astype(np.int16)
+    return int(np.abs(actual - np.array(assertion.color, dtype=np.int16)).max()) <= assertion.tolerance
+
+
+class PostconditionChecker:
+    """Checks the postconditions of executed actions and counts the outcomes"""
+    
+    def __init__(self):
+        self.reset()
+    
+    def reset(self) -> None:
+        """Clear the statistics"""
+        self.checked = Counter()
+        self.failed = Counter()
+        self.invalid = 0
+        self.chunks = 0
+        self.chunk_actions = 0
+    
+    def record_chunk(self, actions: int) -> None:
+        """Count a response executed as a chunk of several actions"""
+        if actions > 1:
+            self.chunks += 1
+            self.chunk_actions += actions
+    
+    def check(self, assertions: List[Assertion], change: ChangeResult, frame: Frame) -> Optional[Assertion]:
+        """
+        Evaluate the postconditions of one action
+        
+        Args:
+            assertions: Postconditions of the action
+            change: Tile diff against the frame before the action
+            frame: Settled frame after the action
+        
+        Returns:
+            The first postcondition that does not hold, or None
+        """
+        for assertion in assertions:
+            self.checked[assertion.kind] += 1
+            if not check_assertion(assertion, change, frame):
+                self.failed[assertion.kind] += 1
+                return assertion
+        return None
+    
+    def stats(self) -> Dict[str, Any]:
+        """Checks by type, failures, malformed entries and chunk sizes"""
+        return {
+            'chunks': self.chunks,
+            'mean_chunk_actions': self.chunk_actions / self.chunks if self.chunks else None,
+            'checked': sum(self.checked.values()),
+            'failed': sum(self.failed.values()),
+            'checked_by_type': dict(self.checked),
+            'failed_by_type': dict(self.failed),
+            'invalid': self.invalid,
+        }
@@ -8,6 +8,8 @@ import subprocess
 from typing import Tuple, Optional, List
 import logging
 
+from utils.action_parser import Action, parse_response
+
 # Configure pyautogui
 pyautogui.FAILSAFE = True  # Move mouse to top-left corner to abort
 pyautogui.PAUSE = 0.5  # Small pause between actions
@@ -16,18 +18,23 @@ pyautogui.PAUSE = 0.5  # Small pause between actions
 class ActionExecutor:
     """Executes computer actions on Windows 11"""
     
-    def __init__(self, screen_width: int = 1920, screen_height: int = 1080):
+    def __init__(self, screen_width: int = 1920, screen_height: int = 1080,
+                 pause: Optional[float] = None):
         """
         Initialize action executor
         
         Args:
             screen_width: Screen width in pixels
             screen_height: Screen height in pixels
+            pause: Override for the pause pyautogui inserts after every call (seconds)
         """
         self.screen_width = screen_width
         self.screen_height = screen_height
         self.logger = logging.getLogger(__name__)
         
+        if pause is not None:
+            pyautogui.PAUSE = pause
+        
         # Get actual screen size
         actual_width, actual_height = pyautogui.size()
         self.logger.info(f"Screen size: {actual_width}x{actual_height}")
@@ -220,36 +227,48 @@ class ActionExecutor:
         time.sleep(seconds)
         return True
     
-    def execute_computer_use_action(self, action: dict) -> bool:
+    def execute(self, action: Action) -> bool:
         """
-        Execute a computer use action from the model
+        Execute a parsed action
         
         Args:
-            action: Action dictionary with 'name' and 'arguments'
+            action: Action from utils.action_parser
             
         Returns:
             True if successful
         """
         try:
-            action_name = action.get('name') or action.get('function', {}).get('name')
-            arguments = action.get('arguments') or action.get('function', {}).get('arguments', {})
-            
-            if isinstance(arguments, str):
-                import json
-                arguments = json.loads(arguments)
+            self.logger.info(f"Executing action: {action.name} with args: {action.arguments}")
             
-            self.logger.info(f"Executing action: {action_name} with args: {arguments}")
-            
-            if action_name in ['computer', 'computer_use']:
-                return self._execute_computer_action(arguments)
+            if action.name in ['computer', 'computer_use']:
+                return self._execute_computer_action(action.arguments)
             else:
-                self.logger.warning(f"Unknown action: {action_name}")
+                self.logger.warning(f"Unknown action: {action.name}")
                 return False
                 
         except Exception as e:
             self.logger.error(f"Error executing action: {e}")
             return False
     
+    def execute_computer_use_action(self, action: dict) -> bool:
+        """
+        Execute a computer use action from the model
+        
+        Args:
+            action: Action dictionary with 'name' and 'arguments' (or an
+                ollama-style {'function': {...}} tool call)
+        
+        Returns:
+            True if successful
+        """
+        if 'function' not in action:
+            action = {'function': action}
+        parsed = parse_response({'message': {'tool_calls': [action]}})
+        if not parsed:
+            self.logger.error(f"Could not parse action: {action}")
+            return False
+        return self.execute(parsed[0])
+    
     def _execute_computer_action(self, args: dict) -> bool:
         """
         Execute a computer action
@@ -0,0 +1,268 @@
+"""
+Tool-call parsing for model responses
+Turns a chat response into a list of Action objects in one pass: structured
+tool_calls, <tool_call> blocks (several, unterminated, or with trailing text)
+and bare JSON, repairing common JSON defects instead of asking the model again
+"""
+import re
+import ast
+import json
+from typing import Any, Dict, List, Optional
+
+
+class Action:
+    """One tool call: function name, action type and arguments"""
+    
+    __slots__ = ('name', 'kind', 'arguments')
+    
+    def __init__(self, name: str, arguments: Dict[str, Any]):
+        """
+        Args:
+            name: Tool function name (e.g. 'computer_use')
+            arguments: Tool arguments; arguments['action'] is the action type
+        """
+        self.name = name
+        self.arguments = arguments
+        self.kind = arguments.get('action')
+    
+    def get(self, key: str, default: Any = None) -> Any:
+        """Argument value by name"""
+        return self.arguments.get(key, default)
+    
+    def to_tool_call(self) -> Dict[str, Any]:
+        """Plain {'name', 'arguments'} dictionary"""
+        return {'name': self.name, 'arguments': self.arguments}
+    
+    def __eq__(self, other) -> bool:
+        return isinstance(other, Action) and self.name == other.name and self.arguments == other.arguments
+    
+    def __repr__(self) -> str:
+        return f"Action({self.name!r}, {self.arguments!r})"
+
+
+TOOL_CALL_OPEN = '<tool_call>'
+TOOL_CALL_CLOSE = '</tool_call>'
+
+# Quoted strings are matched first so the repairs below never touch their contents
+_STRING = r'"(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\''
+_TRAILING_COMMA = re.compile(rf'({_STRING})|,\s*(?=[}}\]])')
+_JSON_LITERAL = re.compile(rf'({_STRING})|\b(true|false|null)\b')
+_PYTHON_LITERALS = {'true': 'True', 'false': 'False', 'null': 'None'}
+
+
+def _strip_trailing_commas(text: str) -> str:
+    return _TRAILING_COMMA.sub(lambda m: m.group(1) or '', text)
+
+
+def _close_brackets(text: str) -> str:
+    """Append closers for brackets left open (e.g. generation stopped early)"""
+    stack = []
+    quote = None
+    escaped = False
+    for char in text:
+        if quote:
+            if escaped:
+                escaped = False
+            elif char == '\\':
+                escaped = True
+            elif char == quote:
+                quote = None
+        elif char in '"\'':
+            quote = char
+        elif char in '{[':
+            stack.append('}' if char == '{' else ']')
+        elif char in '}]' and stack:
+            stack.pop()
+    return text + (quote or '') + ''.join(reversed(stack))
+
+
+def loads_lenient(text: str) -> Any:
+    """
+    json.loads that tolerates common model output defects
+    
+    Handles code fences, trailing commas, single-quoted strings, Python
+    literals (True/None) and unclosed brackets.
+    
+    Args:
+        text: JSON-ish text
+    
+    Returns:
+        Decoded value
+    
+    Raises:
+        ValueError: The text could not be repaired
+    """
+    text = text.strip()
+    if text.startswith('```'):
+        text = text.strip('`')
+        if text.startswith('json'):
+            text = text[4:]
+        text = text.strip()
+    
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        pass
+    
+    for candidate in (text, _close_brackets(text)):
+        candidate = _strip_trailing_commas(candidate)
+        try:
+            return json.loads(candidate)
+        except json.JSONDecodeError:
+            pass
+        # Single quotes / Python literals: let the Python parser read it
+        python_text = _JSON_LITERAL.sub(lambda m: m.group(1) or _PYTHON_LITERALS[m.group(2)], candidate)
+        try:
+            return ast.literal_eval(python_text)
+        except (ValueError, SyntaxError, MemoryError, RecursionError):
+            pass
+    
+    raise ValueError(f"Could not parse tool call JSON: {text[:200]!r}")
+
+
+def _json_objects(text: str) -> List[str]:
+    """Top-level {...} spans in free text (an unclosed last span is included)"""
+    spans = []
+    depth = 0
+    start = None
+    quote = None
+    escaped = False
+    for index, char in enumerate(text):
+        if quote:
+            if escaped:
+                escaped = False
+            elif char == '\\':
+                escaped = True
+            elif char == quote:
+                quote = None
+        elif char == '"':
+            quote = char
+        elif char == '{':
+            if depth == 0:
+                start = index
+            depth += 1
+        elif char == '}' and depth:
+            depth -= 1
+            if depth == 0:
+                spans.append(text[start:index + 1])
+    if depth and start is not None:
+        spans.append(text[start:])
+    return spans
+
+
+def _to_action(call: Any, default_name: str = 'computer_use') -> Optional[Action]:
+    """Normalize one decoded tool call into an Action"""
+    if not isinstance(call, dict) and hasattr(call, 'get'):
+        # ollama Message.ToolCall
+        function = call.get('function')
+        call = {'function': {'name': function.get('name'), 'arguments': function.get('arguments')}}
+    if not isinstance(call, dict):
+        return None
+    if 'function' in call and isinstance(call['function'], dict):
+        call = call['function']
+    
+    arguments = call.get('arguments', call.get('parameters'))
+    if arguments is None and 'action' in call:
+        # Bare arguments without the function wrapper
+        return Action(default_name, dict(call))
+    if isinstance(arguments, str):
+        try:
+            arguments = loads_lenient(arguments)
+        except ValueError:
+            return None
+    if not isinstance(arguments, dict):
+        return None
+    return Action(call.get('name') or default_name, dict(arguments))
+
+
+def parse_text(content: str) -> List[Action]:
+    """
+    Parse actions from response text
+    
+    Args:
+        content: Message content
+    
+    Returns:
+        Actions from every <tool_call> block, or from bare JSON objects when
+        there are no blocks
+    """
+    if TOOL_CALL_OPEN in content:
+        bodies = []
+        for block in content.split(TOOL_CALL_OPEN)[1:]:
+            body = block.split(TOOL_CALL_CLOSE, 1)[0]
+            if body.strip():
+                bodies.append(body)
+    else:
+        bodies = _json_objects(content)
+    
+    actions = []
+    for body in bodies:
+        try:
+            decoded = loads_lenient(body)
+        except ValueError:
+            continue
+        for call in decoded if isinstance(decoded, list) else [decoded]:
+            action = _to_action(call)
+            if action is not None:
+                actions.append(action)
+    return actions
+
+
+def parse_response(response: Any) -> List[Action]:
+    """
+    Parse every tool call of a chat response, in order
+    
+    Args:
+        response: Ollama ChatResponse or response dictionary
+    
+    Returns:
+        List of actions (empty if the response contains none)
+    """
+    message = response.get('message') if hasattr(response, 'get') else None
+    if not message:
+        return []
+    
+    actions = []
+    for call in message.get('tool_calls') or []:
+        action = _to_action(call)
+        if action is not None:
+            actions.append(action)
+    if actions:
+        return actions
+    
+    return parse_text(message.get('content') or '')
+
+
+if __name__ == "__main__":
+    import argparse
+    import timeit
+    
+    parser = argparse.ArgumentParser(description="Microbenchmark of the tool-call parser.")
+    parser.add_argument("--number", type=int, default=20000, help="Parses per sample")
+    args = parser.parse_args()
+    
+    call = '{"name": "computer_use", "arguments": {"action": "left_click", "coordinate": [512, 384]}}'
+    samples = {
+        'structured': {'message': {'content': '', 'tool_calls': [
+            {'function': {'name': 'computer_use', 'arguments': {'action': 'left_click', 'coordinate': [512, 384]}}}
+        ]}},
+        'text block': {'message': {'content': f"I'll click the button.\n<tool_call>\n{call}\n</tool_call>"}},
+        'three blocks': {'message': {'content': "".join(
+            f"<tool_call>{call}</tool_call>\n" for _ in range(3)
+        ) + "Then I will check the result."}},
+        'trailing comma': {'message': {'content': (
+            '<tool_call>{"name": "computer_use", "arguments": {"action": "type", "text": "hi",},}</tool_call>'
+        )}},
+        'single quotes': {'message': {'content': (
+            "<tool_call>{'name': 'computer_use', 'arguments': {'action': 'key', 'text': 'enter'}}</tool_call>"
+        )}},
+        'unterminated': {'message': {'content': (
+            '<tool_call>{"name": "computer_use", "arguments": {"action": "scroll", "scroll_amount": -3'
+        )}},
+    }
+    
+    print(f"{'sample':16s} {'actions':>7s} {'us/parse':>10s}")
+    for label, response in samples.items():
+        actions = parse_response(response)
+        seconds = timeit.timeit(lambda: parse_response(response), number=args.number)
+        print(f"{label:16s} {len(actions):7d} {seconds / args.number * 1e6:10.1f}")
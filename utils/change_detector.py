@@ -0,0 +1,175 @@
+"""
+Screen change detection for the See-Think-Act loop
+Compares frames tile by tile with vectorized NumPy hashing
+"""
+import numpy as np
+from typing import List, Optional, Tuple
+
+from utils.screenshot_capture import Frame
+
+
+class ChangeResult:
+    """Outcome of comparing a frame against the previous one"""
+    
+    __slots__ = ('changed', 'dirty_mask', 'tile_size', 'frame_size')
+    
+    def __init__(self,
+                 changed: bool,
+                 dirty_mask: np.ndarray,
+                 tile_size: int,
+                 frame_size: Tuple[int, int]):
+        """
+        Args:
+            changed: Whether the frame differs from the previous one
+            dirty_mask: (tiles_y, tiles_x) bool array of changed tiles
+            tile_size: Tile edge length in pixels
+            frame_size: Frame size as (width, height)
+        """
+        self.changed = changed
+        self.dirty_mask = dirty_mask
+        self.tile_size = tile_size
+        self.frame_size = frame_size
+    
+    @property
+    def changed_fraction(self) -> float:
+        """Fraction of tiles that changed (0-1)"""
+        if self.dirty_mask.size == 0:
+            return 0.0
+        return float(self.dirty_mask.mean())
+    
+    @property
+    def dirty_regions(self) -> List[Tuple[int, int, int, int]]:
+        """Changed tiles as (left, top, width, height) pixel boxes"""
+        width, height = self.frame_size
+        size = self.tile_size
+        regions = []
+        for ty, tx in zip(*np.nonzero(self.dirty_mask)):
+            left, top = int(tx) * size, int(ty) * size
+            regions.append((left, top, min(size, width - left), min(size, height - top)))
+        return regions
+    
+    @property
+    def bounding_box(self) -> Optional[Tuple[int, int, int, int]]:
+        """Union of all dirty tiles as (left, top, width, height), or None"""
+        if not self.dirty_mask.any():
+            return None
+        width, height = self.frame_size
+        size = self.tile_size
+        rows = np.nonzero(self.dirty_mask.any(axis=1))[0]
+        cols = np.nonzero(self.dirty_mask.any(axis=0))[0]
+        left, top = int(cols[0]) * size, int(rows[0]) * size
+        right = min(width, (int(cols[-1]) + 1) * size)
+        bottom = min(height, (int(rows[-1]) + 1) * size)
+        return left, top, right - left, bottom - top
+    
+    def __repr__(self) -> str:
+        return (f"ChangeResult(changed={self.changed}, "
+                f"dirty_tiles={int(self.dirty_mask.sum())}/{self.dirty_mask.size})")
+
+
+class ChangeDetector:
+    """
+    Detects whether the screen changed between frames, and where
+    
+    Each frame is reduced to one 64-bit signature per tile: the 32-bit BGRA
+    pixels of the tile are multiplied by fixed random weights and summed.
+    Only the signature grid of the previous frame is kept, never its pixels.
+    """
+    
+    def __init__(self, tile_size: int = 32, min_changed_tiles: int = 1, seed: int = 0x5EE):
+        """
+        Initialize change detector
+        
+        Args:
+            tile_size: Tile edge length in pixels
+            min_changed_tiles: Dirty tiles needed to report a change
+                (raise to ignore e.g. a blinking caret)
+            seed: Seed for the tile hashing weights
+        """
+        self.tile_size = tile_size
+        self.min_changed_tiles = min_changed_tiles
+        self._weights = np.random.default_rng(seed).integers(
+            1, 2 ** 63, size=(tile_size, tile_size), dtype=np.uint64
+        ) | np.uint64(1)
+        self._previous: Optional[np.ndarray] = None
+    
+    def _hash_tiles(self, pixels: np.ndarray) -> np.ndarray:
+        """Signatures of a uint32 pixel block whose sides are multiples of the tile size"""
+        size = self.tile_size
+        tiles = pixels.reshape(pixels.shape[0] // size, size, pixels.shape[1] // size, size)
+        # einsum widens to uint64 in small buffers instead of copying the whole block
+        return np.einsum('ijkl,jl->ik', tiles, self._weights, dtype=np.uint64)
+    
+    def _hash_edge(self, pixels: np.ndarray) -> np.ndarray:
+        """Signatures of a strip of partial edge tiles (zero-padded; strips are small)"""
+        size = self.tile_size
+        pad_y = -pixels.shape[0] % size
+        pad_x = -pixels.shape[1] % size
+        return self._hash_tiles(np.pad(pixels, ((0, pad_y), (0, pad_x))))
+    
+    def signature(self, frame: Frame) -> np.ndarray:
+        """
+        Compute the tile signature grid of a frame
+        
+        Args:
+            frame: Frame to hash
+        
+        Returns:
+            (tiles_y, tiles_x) uint64 array
+        """
+        size = self.tile_size
+        pixels = frame.bgra.view(np.uint32).reshape(frame.height, frame.width)
+        full_y = frame.height // size
+        full_x = frame.width // size
+        tiles_y = -(-frame.height // size)
+        tiles_x = -(-frame.width // size)
+        
+        signature = np.empty((tiles_y, tiles_x), dtype=np.uint64)
+        signature[:full_y, :full_x] = self._hash_tiles(pixels[:full_y * size, :full_x * size])
+        if full_x < tiles_x:
+            # Right column of partial tiles, including the bottom-right corner
+            signature[:, full_x:] = self._hash_edge(pixels[:, full_x * size:])
+        if full_y < tiles_y:
+            signature[full_y:, :full_x] = self._hash_edge(pixels[full_y * size:, :full_x * size])
+        return signature
+    
+    def compare(self, frame: Frame, previous: Optional[np.ndarray]) -> Tuple[ChangeResult, np.ndarray]:
+        """
+        Compare a frame against an explicit signature grid
+        
+        Args:
+            frame: Current frame
+            previous: Signature grid from signature(), or None
+        
+        Returns:
+            Tuple of (ChangeResult, signature grid of frame)
+        """
+        current = self.signature(frame)
+        if previous is None or previous.shape != current.shape:
+            dirty = np.ones(current.shape, dtype=bool)
+        else:
+            dirty = current != previous
+        changed = int(dirty.sum()) >= self.min_changed_tiles
+        return ChangeResult(changed, dirty, self.tile_size, frame.size), current
+    
+    def update(self, frame: Frame) -> ChangeResult:
+        """
+        Compare a frame against the previously seen one and remember it
+        
+        Args:
+            frame: Current frame
+        
+        Returns:
+            ChangeResult (the first frame always reports changed)
+        """
+        result, self._previous = self.compare(frame, self._previous)
+        return result
+    
+    @property
+    def previous_signature(self) -> Optional[np.ndarray]:
+        """Signature grid of the last frame passed to update(), if any"""
+        return self._previous
+    
+    def reset(self) -> None:
+        """Forget the previous frame"""
+        self._previous = None
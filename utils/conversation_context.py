@@ -0,0 +1,275 @@
+"""
+Bounded multi-turn context for the agent
+Keeps a ring of recent steps (spilling older ones to disk), summarizes what
+falls out of the text window, and builds prompt history within a token and
+image budget
+"""
+import json
+import logging
+from collections import Counter, deque
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+from utils.response_cache import to_plain
+
+
+# Rough text token estimate (characters per token)
+CHARS_PER_TOKEN = 4
+
+
+class HistoryRing:
+    """Fixed-size in-memory history; entries pushed out are appended to a JSONL file"""
+    
+    def __init__(self, capacity: int = 50, spill_path: Optional[Union[str, Path]] = None):
+        """
+        Initialize the ring
+        
+        Args:
+            capacity: Entries kept in memory
+            spill_path: JSONL file receiving evicted entries (None = discard);
+                'image' fields are not written
+        """
+        self.capacity = capacity
+        self.spill_path = Path(spill_path) if spill_path is not None else None
+        self.spilled = 0
+        self._entries = deque()
+        self._file = None
+    
+    def append(self, entry: Dict[str, Any]) -> None:
+        """Add an entry, spilling the oldest one when the ring is full"""
+        self._entries.append(entry)
+        while len(self._entries) > self.capacity:
+            self._spill(self._entries.popleft())
+    
+    def _spill(self, entry: Dict[str, Any]) -> None:
+        self.spilled += 1
+        if self.spill_path is not None:
+            self._write(entry)
+    
+    def _write(self, entry: Dict[str, Any]) -> None:
+        if self._file is None:
+            self._file = open(self.spill_path, 'a', encoding='utf-8')
+        record = {key: value for key, value in entry.items() if key != 'image'}
+        self._file.write(json.dumps(to_plain(record), default=str) + '\n')
+    
+    def flush(self) -> None:
+        """Also write the entries still in memory to the spill file (they stay in memory), then close it"""
+        if self.spill_path is not None:
+            for entry in self._entries:
+                self._write(entry)
+        self.close()
+    
+    def close(self) -> None:
+        """Close the spill file"""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+    
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        return iter(self._entries)
+    
+    def __getitem__(self, index: int) -> Dict[str, Any]:
+        return self._entries[index]
+    
+    def recent(self, count: int) -> List[Dict[str, Any]]:
+        """Last count entries, oldest first"""
+        if count <= 0:
+            return []
+        return list(self._entries)[-count:]
+
+
+class ConversationContext:
+    """
+    Step history sent back to the model
+    
+    The last text_steps steps are described as one compact line each (action
+    and outcome); older steps are folded into a one-line summary. The
+    screenshots of the last image_steps steps are replayed as prior turns.
+    build() drops images, then the oldest lines, until the estimate fits the
+    token budget.
+    """
+    
+    def __init__(self,
+                 text_steps: int = 8,
+                 image_steps: int = 1,
+                 token_budget: int = 16000,
+                 history_size: int = 50,
+                 spill_path: Optional[Union[str, Path]] = None):
+        """
+        Initialize the context
+        
+        Args:
+            text_steps: Recent steps described as text
+            image_steps: Recent steps whose screenshots are resent
+            token_budget: Estimated tokens available for history plus the
+                current request
+            history_size: Steps kept in memory
+            spill_path: JSONL file for steps evicted from memory
+        """
+        self.text_steps = text_steps
+        self.image_steps = image_steps
+        self.token_budget = token_budget
+        self.history = HistoryRing(max(history_size, text_steps + 1, image_steps + 1), spill_path)
+        self.logger = logging.getLogger(__name__)
+        
+        self._steps = 0
+        self._summary_actions = Counter()
+        self._summary_failures = 0
+        self._summary_unchanged = 0
+        self._summary_first = None
+        self._summary_last = None
+    
+    def add_step(self,
+                 iteration: int,
+                 action: Optional[Dict[str, Any]],
+                 success: bool,
+                 response: Any = None,
+                 image: Optional[bytes] = None,
+                 image_tokens: int = 0) -> None:
+        """
+        Record a completed step
+        
+        Args:
+            iteration: Agent iteration
+            action: Action arguments (None if the model gave no action)
+            success: Whether execution succeeded
+            response: Raw model response (kept in the history ring)
+            image: Encoded screenshot the decision was made on
+            image_tokens: Estimated visual tokens of that screenshot
+        """
+        self.history.append({
+            'iteration': iteration,
+            'action': action,
+            'success': success,
+            'changed': None,
+            'response': response,
+            'image': image,
+            'image_tokens': image_tokens,
+        })
+        self._steps += 1
+        
+        # Fold the step that just left the text window into the summary
+        if self._steps > self.text_steps and len(self.history) > self.text_steps:
+            self._summarize(self.history[-(self.text_steps + 1)])
+        
+        # Only the most recent screenshots are ever resent
+        if len(self.history) > self.image_steps:
+            self.history[-(self.image_steps + 1)]['image'] = None
+    
+    def _summarize(self, step: Dict[str, Any]) -> None:
+        name = (step['action'] or {}).get('action', 'none')
+        self._summary_actions[name] += 1
+        self._summary_failures += not step['success']
+        self._summary_unchanged += step['changed'] is False
+        if self._summary_first is None:
+            self._summary_first = step['iteration']
+        self._summary_last = step['iteration']
+    
+    def mark_outcome(self, changed: bool) -> None:
+        """Record whether the screen changed after the latest step"""
+        if len(self.history) and self.history[-1]['changed'] is None:
+            self.history[-1]['changed'] = changed
+    
+    @staticmethod
+    def describe(step: Dict[str, Any]) -> str:
+        """One-line description of a step"""
+        action = step['action']
+        if not action:
+            text = "no action"
+        else:
+            params = ", ".join(f"{k}={json.dumps(v)}" for k, v in action.items() if k != 'action')
+            text = f"{action.get('action')}({params})"
+        if not step['success']:
+            outcome = "failed"
+        elif step['changed'] is None:
+            outcome = "done"
+        else:
+            outcome = "screen changed" if step['changed'] else "screen unchanged"
+        return f"Step {step['iteration']}: {text} -> {outcome}"
+    
+    def summary(self, dropped: Sequence[Dict[str, Any]] = ()) -> Optional[str]:
+        """
+        One-line summary of the steps outside the text window
+        
+        Args:
+            dropped: Steps of the text window left out to fit the token
+                budget; they are counted in the summary as well
+        
+        Returns:
+            Summary text, or None if there is nothing to summarize
+        """
+        actions = Counter(self._summary_actions)
+        failures = self._summary_failures
+        unchanged = self._summary_unchanged
+        first, last = self._summary_first, self._summary_last
+        for step in dropped:
+            actions[(step['action'] or {}).get('action', 'none')] += 1
+            failures += not step['success']
+            unchanged += step['changed'] is False
+            if first is None:
+                first = step['iteration']
+            last = step['iteration']
+        if first is None:
+            return None
+        counts = ", ".join(f"{count} {name}" for name, count in actions.most_common())
+        text = f"Steps {first}-{last}: {counts}"
+        if failures:
+            text += f"; {failures} failed"
+        if unchanged:
+            text += f"; {unchanged} without visible effect"
+        return text
+    
+    def build(self, reserved_tokens: int = 0) -> Tuple[Optional[str], List[Dict[str, Any]]]:
+        """
+        Build the history for the next request
+        
+        Args:
+            reserved_tokens: Estimated tokens of the current request (prompt,
+                tools and screenshot) that must fit alongside the history
+        
+        Returns:
+            (history text for the user prompt or None, prior image turns as
+            chat messages)
+        """
+        steps = self.history.recent(self.text_steps)
+        image_steps = [step for step in steps[-self.image_steps:] if step['image']] if self.image_steps else []
+        dropped = []
+        summary = self.summary()
+        
+        def cost() -> int:
+            text = "\n".join(self.describe(step) for step in steps) + (summary or "")
+            return len(text) // CHARS_PER_TOKEN + sum(step['image_tokens'] for step in image_steps)
+        
+        available = self.token_budget - reserved_tokens
+        while image_steps and cost() > available:
+            image_steps.pop(0)
+        # Steps that do not fit are folded into the summary, so the history has no gap
+        while steps and cost() > available:
+            dropped.append(steps.pop(0))
+            summary = self.summary(dropped)
+        
+        lines = []
+        if summary:
+            lines.append(f"Earlier: {summary}")
+        lines.extend(self.describe(step) for step in steps)
+        text = "Previous steps:\n" + "\n".join(lines) if lines else None
+        
+        messages = []
+        for step in image_steps:
+            messages.append({
+                'role': 'user',
+                'content': f"Screen before step {step['iteration']}",
+                'images': [step['image']]
+            })
+            messages.append({
+                'role': 'assistant',
+                'content': json.dumps(step['action']) if step['action'] else "(no action)"
+            })
+        return text, messages
+    
+    def close(self) -> None:
+        """Write the history still in memory to the spill file and close it"""
+        self.history.flush()
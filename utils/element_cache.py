@@ -0,0 +1,373 @@
+"""
+UI element location cache
+Stores the image patch around every successfully grounded click together
+with the element description. Later lookups for the same description run a
+vectorized normalized cross-correlation of the patch against the current
+frame (first around the remembered position, then over the whole screen via
+FFT) and only fall back to a grounding call when no match beats the
+threshold.
+"""
+import json
+import time
+import sqlite3
+import threading
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from utils.screenshot_capture import Frame
+from utils.speculation import COORDINATE_SCALE
+
+
+# BT.601 luma weights in BGR order (frames are BGRA)
+_LUMA_BGR = np.array([0.114, 0.587, 0.299], dtype=np.float32)
+
+
+def grayscale(frame: Frame, scale: int = 2) -> np.ndarray:
+    """
+    Luma of a frame, subsampled by an integer factor (memoized on the frame)
+    
+    Args:
+        frame: Captured frame
+        scale: Downscale factor
+    
+    Returns:
+        (height // scale, width // scale) float32 array
+    """
+    def compute() -> np.ndarray:
+        height, width = frame.height // scale * scale, frame.width // scale * scale
+        return frame.bgra[:height:scale, :width:scale, :3].astype(np.float32) @ _LUMA_BGR
+    return frame.memo(('grayscale', scale), compute)
+
+
+def _fft_size(n: int) -> int:
+    """Smallest size >= n without prime factors above 5 (fast FFT lengths)"""
+    while True:
+        m = n
+        for prime in (2, 3, 5):
+            while m % prime == 0:
+                m //= prime
+        if m == 1:
+            return n
+        n += 1
+
+
+def _window_sums(image: np.ndarray, height: int, width: int) -> np.ndarray:
+    """Sum of every height x width window (integral image)"""
+    integral = np.zeros((image.shape[0] + 1, image.shape[1] + 1), dtype=np.float64)
+    np.cumsum(np.cumsum(image, axis=0, dtype=np.float64), axis=1, out=integral[1:, 1:])
+    return (integral[height:, width:] - integral[:-height, width:]
+            - integral[height:, :-width] + integral[:-height, :-width])
+
+
+def match_template(image: np.ndarray, template: np.ndarray) -> Optional[np.ndarray]:
+    """
+    Normalized cross-correlation of a template at every position of an image
+    
+    The correlation is computed with real FFTs, the per-window means and
+    variances with integral images, so the cost does not grow with the
+    template size.
+    
+    Args:
+        image: (H, W) grayscale image
+        template: (h, w) grayscale template, h <= H and w <= W
+    
+    Returns:
+        (H - h + 1, W - w + 1) scores in [-1, 1], or None for a flat template
+    """
+    height, width = template.shape
+    count = height * width
+    centered = template - template.mean()
+    norm = float(np.sqrt((centered * centered).sum()))
+    if norm < 1e-6:
+        return None
+    
+    shape = (_fft_size(image.shape[0] + height - 1), _fft_size(image.shape[1] + width - 1))
+    spectrum = np.fft.rfft2(image, shape) * np.fft.rfft2(centered[::-1, ::-1], shape)
+    correlation = np.fft.irfft2(spectrum, shape)[height - 1:image.shape[0], width - 1:image.shape[1]]
+    
+    sums = _window_sums(image, height, width)
+    squares = _window_sums(image * image, height, width)
+    variance = np.maximum(squares - sums * sums / count, 0.0)
+    denominator = np.sqrt(variance) * norm
+    scores = np.zeros_like(correlation)
+    np.divide(correlation, denominator, out=scores, where=denominator > 1e-6)
+    return scores
+
+
+def _local_scores(image: np.ndarray, template: np.ndarray, top: int, left: int, radius: int) -> Tuple[np.ndarray, int, int]:
+    """NCC scores of the template at positions within radius of (top, left)"""
+    height, width = template.shape
+    y0, x0 = max(top - radius, 0), max(left - radius, 0)
+    y1 = min(top + radius + height, image.shape[0])
+    x1 = min(left + radius + width, image.shape[1])
+    windows = sliding_window_view(image[y0:y1, x0:x1], template.shape)
+    centered = template - template.mean()
+    means = windows.mean(axis=(2, 3), keepdims=True)
+    deviations = windows - means
+    numerator = np.einsum('ijkl,kl->ij', deviations, centered)
+    denominator = np.sqrt(np.einsum('ijkl,ijkl->ij', deviations, deviations) * (centered * centered).sum())
+    scores = np.zeros_like(numerator)
+    np.divide(numerator, denominator, out=scores, where=denominator > 1e-6)
+    return scores, y0, x0
+
+
+class ElementPatch:
+    """Image patch around a clicked element"""
+    
+    __slots__ = ('patch', 'offset', 'position')
+    
+    def __init__(self, patch: np.ndarray, offset: Tuple[int, int], position: Tuple[int, int]):
+        """
+        Args:
+            patch: (h, w) float32 grayscale patch at the cache's scale
+            offset: Click point inside the patch as (x, y)
+            position: Top-left corner of the patch in the frame it came from
+        """
+        self.patch = patch
+        self.offset = offset
+        self.position = position
+    
+    def to_row(self) -> Tuple[str, bytes]:
+        meta = {'shape': list(self.patch.shape), 'offset': list(self.offset), 'position': list(self.position)}
+        return json.dumps(meta), self.patch.astype(np.float32).tobytes()
+    
+    @classmethod
+    def from_row(cls, meta: str, data: bytes) -> 'ElementPatch':
+        meta = json.loads(meta)
+        patch = np.frombuffer(data, dtype=np.float32).reshape(meta['shape'])
+        return cls(patch, tuple(meta['offset']), tuple(meta['position']))
+
+
+class ElementMatch:
+    """Location of a cached element on the current frame"""
+    
+    __slots__ = ('coordinate', 'score', 'search', 'elapsed')
+    
+    def __init__(self, coordinate: List[int], score: float, search: str, elapsed: float):
+        """
+        Args:
+            coordinate: [x, y] in model coordinates (0-1000)
+            score: Normalized cross-correlation of the match
+            search: 'local' (around the remembered position) or 'global'
+            elapsed: Seconds spent matching
+        """
+        self.coordinate = coordinate
+        self.score = score
+        self.search = search
+        self.elapsed = elapsed
+    
+    def __repr__(self) -> str:
+        return f"ElementMatch({self.coordinate}, score={self.score:.3f}, {self.search}, {self.elapsed * 1000:.1f}ms)"
+
+
+class ElementCache:
+    """
+    Element description -> recent patches, in memory and optionally in sqlite
+    
+    Patches are matched on a grayscale copy of the frame downscaled by scale,
+    which keeps a full-screen FFT search in the tens of milliseconds.
+    """
+    
+    def __init__(self,
+                 threshold: float = 0.9,
+                 patch_size: int = 32,
+                 scale: int = 2,
+                 search_radius: int = 8,
+                 variants: int = 3,
+                 db_path: Optional[Union[str, Path]] = None):
+        """
+        Args:
+            threshold: Lowest NCC score accepted as a match
+            patch_size: Patch edge length at the cache's scale
+            scale: Downscale factor of frames before matching
+            search_radius: Pixels (at scale) searched around the remembered
+                position before the whole frame is searched
+            variants: Patches kept per description (newest first)
+            db_path: sqlite file shared across runs (None = memory only)
+        """
+        self.threshold = threshold
+        self.patch_size = patch_size
+        self.scale = scale
+        self.search_radius = search_radius
+        self.variants = variants
+        self._entries: Dict[str, List[ElementPatch]] = {}
+        self._lock = threading.Lock()
+        
+        self._db = None
+        if db_path is not None:
+            self._db = sqlite3.connect(str(db_path), timeout=5.0, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS elements ("
+                "query TEXT NOT NULL, created REAL NOT NULL, meta TEXT NOT NULL, patch BLOB NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS elements_query ON elements (query)")
+            self._db.commit()
+        
+        self.lookups = 0
+        self.outcomes = Counter()
+        self.stores = 0
+        self.removals = 0
+        self.match_time = 0.0
+    
+    @staticmethod
+    def key(query: str) -> str:
+        """Cache key of an element description (case- and whitespace-insensitive)"""
+        return " ".join(query.lower().split())
+    
+    def _patches(self, key: str) -> List[ElementPatch]:
+        patches = self._entries.get(key)
+        if patches is None and self._db is not None:
+            rows = self._db.execute(
+                "SELECT meta, patch FROM elements WHERE query = ? ORDER BY created DESC LIMIT ?",
+                (key, self.variants)
+            ).fetchall()
+            patches = [ElementPatch.from_row(meta, data) for meta, data in rows]
+            self._entries[key] = patches
+        return patches or []
+    
+    def extract(self, frame: Frame, coordinate: List[int]) -> Optional[ElementPatch]:
+        """
+        Cut the patch around a click point
+        
+        Args:
+            frame: Frame the click was decided on
+            coordinate: Click point in model coordinates
+        
+        Returns:
+            ElementPatch, or None if the patch has no texture to match
+        """
+        image = grayscale(frame, self.scale)
+        height, width = image.shape
+        size = min(self.patch_size, height, width)
+        x = min(max(int(coordinate[0] * width / COORDINATE_SCALE), 0), width - 1)
+        y = min(max(int(coordinate[1] * height / COORDINATE_SCALE), 0), height - 1)
+        left = min(max(x - size // 2, 0), width - size)
+        top = min(max(y - size // 2, 0), height - size)
+        patch = image[top:top + size, left:left + size].copy()
+        if float(patch.std()) < 1.0:
+            return None
+        return ElementPatch(patch, (x - left, y - top), (left, top))
+    
+    def put(self, query: str, element: ElementPatch) -> None:
+        """Remember the patch of a successfully clicked element"""
+        key = self.key(query)
+        with self._lock:
+            patches = [element] + self._patches(key)
+            self._entries[key] = patches[:self.variants]
+            if self._db is not None:
+                meta, data = element.to_row()
+                self._db.execute(
+                    "INSERT INTO elements (query, created, meta, patch) VALUES (?, ?, ?, ?)",
+                    (key, time.time(), meta, data)
+                )
+                self._db.execute(
+                    "DELETE FROM elements WHERE query = ? AND rowid NOT IN ("
+                    "SELECT rowid FROM elements WHERE query = ? ORDER BY created DESC LIMIT ?)",
+                    (key, key, self.variants)
+                )
+                self._db.commit()
+            self.stores += 1
+    
+    def remove(self, query: str) -> None:
+        """Forget an element, e.g. after its cached location led to a failed step"""
+        key = self.key(query)
+        with self._lock:
+            self._entries[key] = []
+            if self._db is not None:
+                self._db.execute("DELETE FROM elements WHERE query = ?", (key,))
+                self._db.commit()
+            self.removals += 1
+    
+    def locate(self, query: str, frame: Frame) -> Optional[ElementMatch]:
+        """
+        Find a cached element on a frame
+        
+        Args:
+            query: Element description
+            frame: Current frame
+        
+        Returns:
+            ElementMatch scoring at least threshold, or None
+        """
+        start = time.perf_counter()
+        with self._lock:
+            patches = list(self._patches(self.key(query)))
+        self.lookups += 1
+        if not patches:
+            self.outcomes['miss'] += 1
+            return None
+        
+        image = grayscale(frame, self.scale)
+        match = self._search_local(image, patches) or self._search_global(image, patches)
+        elapsed = time.perf_counter() - start
+        self.match_time += elapsed
+        if match is None or match[0] < self.threshold:
+            self.outcomes['miss'] += 1
+            return None
+        
+        score, (x, y), search = match
+        self.outcomes[search] += 1
+        height, width = image.shape
+        coordinate = [int(round(x * COORDINATE_SCALE / width)), int(round(y * COORDINATE_SCALE / height))]
+        return ElementMatch(coordinate, score, search, elapsed)
+    
+    def _search_local(self, image: np.ndarray, patches: List[ElementPatch]):
+        """Best match near the remembered positions, if it reaches the threshold"""
+        best = None
+        for element in patches:
+            height, width = element.patch.shape
+            if height > image.shape[0] or width > image.shape[1]:
+                continue
+            left, top = element.position
+            scores, y0, x0 = _local_scores(image, element.patch, top, left, self.search_radius)
+            if scores.size == 0:
+                continue
+            row, col = np.unravel_index(int(np.argmax(scores)), scores.shape)
+            score = float(scores[row, col])
+            if score >= self.threshold and (best is None or score > best[0]):
+                point = (x0 + col + element.offset[0], y0 + row + element.offset[1])
+                best = (score, point, 'local')
+        return best
+    
+    def _search_global(self, image: np.ndarray, patches: List[ElementPatch]):
+        """Best match anywhere on the frame"""
+        best = None
+        for element in patches:
+            height, width = element.patch.shape
+            if height > image.shape[0] or width > image.shape[1]:
+                continue
+            scores = match_template(image, element.patch)
+            if scores is None:
+                continue
+            row, col = np.unravel_index(int(np.argmax(scores)), scores.shape)
+            score = float(scores[row, col])
+            if best is None or score > best[0]:
+                best = (score, (col + element.offset[0], row + element.offset[1]), 'global')
+        return best
+    
+    def stats(self) -> Dict[str, Any]:
+        """Lookups, hits by search kind, misses and mean matching time"""
+        hits = self.outcomes['local'] + self.outcomes['global']
+        return {
+            'lookups': self.lookups,
+            'hits': hits,
+            'local_hits': self.outcomes['local'],
+            'global_hits': self.outcomes['global'],
+            'misses': self.outcomes['miss'],
+            'hit_rate': hits / self.lookups if self.lookups else 0.0,
+            'stores': self.stores,
+            'removals': self.removals,
+            'mean_match_time': self.match_time / self.lookups if self.lookups else None,
+        }
+    
+    def close(self) -> None:
+        """Close the sqlite file"""
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
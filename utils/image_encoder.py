@@ -0,0 +1,273 @@
+"""
+Pluggable image encoders for screenshots sent to the model
+PNG (tunable compress level), palette PNG, JPEG and WebP, plus a calibration
+command that picks the fastest encoder fitting a size budget
+"""
+import io
+import time
+import base64
+from typing import Any, Dict, List, Optional, Tuple
+from PIL import Image
+
+
+class ImageEncoder:
+    """Base class: turns a PIL Image into compressed bytes"""
+    
+    name = "base"
+    format = None
+    mime_type = None
+    extension = None
+    
+    def _save_kwargs(self) -> Dict[str, Any]:
+        return {}
+    
+    def _prepare(self, image: Image.Image) -> Image.Image:
+        return image
+    
+    def encode(self, image: Image.Image) -> bytes:
+        """
+        Encode an image
+        
+        Args:
+            image: PIL Image object
+        
+        Returns:
+            Encoded bytes
+        """
+        buffer = io.BytesIO()
+        self._prepare(image).save(buffer, format=self.format, **self._save_kwargs())
+        return buffer.getvalue()
+    
+    def encode_to_base64(self, image: Image.Image) -> str:
+        """
+        Encode an image as a base64 string
+        
+        Args:
+            image: PIL Image object
+        
+        Returns:
+            Base64 encoded string
+        """
+        return base64.b64encode(self.encode(image)).decode('utf-8')
+    
+    def __repr__(self) -> str:
+        params = ", ".join(f"{k}={v}" for k, v in self._save_kwargs().items())
+        return f"{self.__class__.__name__}({params})"
+
+
+class PNGEncoder(ImageEncoder):
+    """Lossless PNG with a tunable zlib level (0 = fastest, 9 = smallest)"""
+    
+    name = "png"
+    format = "PNG"
+    mime_type = "image/png"
+    extension = "png"
+    
+    def __init__(self, compress_level: int = 6):
+        self.compress_level = compress_level
+    
+    def _save_kwargs(self) -> Dict[str, Any]:
+        return {'compress_level': self.compress_level}
+
+
+class PalettePNGEncoder(PNGEncoder):
+    """PNG quantized to an adaptive palette; desktop UIs rarely need more than 256 colors"""
+    
+    name = "png_palette"
+    
+    def __init__(self, colors: int = 256, compress_level: int = 6):
+        super().__init__(compress_level)
+        self.colors = colors
+    
+    def _prepare(self, image: Image.Image) -> Image.Image:
+        return image.convert('RGB').quantize(colors=self.colors, method=Image.Quantize.FASTOCTREE)
+    
+    def __repr__(self) -> str:
+        return f"PalettePNGEncoder(colors={self.colors}, compress_level={self.compress_level})"
+
+
+class JPEGEncoder(ImageEncoder):
+    """Lossy JPEG with a quality setting (1-100)"""
+    
+    name = "jpeg"
+    format = "JPEG"
+    mime_type = "image/jpeg"
+    extension = "jpg"
+    
+    def __init__(self, quality: int = 95):
+        self.quality = quality
+    
+    def _prepare(self, image: Image.Image) -> Image.Image:
+        return image if image.mode in ('RGB', 'L') else image.convert('RGB')
+    
+    def _save_kwargs(self) -> Dict[str, Any]:
+        return {'quality': self.quality}
+
+
+class WebPEncoder(ImageEncoder):
+    """Lossy WebP with a quality setting (1-100); method trades speed (0) for size (6)"""
+    
+    name = "webp"
+    format = "WEBP"
+    mime_type = "image/webp"
+    extension = "webp"
+    
+    def __init__(self, quality: int = 95, method: int = 0):
+        self.quality = quality
+        self.method = method
+    
+    def _save_kwargs(self) -> Dict[str, Any]:
+        return {'quality': self.quality, 'method': self.method}
+
+
+ENCODERS = {
+    PNGEncoder.name: PNGEncoder,
+    PalettePNGEncoder.name: PalettePNGEncoder,
+    JPEGEncoder.name: JPEGEncoder,
+    WebPEncoder.name: WebPEncoder,
+}
+
+
+def get_encoder(name: str,
+                quality: int = 95,
+                compress_level: int = 6,
+                colors: int = 256) -> ImageEncoder:
+    """
+    Build an encoder by name
+    
+    Args:
+        name: One of 'png', 'png_palette', 'jpeg' (or 'jpg'), 'webp'; case-insensitive
+        quality: JPEG/WebP quality (1-100)
+        compress_level: PNG zlib level (0-9)
+        colors: Palette size for 'png_palette'
+    
+    Returns:
+        ImageEncoder instance
+    """
+    key = name.lower()
+    if key == 'jpg':
+        key = 'jpeg'
+    if key == 'png':
+        return PNGEncoder(compress_level=compress_level)
+    if key == 'png_palette':
+        return PalettePNGEncoder(colors=colors, compress_level=compress_level)
+    if key == 'jpeg':
+        return JPEGEncoder(quality=quality)
+    if key == 'webp':
+        return WebPEncoder(quality=quality)
+    raise ValueError(f"Unknown image encoder: {name} (choose from {', '.join(ENCODERS)})")
+
+
+def encode_thumbnail(image: Image.Image, max_size: Tuple[int, int] = (320, 320), quality: int = 70) -> bytes:
+    """
+    Encode a small JPEG preview of an image
+    
+    Args:
+        image: PIL Image object
+        max_size: Bounding box for the thumbnail (aspect ratio is kept)
+        quality: JPEG quality
+    
+    Returns:
+        Encoded JPEG bytes
+    """
+    thumbnail = image.copy()
+    thumbnail.thumbnail(max_size, Image.Resampling.BILINEAR)
+    return JPEGEncoder(quality=quality).encode(thumbnail)
+
+
+def default_candidates(quality: int = 95) -> List[ImageEncoder]:
+    """Encoder configurations tried by calibrate()"""
+    return [
+        PNGEncoder(compress_level=1),
+        PNGEncoder(compress_level=6),
+        PalettePNGEncoder(compress_level=1),
+        PalettePNGEncoder(compress_level=6),
+        JPEGEncoder(quality=quality),
+        JPEGEncoder(quality=80),
+        WebPEncoder(quality=quality),
+        WebPEncoder(quality=80),
+    ]
+
+
+def calibrate(image: Image.Image,
+              size_budget: int,
+              candidates: Optional[List[ImageEncoder]] = None,
+              repeats: int = 3) -> Dict[str, Any]:
+    """
+    Measure encode time against byte size and pick the fastest encoder within budget
+    
+    Args:
+        image: Representative screenshot (already resized for the model)
+        size_budget: Maximum encoded size in bytes
+        candidates: Encoders to try (default: default_candidates())
+        repeats: Timed runs per encoder; the best time is kept
+    
+    Returns:
+        Dictionary with 'results' (one entry per encoder, fastest first),
+        'best' (the fastest encoder that fits, or the smallest if none fits)
+        and 'skipped' (encoders that failed, with the error message)
+    """
+    results = []
+    skipped = []
+    for encoder in candidates or default_candidates():
+        try:
+            encoded = encoder.encode(image)
+            best_time = float('inf')
+            for _ in range(repeats):
+                start = time.perf_counter()
+                encoder.encode(image)
+                best_time = min(best_time, time.perf_counter() - start)
+        except (OSError, KeyError, ValueError) as e:
+            # e.g. Pillow built without WebP support
+            skipped.append({'encoder': encoder, 'error': str(e)})
+            continue
+        results.append({
+            'encoder': encoder,
+            'bytes': len(encoded),
+            'encode_time': best_time,
+            'fits': len(encoded) <= size_budget,
+        })
+    
+    results.sort(key=lambda r: r['encode_time'])
+    fitting = [r for r in results if r['fits']]
+    if fitting:
+        best = fitting[0]
+    else:
+        best = min(results, key=lambda r: r['bytes']) if results else None
+    return {'results': results, 'best': best, 'skipped': skipped}
+
+
+if __name__ == "__main__":
+    import argparse
+    from utils.screenshot_capture import ScreenshotCapture
+    from utils.image_processing import resize_for_model
+    
+    parser = argparse.ArgumentParser(description="Pick the fastest screenshot encoder for a size budget.")
+    parser.add_argument("--budget", type=int, default=500_000, help="Maximum encoded size in bytes")
+    parser.add_argument("--max-pixels", type=int, default=1920 * 1080, help="Resize budget before encoding (0 = native)")
+    parser.add_argument("--quality", type=int, default=95, help="JPEG/WebP quality to try")
+    parser.add_argument("--monitor", type=int, default=1, help="Monitor to capture")
+    args = parser.parse_args()
+    
+    screenshot = ScreenshotCapture().capture_screen(args.monitor)
+    if args.max_pixels:
+        screenshot = resize_for_model(screenshot, max_pixels=args.max_pixels)
+    print(f"Calibrating on a {screenshot.size[0]}x{screenshot.size[1]} capture, budget {args.budget} bytes\n")
+    
+    calibration = calibrate(screenshot, args.budget, default_candidates(args.quality))
+    for skipped in calibration['skipped']:
+        print(f"  Skipping {skipped['encoder']!r}: {skipped['error']}")
+    for result in calibration['results']:
+        marker = "✓" if result['fits'] else "✗"
+        print(f"  {marker} {result['encoder']!r:50s} {result['bytes']:>10d} B  {result['encode_time'] * 1000:8.1f} ms")
+    
+    best = calibration['best']
+    if best is not None:
+        encoder = best['encoder']
+        print(f"\nSelected: {encoder!r}")
+        print("\nconfig.py settings:")
+        print(f"  SCREENSHOT_FORMAT = \"{encoder.name.upper()}\"")
+        if hasattr(encoder, 'quality'):
+            print(f"  SCREENSHOT_QUALITY = {encoder.quality}")
+        if hasattr(encoder, 'compress_level'):
+            print(f"  PNG_COMPRESS_LEVEL = {encoder.compress_level}")
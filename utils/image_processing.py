@@ -0,0 +1,79 @@
+"""
+Image preprocessing for the vision model
+Resizes screenshots onto the model's patch grid before encoding
+"""
+import math
+from typing import Tuple
+from PIL import Image
+
+
+# Qwen3-VL: 16px patches merged 2x2 -> one visual token per 32x32 block
+QWEN3_VL_FACTOR = 32
+QWEN3_VL_MIN_PIXELS = 3136
+QWEN3_VL_MAX_PIXELS = 12845056
+
+
+def smart_resize(height: int,
+                 width: int,
+                 factor: int = QWEN3_VL_FACTOR,
+                 min_pixels: int = QWEN3_VL_MIN_PIXELS,
+                 max_pixels: int = QWEN3_VL_MAX_PIXELS) -> Tuple[int, int]:
+    """
+    Compute the size the vision model will actually see
+    
+    Same rule as the Qwen2-VL/Qwen3-VL image processor used in
+    computer_use.ipynb: both sides are multiples of factor, the pixel
+    count lies within [min_pixels, max_pixels], and the aspect ratio is
+    kept as close as possible.
+    
+    Args:
+        height: Original height in pixels
+        width: Original width in pixels
+        factor: Patch grid size (patch_size * merge_size)
+        min_pixels: Minimum number of pixels
+        max_pixels: Maximum number of pixels
+    
+    Returns:
+        Tuple of (resized_height, resized_width)
+    """
+    if max(height, width) / min(height, width) > 200:
+        raise ValueError(
+            f"absolute aspect ratio must be smaller than 200, got {max(height, width) / min(height, width)}"
+        )
+    h_bar = round(height / factor) * factor
+    w_bar = round(width / factor) * factor
+    if h_bar * w_bar > max_pixels:
+        beta = math.sqrt((height * width) / max_pixels)
+        h_bar = max(factor, math.floor(height / beta / factor) * factor)
+        w_bar = max(factor, math.floor(width / beta / factor) * factor)
+    elif h_bar * w_bar < min_pixels:
+        beta = math.sqrt(min_pixels / (height * width))
+        h_bar = math.ceil(height * beta / factor) * factor
+        w_bar = math.ceil(width * beta / factor) * factor
+    return h_bar, w_bar
+
+
+def resize_for_model(image: Image.Image,
+                     factor: int = QWEN3_VL_FACTOR,
+                     min_pixels: int = QWEN3_VL_MIN_PIXELS,
+                     max_pixels: int = QWEN3_VL_MAX_PIXELS) -> Image.Image:
+    """
+    Downscale a screenshot onto the model's patch grid
+    
+    The whole frame is kept (no cropping), so normalized 0-1000 coordinates
+    returned by the model still map onto the real screen through
+    ActionExecutor.click_normalized.
+    
+    Args:
+        image: PIL Image object
+        factor: Patch grid size
+        min_pixels: Minimum number of pixels
+        max_pixels: Maximum number of pixels
+    
+    Returns:
+        Resized image (the original object if the size already matches)
+    """
+    height, width = smart_resize(image.height, image.width, factor, min_pixels, max_pixels)
+    if (width, height) == image.size:
+        return image
+    return image.resize((width, height), Image.Resampling.BILINEAR, reducing_gap=2.0)
@@ -0,0 +1,168 @@
+"""
+Per-request token and latency accounting
+Extracts the token counts and durations Ollama reports with each response
+(prompt_eval_count, eval_count, load/prompt_eval/eval durations) into one
+record per model call, and aggregates them per task
+"""
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+
+NANOSECONDS = 1e9
+
+
+def _seconds(response: Any, key: str) -> Optional[float]:
+    value = response.get(key)
+    return value / NANOSECONDS if value is not None else None
+
+
+def _rate(tokens: Optional[int], seconds: Optional[float]) -> Optional[float]:
+    if not tokens or not seconds:
+        return None
+    return tokens / seconds
+
+
+def request_record(response: Any,
+                   wall_time: float,
+                   image_tokens: int = 0,
+                   text_tokens: int = 0,
+                   iteration: Optional[int] = None,
+                   cached: bool = False,
+                   model: Optional[str] = None,
+                   tier: Optional[str] = None,
+                   purpose: str = 'step') -> Dict[str, Any]:
+    """
+    Build the accounting record of one model call
+    
+    A stream stopped at the tool call never receives the final chunk with
+    the server's counters; its output tokens are then taken from the number
+    of streamed chunks (one token each) and its prompt tokens from the
+    estimates.
+    
+    Args:
+        response: Ollama response (or the streamed equivalent)
+        wall_time: Client-side time for the call (seconds)
+        image_tokens: Estimated visual tokens sent (all images)
+        text_tokens: Estimated text tokens sent (prompts, history, tools)
+        iteration: Agent iteration
+        cached: The response came from the response cache (no inference)
+        model: Model that answered
+        tier: Routing tier of the call, if routing is enabled
+        purpose: What the call was for ('step', 'plan' or 'grounding')
+    
+    Returns:
+        Record with token counts, durations (seconds), rates and the phase
+        that took longest ('bottleneck')
+    """
+    record = {
+        'iteration': iteration,
+        'cached': cached,
+        'model': model,
+        'tier': tier,
+        'purpose': purpose,
+        'wall_time': wall_time,
+        'image_tokens': image_tokens,
+        'text_tokens': text_tokens,
+    }
+    if cached:
+        return record
+    
+    reported = response.get('prompt_eval_count') is not None
+    prompt_tokens = response.get('prompt_eval_count')
+    output_tokens = response.get('eval_count')
+    if output_tokens is None:
+        output_tokens = response.get('stream_chunks')
+    if prompt_tokens is None:
+        prompt_tokens = image_tokens + text_tokens
+    
+    load = _seconds(response, 'load_duration')
+    prompt_eval = _seconds(response, 'prompt_eval_duration')
+    decode = _seconds(response, 'eval_duration')
+    total = _seconds(response, 'total_duration')
+    # Time outside the server's own accounting: image encoding, transfer, queueing
+    overhead = wall_time - total if total is not None else None
+    
+    phases = {'load': load, 'prefill': prompt_eval, 'decode': decode, 'overhead': overhead}
+    timed = {name: value for name, value in phases.items() if value is not None}
+    
+    record.update({
+        'reported': reported,
+        'stopped_early': bool(response.get('stopped_early')),
+        'prompt_tokens': prompt_tokens,
+        'output_tokens': output_tokens,
+        'image_token_share': image_tokens / prompt_tokens if prompt_tokens else None,
+        'load_time': load,
+        'prompt_eval_time': prompt_eval,
+        'eval_time': decode,
+        'server_time': total,
+        'overhead_time': overhead,
+        'prompt_tokens_per_second': _rate(prompt_tokens, prompt_eval),
+        'output_tokens_per_second': _rate(output_tokens, decode),
+        'bottleneck': max(timed, key=timed.get) if timed else None,
+    })
+    return record
+
+
+class InferenceMetrics:
+    """Accounting records of the model calls of one task, with totals"""
+    
+    def __init__(self):
+        self.records: List[Dict[str, Any]] = []
+    
+    def add(self, response: Any, wall_time: float, **kwargs) -> Dict[str, Any]:
+        """
+        Record a model call
+        
+        Args:
+            response: Model response
+            wall_time: Client-side time for the call (seconds)
+            **kwargs: Passed to request_record (image_tokens, text_tokens,
+                iteration, cached, model, tier, purpose)
+        
+        Returns:
+            The new record
+        """
+        record = request_record(response, wall_time, **kwargs)
+        self.records.append(record)
+        return record
+    
+    def reset(self) -> None:
+        """Drop all records"""
+        self.records = []
+    
+    def totals(self) -> Dict[str, Any]:
+        """Sums over all inference calls, overall rates and bottleneck counts"""
+        calls = [record for record in self.records if not record['cached']]
+        
+        def total(key: str) -> float:
+            return sum(record[key] or 0 for record in calls)
+        
+        prompt_tokens = total('prompt_tokens')
+        output_tokens = total('output_tokens')
+        image_tokens = total('image_tokens')
+        reported = [record for record in calls if record['reported']]
+        prompt_eval_time = sum(record['prompt_eval_time'] or 0 for record in reported)
+        eval_time = total('eval_time')
+        return {
+            'requests': len(calls),
+            'cached': len(self.records) - len(calls),
+            'stopped_early': sum(record['stopped_early'] for record in calls),
+            'prompt_tokens': prompt_tokens,
+            'output_tokens': output_tokens,
+            'image_tokens': image_tokens,
+            'text_tokens': total('text_tokens'),
+            'image_token_share': image_tokens / prompt_tokens if prompt_tokens else None,
+            'wall_time': total('wall_time'),
+            'load_time': total('load_time'),
+            'prompt_eval_time': prompt_eval_time,
+            'eval_time': eval_time,
+            'overhead_time': total('overhead_time'),
+            'prompt_tokens_per_second': _rate(sum(record['prompt_tokens'] for record in reported), prompt_eval_time),
+            'output_tokens_per_second': _rate(sum(record['output_tokens'] or 0 for record in reported), eval_time),
+            'bottlenecks': dict(Counter(record['bottleneck'] for record in calls if record['bottleneck'])),
+            'purposes': dict(Counter(record['purpose'] for record in calls)),
+        }
+    
+    def report(self) -> Dict[str, Any]:
+        """Per-call records plus totals, for the run() result"""
+        return {'requests': list(self.records), 'totals': self.totals()}
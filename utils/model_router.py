@@ -0,0 +1,135 @@
+"""
+Two-tier model routing
+Sends routine steps to a small, fast vision model and escalates to the large
+model after a failed action, an unchanged screen, an unparseable response or
+low self-reported confidence
+"""
+import re
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+
+FAST = 'fast'
+STRONG = 'strong'
+
+# Appended to the system prompt so the fast model reports how sure it is
+CONFIDENCE_INSTRUCTION = """
+Before each tool call, state how confident you are that the action is correct
+as "Confidence: <number between 0 and 1>".
+"""
+
+_CONFIDENCE = re.compile(r'confidence\s*[:=]\s*([0-9]*\.?[0-9]+)\s*(%?)', re.IGNORECASE)
+
+
+def reported_confidence(response: Any) -> Optional[float]:
+    """
+    Confidence the model stated in its response text
+    
+    Args:
+        response: Model response
+    
+    Returns:
+        Lowest stated confidence in [0, 1], or None if none was stated
+    """
+    message = response.get('message') if hasattr(response, 'get') else None
+    content = (message or {}).get('content') or ''
+    values = []
+    for number, percent in _CONFIDENCE.findall(content):
+        value = float(number)
+        values.append(value / 100 if percent or value > 1 else value)
+    return min(values) if values else None
+
+
+class ModelRouter:
+    """
+    Picks the model tier for each step and keeps per-tier statistics
+    
+    Steps go to the fast tier unless the previous step failed or left the
+    screen unchanged; the strong tier then handles the next escalation_steps
+    steps. A fast response without a parseable action or with confidence
+    below the threshold is re-asked on the strong tier within the same step.
+    """
+    
+    def __init__(self, confidence_threshold: float = 0.6, escalation_steps: int = 1):
+        """
+        Args:
+            confidence_threshold: Escalate fast responses stating a lower confidence
+            escalation_steps: Steps kept on the strong tier after a failed or
+                ineffective action
+        """
+        self.confidence_threshold = confidence_threshold
+        self.escalation_steps = escalation_steps
+        self.reset()
+    
+    def reset(self) -> None:
+        """Clear the routing state and statistics"""
+        self._strong_steps = 0
+        self.steps = 0
+        self.requests = Counter()
+        self.latency = Counter()
+        self.escalations = Counter()
+    
+    def route(self, failed: bool = False, unchanged: bool = False) -> Tuple[str, Optional[str]]:
+        """
+        Choose the tier for the next step
+        
+        Args:
+            failed: The previous step's action failed
+            unchanged: The previous step had no visible effect
+        
+        Returns:
+            (tier, escalation reason or None)
+        """
+        self.steps += 1
+        reason = 'action_failed' if failed else 'screen_unchanged' if unchanged else None
+        if reason is not None:
+            self.escalations[reason] += 1
+            self._strong_steps = self.escalation_steps
+        if self._strong_steps > 0:
+            self._strong_steps -= 1
+            return STRONG, reason
+        return FAST, None
+    
+    def review(self, response: Any, actions: List[Any]) -> Optional[str]:
+        """
+        Check a fast-tier response
+        
+        Args:
+            response: Model response
+            actions: Actions parsed from it
+        
+        Returns:
+            Reason to re-ask the strong tier ('parse_failure' or
+            'low_confidence'), or None to accept the response
+        """
+        if not actions:
+            reason = 'parse_failure'
+        else:
+            confidence = reported_confidence(response)
+            if confidence is None or confidence >= self.confidence_threshold:
+                return None
+            reason = 'low_confidence'
+        self.escalations[reason] += 1
+        return reason
+    
+    def record(self, tier: str, wall_time: float) -> None:
+        """Count a model call and its latency"""
+        self.requests[tier] += 1
+        self.latency[tier] += wall_time
+    
+    def stats(self) -> Dict[str, Any]:
+        """Per-tier requests and latency, escalation counts and rate"""
+        escalated = sum(self.escalations.values())
+        return {
+            'steps': self.steps,
+            'tiers': {
+                tier: {
+                    'requests': self.requests[tier],
+                    'total_time': self.latency[tier],
+                    'mean_latency': self.latency[tier] / self.requests[tier] if self.requests[tier] else None,
+                }
+                for tier in (FAST, STRONG)
+            },
+            'escalations': dict(self.escalations),
+            'escalation_rate': escalated / self.steps if self.steps else 0.0,
+        }
@@ -2,41 +2,354 @@
 Ollama client for Qwen3-VL model with function calling support
 """
 import ollama
-import json
-import base64
-from typing import List, Dict, Any, Optional
+import httpx
+import time
+import socket
+import asyncio
+import threading
+import weakref
+from typing import List, Dict, Any, Optional, Tuple, Union
 from PIL import Image
-import io
+
+from utils.image_processing import (
+    resize_for_model, smart_resize, QWEN3_VL_FACTOR, QWEN3_VL_MIN_PIXELS, QWEN3_VL_MAX_PIXELS
+)
+from utils.image_encoder import ImageEncoder, PNGEncoder, get_encoder
+from utils.screenshot_capture import Frame
+from utils.tool_call_stream import ToolCallStreamParser
+from utils.action_parser import Action, parse_response
+
+
+# One pooled HTTP client per (host, timeouts, pool limits), shared by every
+# OllamaVisionClient in the process
+_shared_clients: Dict[Tuple, ollama.Client] = {}
+_shared_clients_lock = threading.Lock()
+
+
+def get_shared_client(host: Optional[str] = None,
+                      timeout: float = 300.0,
+                      connect_timeout: float = 10.0,
+                      max_connections: int = 10,
+                      keepalive_expiry: float = 300.0) -> ollama.Client:
+    """
+    Get (or create) a process-wide ollama.Client with a persistent connection pool
+    
+    Args:
+        host: Ollama server URL (None = OLLAMA_HOST or http://localhost:11434)
+        timeout: Read/write timeout per request (seconds)
+        connect_timeout: TCP connect timeout (seconds)
+        max_connections: Maximum pooled connections to the server
+        keepalive_expiry: Seconds an idle connection is kept open
+    
+    Returns:
+        Shared ollama.Client instance
+    """
+    key = (host, timeout, connect_timeout, max_connections, keepalive_expiry)
+    with _shared_clients_lock:
+        client = _shared_clients.get(key)
+        if client is None:
+            client = ollama.Client(
+                host=host,
+                timeout=httpx.Timeout(timeout, connect=connect_timeout),
+                limits=httpx.Limits(
+                    max_connections=max_connections,
+                    max_keepalive_connections=max_connections,
+                    keepalive_expiry=keepalive_expiry
+                )
+            )
+            _shared_clients[key] = client
+        return client
+
+
+# ollama.AsyncClient wraps an httpx.AsyncClient, whose pool is bound to the
+# event loop that first used it, so async clients are shared per loop
+_shared_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[Tuple, ollama.AsyncClient]]" = \
+    weakref.WeakKeyDictionary()
+
+
+def get_shared_async_client(host: Optional[str] = None,
+                            timeout: float = 300.0,
+                            connect_timeout: float = 10.0,
+                            max_connections: int = 10,
+                            keepalive_expiry: float = 300.0) -> ollama.AsyncClient:
+    """
+    Get (or create) an ollama.AsyncClient shared by every coroutine on the running event loop
+    
+    Must be called from a coroutine. Arguments are the same as get_shared_client().
+    
+    Returns:
+        Shared ollama.AsyncClient instance for the current loop
+    """
+    loop = asyncio.get_running_loop()
+    key = (host, timeout, connect_timeout, max_connections, keepalive_expiry)
+    clients = _shared_async_clients.setdefault(loop, {})
+    client = clients.get(key)
+    if client is None:
+        client = ollama.AsyncClient(
+            host=host,
+            timeout=httpx.Timeout(timeout, connect=connect_timeout),
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_connections,
+                keepalive_expiry=keepalive_expiry
+            )
+        )
+        clients[key] = client
+    return client
+
+
+class RequestCancel:
+    """
+    Cancels a streamed request from another thread
+    
+    Pass it as cancel_event: set() marks the request as cancelled and shuts
+    down its socket, so a read blocked in prefill or between tokens returns at
+    once and Ollama drops the generation. A threading.Event works as
+    cancel_event too, but is only checked between chunks.
+    """
+    
+    def __init__(self):
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._sockets = []
+    
+    def is_set(self) -> bool:
+        return self._event.is_set()
+    
+    def set(self) -> None:
+        """Cancel the request"""
+        with self._lock:
+            self._event.set()
+            sockets = list(self._sockets)
+        for sock in sockets:
+            self._shutdown(sock)
+    
+    def trace(self, event: str, info: Dict[str, Any]) -> None:
+        """httpcore trace hook: remember the socket of each new connection"""
+        if not (event.startswith('connection.connect_') and event.endswith('.complete')):
+            return
+        sock = info['return_value'].get_extra_info('socket')
+        if sock is None:
+            return
+        with self._lock:
+            self._sockets.append(sock)
+            cancelled = self._event.is_set()
+        if cancelled:
+            self._shutdown(sock)
+    
+    @staticmethod
+    def _shutdown(sock) -> None:
+        try:
+            sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
 
 
 class OllamaVisionClient:
     """Client for interacting with Qwen3-VL via Ollama"""
     
-    def __init__(self, model: str = "qwen3-vl:235b-cloud"):
+    def __init__(self,
+                 model: str = "qwen3-vl:235b-cloud",
+                 max_pixels: Optional[int] = None,
+                 min_pixels: int = QWEN3_VL_MIN_PIXELS,
+                 resize_factor: int = QWEN3_VL_FACTOR,
+                 encoder: Optional[ImageEncoder] = None,
+                 host: Optional[str] = None,
+                 timeout: float = 300.0,
+                 connect_timeout: float = 10.0,
+                 max_connections: int = 10,
+                 keepalive_expiry: float = 300.0,
+                 keep_alive: Optional[Union[float, str]] = None):
         """
         Initialize Ollama client
         
         Args:
             model: Model name to use (default: qwen3-vl:235b-cloud)
+            max_pixels: Downscale images to at most this many pixels on the
+                model's patch grid before encoding (None = send native size)
+            min_pixels: Minimum pixels after resizing
+            resize_factor: Patch grid size (patch_size * merge_size)
+            encoder: Image encoder for screenshots (default: PNG)
+            host: Ollama server URL (None = OLLAMA_HOST or http://localhost:11434)
+            timeout: Read/write timeout per request (seconds)
+            connect_timeout: TCP connect timeout (seconds)
+            max_connections: Maximum pooled connections to the server
+            keepalive_expiry: Seconds an idle pooled connection is kept open
+            keep_alive: How long the server keeps the model loaded after each
+                request ("30m", seconds, -1 = until unloaded; None = server default)
         """
         self.model = model
-        self.client = ollama
+        self.keep_alive = keep_alive
+        self.host = host
+        self._connection = {
+            'host': host,
+            'timeout': timeout,
+            'connect_timeout': connect_timeout,
+            'max_connections': max_connections,
+            'keepalive_expiry': keepalive_expiry,
+        }
+        self.client = get_shared_client(**self._connection)
+        # Cancellable requests use their own connections (see _cancellable_client)
+        self._cancellable = None
+        self._request_local = threading.local()
+        self.max_pixels = max_pixels
+        self.min_pixels = min_pixels
+        self.resize_factor = resize_factor
+        self.encoder = encoder or PNGEncoder()
         
-    def encode_image_to_base64(self, image: Image.Image, format: str = 'PNG') -> str:
+        # Last parsed response, so each response is parsed only once
+        self._parsed_response = None
+        self._parsed_actions: List[Action] = []
+    
+    def prepare_image(self, image: Image.Image) -> Image.Image:
+        """
+        Resize an image to the resolution the model will use
+        
+        Args:
+            image: PIL Image object
+        
+        Returns:
+            Resized PIL Image (unchanged if resizing is disabled)
+        """
+        if self.max_pixels is None:
+            return image
+        return resize_for_model(
+            image,
+            factor=self.resize_factor,
+            min_pixels=self.min_pixels,
+            max_pixels=self.max_pixels
+        )
+        
+    def image_tokens(self, image: Union[Image.Image, Frame]) -> int:
+        """
+        Estimate the visual tokens an image costs after resizing
+        
+        Args:
+            image: PIL Image or captured Frame
+        
+        Returns:
+            Number of patch-grid cells the model sees
+        """
+        height, width = smart_resize(
+            image.height,
+            image.width,
+            factor=self.resize_factor,
+            min_pixels=self.min_pixels,
+            max_pixels=self.max_pixels or QWEN3_VL_MAX_PIXELS
+        )
+        return (height // self.resize_factor) * (width // self.resize_factor)
+    
+    def encode_image_to_base64(self, image: Image.Image, format: Optional[str] = None) -> str:
         """
         Encode PIL Image to base64 string
         
         Args:
             image: PIL Image object
-            format: Image format (PNG, JPEG, etc.)
+            format: Encoder name (png, png_palette, jpeg, webp); defaults to
+                the client's configured encoder
             
         Returns:
             Base64 encoded string
         """
-        buffer = io.BytesIO()
-        image.save(buffer, format=format)
-        img_bytes = buffer.getvalue()
-        return base64.b64encode(img_bytes).decode('utf-8')
+        encoder = self.encoder if format is None else get_encoder(format)
+        return encoder.encode_to_base64(image)
+    
+    def encode_for_model(self, image: Union[Image.Image, Frame]) -> bytes:
+        """
+        Resize and encode an image exactly as it is sent to the model
+        
+        For a Frame the result is memoized on the frame, so the same buffer
+        can feed the model request, the screenshot writer and cache keys.
+        
+        Args:
+            image: PIL Image or captured Frame
+        
+        Returns:
+            Encoded image bytes
+        """
+        if isinstance(image, Frame):
+            key = ('model_image', repr(self.encoder), self.max_pixels, self.min_pixels, self.resize_factor)
+            return image.memo(key, lambda: self.encoder.encode(self.prepare_image(image.to_image())))
+        return self.encoder.encode(self.prepare_image(image))
+    
+    def _chat_params(self,
+                     messages: List[Dict[str, Any]],
+                     stream: bool = False,
+                     tools: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
+        """Build the keyword arguments of a chat request"""
+        request_params = {
+            'model': self.model,
+            'messages': messages,
+            'stream': stream
+        }
+        
+        # Add tools if provided
+        if tools:
+            request_params['tools'] = tools
+        
+        if self.keep_alive is not None:
+            request_params['keep_alive'] = self.keep_alive
+        
+        return request_params
+    
+    @staticmethod
+    def _load_report(response, elapsed: float) -> Dict[str, Any]:
+        """Timing of a warm-up request"""
+        load_duration = response.get('load_duration') or 0
+        return {
+            'load_time': elapsed,
+            'server_load_time': load_duration / 1e9,
+            'done_reason': response.get('done_reason'),
+        }
+    
+    def warm_up(self, keep_alive: Optional[Union[float, str]] = None) -> Dict[str, Any]:
+        """
+        Load the model into memory with an empty chat request
+        
+        Args:
+            keep_alive: How long to keep the model loaded afterwards
+                (default: the client's keep_alive)
+        
+        Returns:
+            Dictionary with 'load_time' (wall clock, seconds),
+            'server_load_time' (as reported by Ollama) and 'done_reason'
+        """
+        keep_alive = self.keep_alive if keep_alive is None else keep_alive
+        start = time.perf_counter()
+        response = self.client.chat(model=self.model, messages=[], keep_alive=keep_alive)
+        return self._load_report(response, time.perf_counter() - start)
+    
+    def unload(self) -> None:
+        """Ask the server to unload the model now (keep_alive=0)"""
+        self.client.chat(model=self.model, messages=[], keep_alive=0)
+    
+    def _image_messages(self,
+                        user_query: str,
+                        image_bytes: bytes,
+                        system_prompt: Optional[str] = None,
+                        history: Optional[List[Dict[str, Any]]] = None) -> List[Dict[str, Any]]:
+        """Build the system, history and user messages for an image query"""
+        messages = []
+        
+        # Add system message if provided
+        if system_prompt:
+            messages.append({
+                'role': 'system',
+                'content': system_prompt
+            })
+        
+        # Earlier turns, oldest first
+        if history:
+            messages.extend(history)
+        
+        # Add user message with image
+        messages.append({
+            'role': 'user',
+            'content': user_query,
+            'images': [image_bytes]
+        })
+        
+        return messages
     
     def chat(self, 
              messages: List[Dict[str, Any]], 
@@ -54,19 +367,8 @@ class OllamaVisionClient:
             Response dictionary from Ollama
         """
         try:
-            # Prepare the request
-            request_params = {
-                'model': self.model,
-                'messages': messages,
-                'stream': stream
-            }
-            
-            # Add tools if provided
-            if tools:
-                request_params['tools'] = tools
-            
             # Make the request
-            response = self.client.chat(**request_params)
+            response = self.client.chat(**self._chat_params(messages, stream, tools))
             
             return response
             
@@ -74,44 +376,116 @@ class OllamaVisionClient:
             print(f"Error in Ollama chat: {e}")
             raise
     
+    def chat_until_tool_call(self,
+                             messages: List[Dict[str, Any]],
+                             tools: Optional[List[Dict[str, Any]]] = None,
+                             max_calls: int = 1,
+                             cancel_event: Optional[threading.Event] = None) -> Dict[str, Any]:
+        """
+        Stream a chat response and stop generating once its tool calls are complete
+        
+        Closing the stream drops the HTTP connection, which makes Ollama abort
+        the rest of the generation.
+        
+        Args:
+            messages: List of message dictionaries
+            tools: Optional list of tool definitions for function calling
+            max_calls: Stop after this many calls; fewer calls are complete
+                once the model continues with other text
+            cancel_event: Abort the generation once this event is set
+                (checked per chunk; a RequestCancel also aborts a blocked read)
+        
+        Returns:
+            Response dictionary in the non-streaming layout, with
+            'stopped_early' set when generation was cut off
+        """
+        parser = ToolCallStreamParser(max_calls)
+        if isinstance(cancel_event, RequestCancel):
+            self._request_local.cancel = cancel_event
+            stream = self._cancellable_client().chat(**self._chat_params(messages, True, tools))
+        else:
+            stream = self.chat(messages=messages, stream=True, tools=tools)
+        try:
+            for chunk in stream:
+                if parser.feed(chunk) or (cancel_event is not None and cancel_event.is_set()):
+                    break
+        except httpx.TransportError:
+            # The socket was shut down by RequestCancel.set()
+            if cancel_event is None or not cancel_event.is_set():
+                raise
+        finally:
+            self._request_local.cancel = None
+            close = getattr(stream, 'close', None)
+            if close is not None:
+                close()
+        return parser.response()
+    
+    def _cancellable_client(self) -> ollama.Client:
+        """
+        ollama.Client for requests that may be cancelled with a RequestCancel
+        
+        Connections are not kept alive, so every request opens its own socket
+        and shutting it down cannot affect other requests.
+        """
+        if self._cancellable is None:
+            connection = self._connection
+            self._cancellable = ollama.Client(
+                host=connection['host'],
+                timeout=httpx.Timeout(connection['timeout'], connect=connection['connect_timeout']),
+                limits=httpx.Limits(max_connections=connection['max_connections'], max_keepalive_connections=0),
+                event_hooks={'request': [self._attach_cancel]}
+            )
+        return self._cancellable
+    
+    def _attach_cancel(self, request: httpx.Request) -> None:
+        """httpx request hook: trace the connection of the calling thread's cancellable request"""
+        cancel = getattr(self._request_local, 'cancel', None)
+        if cancel is not None:
+            request.extensions['trace'] = cancel.trace
+    
+    def close(self) -> None:
+        """Close the connections of cancellable requests (the shared pool stays open)"""
+        if self._cancellable is not None:
+            self._cancellable.close()
+            self._cancellable = None
+    
     def chat_with_image(self,
                        user_query: str,
-                       image: Image.Image,
+                       image: Union[Image.Image, Frame],
                        system_prompt: Optional[str] = None,
-                       tools: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
+                       tools: Optional[List[Dict[str, Any]]] = None,
+                       stop_at_tool_call: bool = False,
+                       history: Optional[List[Dict[str, Any]]] = None,
+                       max_tool_calls: int = 1,
+                       cancel_event: Optional[threading.Event] = None) -> Dict[str, Any]:
         """
         Chat with image input
         
         Args:
             user_query: User's text query
-            image: PIL Image object
+            image: PIL Image or captured Frame
             system_prompt: Optional system prompt
             tools: Optional list of tool definitions
+            stop_at_tool_call: Stream the response and stop generating as soon
+                as its tool calls are complete
+            history: Earlier turns inserted between the system and user messages
+            max_tool_calls: Tool calls to wait for when stop_at_tool_call is set
+            cancel_event: Abort a streamed generation once this event is set
             
         Returns:
             Response from the model
         """
-        # Build messages
-        messages = []
-        
-        # Add system message if provided
-        if system_prompt:
-            messages.append({
-                'role': 'system',
-                'content': system_prompt
-            })
-        
-        # Encode image to base64
-        image_base64 = self.encode_image_to_base64(image, format='PNG')
-        
-        # Add user message with image
-        messages.append({
-            'role': 'user',
-            'content': user_query,
-            'images': [image_base64]
-        })
+        # Downscale to the model's patch grid and encode (once per frame).
+        # Raw bytes go straight to the ollama client, which base64s them for
+        # the request body.
+        image_bytes = self.encode_for_model(image)
+        messages = self._image_messages(user_query, image_bytes, system_prompt, history)
         
         # Make the request
+        if stop_at_tool_call:
+            return self.chat_until_tool_call(
+                messages=messages, tools=tools, max_calls=max_tool_calls, cancel_event=cancel_event
+            )
         response = self.chat(messages=messages, tools=tools)
         
         return response
@@ -137,6 +511,25 @@ class OllamaVisionClient:
         
         return tool_calls
     
+    def parse_actions(self, response: Dict[str, Any]) -> List[Action]:
+        """
+        Parse every tool call of a model response
+        
+        Structured tool_calls take precedence; otherwise <tool_call> blocks or
+        bare JSON in the content are parsed, repairing common JSON defects.
+        The result for the most recent response is memoized.
+        
+        Args:
+            response: Response from Ollama
+        
+        Returns:
+            List of Action objects, in the order the model emitted them
+        """
+        if response is not self._parsed_response:
+            self._parsed_actions = parse_response(response)
+            self._parsed_response = response
+        return self._parsed_actions
+    
     def parse_computer_use_action(self, response: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         """
         Parse computer use action from model response
@@ -145,30 +538,187 @@ class OllamaVisionClient:
             response: Response from Ollama
             
         Returns:
-            Parsed action dictionary or None
+            First action as a {'name', 'arguments'} dictionary, or None
+        """
+        actions = self.parse_actions(response)
+        return actions[0].to_tool_call() if actions else None
+    
+    def test_connection(self) -> bool:
         """
-        # Try to extract tool calls
-        tool_calls = self.extract_tool_calls(response)
+        Test connection to Ollama and model availability
         
-        if tool_calls:
-            return tool_calls[0]
+        Returns:
+            True if connection successful, False otherwise
+        """
+        try:
+            # Try to list models
+            return self._check_models(self.client.list())
+        except Exception as e:
+            print(f"✗ Error connecting to Ollama: {e}")
+            return False
+    
+    def _check_models(self, models) -> bool:
+        """Report whether the configured model is in a list() response"""
+        # Check if our model is available
+        # Newer ollama clients expose the name as 'model'
+        model_names = [m.get('model') or m.get('name') for m in models.get('models', [])]
         
-        # Fallback: try to parse from content
-        if 'message' in response and 'content' in response['message']:
-            content = response['message']['content']
-            
-            # Look for tool_call markers
-            if '<tool_call>' in content and '</tool_call>' in content:
-                try:
-                    json_str = content.split('<tool_call>')[1].split('</tool_call>')[0].strip()
-                    action = json.loads(json_str)
-                    return action
-                except (json.JSONDecodeError, IndexError) as e:
-                    print(f"Error parsing tool call: {e}")
+        if self.model in model_names or any(self.model in name for name in model_names):
+            print(f"✓ Model '{self.model}' is available")
+            return True
+        else:
+            print(f"✗ Model '{self.model}' not found")
+            print(f"Available models: {model_names}")
+            return False
+
+
+class AsyncOllamaVisionClient(OllamaVisionClient):
+    """
+    asyncio variant of OllamaVisionClient
+    
+    Requests go through an ollama.AsyncClient shared by everything running on
+    the same event loop, so many agents can drive one server concurrently over
+    one connection pool. Image resizing/encoding runs in a worker thread to
+    keep the loop responsive. Cancelling the awaiting task aborts the request.
+    """
+    
+    def __init__(self, *args, request_timeout: Optional[float] = None, **kwargs):
+        """
+        Initialize async Ollama client
         
-        return None
+        Args:
+            *args, **kwargs: Same as OllamaVisionClient
+            request_timeout: Default overall deadline for a chat call (seconds),
+                on top of the per-read HTTP timeout (None = no deadline)
+        """
+        super().__init__(*args, **kwargs)
+        self.request_timeout = request_timeout
     
-    def test_connection(self) -> bool:
+    @property
+    def async_client(self) -> ollama.AsyncClient:
+        """Shared ollama.AsyncClient of the running event loop"""
+        return get_shared_async_client(**self._connection)
+    
+    async def chat(self,
+                   messages: List[Dict[str, Any]],
+                   stream: bool = False,
+                   tools: Optional[List[Dict[str, Any]]] = None,
+                   timeout: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Send chat request to Ollama with vision support
+        
+        Args:
+            messages: List of message dictionaries
+            stream: Whether to stream the response (returns an async iterator)
+            tools: Optional list of tool definitions for function calling
+            timeout: Overall deadline in seconds (default: request_timeout)
+        
+        Returns:
+            Response dictionary from Ollama
+        
+        Raises:
+            asyncio.TimeoutError: The deadline passed; the request is cancelled
+        """
+        timeout = self.request_timeout if timeout is None else timeout
+        try:
+            request = self.async_client.chat(**self._chat_params(messages, stream, tools))
+            return await asyncio.wait_for(request, timeout)
+        except Exception as e:
+            print(f"Error in Ollama chat: {e!r}")
+            raise
+    
+    async def chat_until_tool_call(self,
+                                   messages: List[Dict[str, Any]],
+                                   tools: Optional[List[Dict[str, Any]]] = None,
+                                   timeout: Optional[float] = None,
+                                   max_calls: int = 1) -> Dict[str, Any]:
+        """
+        Stream a chat response and stop generating once its tool calls are complete
+        
+        Args:
+            messages: List of message dictionaries
+            tools: Optional list of tool definitions for function calling
+            timeout: Deadline for the whole stream (default: request_timeout)
+            max_calls: Stop after this many calls
+        
+        Returns:
+            Response dictionary in the non-streaming layout, with
+            'stopped_early' set when generation was cut off
+        """
+        timeout = self.request_timeout if timeout is None else timeout
+        return await asyncio.wait_for(self._stream_until_tool_call(messages, tools, max_calls), timeout)
+    
+    async def _stream_until_tool_call(self,
+                                      messages: List[Dict[str, Any]],
+                                      tools: Optional[List[Dict[str, Any]]],
+                                      max_calls: int) -> Dict[str, Any]:
+        parser = ToolCallStreamParser(max_calls)
+        stream = await self.async_client.chat(**self._chat_params(messages, True, tools))
+        try:
+            async for chunk in stream:
+                if parser.feed(chunk):
+                    break
+        finally:
+            aclose = getattr(stream, 'aclose', None)
+            if aclose is not None:
+                await aclose()
+        return parser.response()
+    
+    async def chat_with_image(self,
+                              user_query: str,
+                              image: Union[Image.Image, Frame],
+                              system_prompt: Optional[str] = None,
+                              tools: Optional[List[Dict[str, Any]]] = None,
+                              timeout: Optional[float] = None,
+                              stop_at_tool_call: bool = False,
+                              history: Optional[List[Dict[str, Any]]] = None,
+                              max_tool_calls: int = 1) -> Dict[str, Any]:
+        """
+        Chat with image input
+        
+        Args:
+            user_query: User's text query
+            image: PIL Image or captured Frame
+            system_prompt: Optional system prompt
+            tools: Optional list of tool definitions
+            timeout: Overall deadline in seconds (default: request_timeout)
+            stop_at_tool_call: Stream the response and stop generating as soon
+                as its tool calls are complete
+            history: Earlier turns inserted between the system and user messages
+            max_tool_calls: Tool calls to wait for when stop_at_tool_call is set
+        
+        Returns:
+            Response from the model
+        """
+        image_bytes = await asyncio.to_thread(self.encode_for_model, image)
+        messages = self._image_messages(user_query, image_bytes, system_prompt, history)
+        if stop_at_tool_call:
+            return await self.chat_until_tool_call(
+                messages=messages, tools=tools, timeout=timeout, max_calls=max_tool_calls
+            )
+        return await self.chat(messages=messages, tools=tools, timeout=timeout)
+    
+    async def warm_up(self, keep_alive: Optional[Union[float, str]] = None) -> Dict[str, Any]:
+        """
+        Load the model into memory with an empty chat request
+        
+        Args:
+            keep_alive: How long to keep the model loaded afterwards
+                (default: the client's keep_alive)
+        
+        Returns:
+            Dictionary with 'load_time', 'server_load_time' and 'done_reason'
+        """
+        keep_alive = self.keep_alive if keep_alive is None else keep_alive
+        start = time.perf_counter()
+        response = await self.async_client.chat(model=self.model, messages=[], keep_alive=keep_alive)
+        return self._load_report(response, time.perf_counter() - start)
+    
+    async def unload(self) -> None:
+        """Ask the server to unload the model now (keep_alive=0)"""
+        await self.async_client.chat(model=self.model, messages=[], keep_alive=0)
+    
+    async def test_connection(self) -> bool:
         """
         Test connection to Ollama and model availability
         
@@ -176,20 +726,7 @@ class OllamaVisionClient:
             True if connection successful, False otherwise
         """
         try:
-            # Try to list models
-            models = self.client.list()
-            
-            # Check if our model is available
-            model_names = [m['name'] for m in models.get('models', [])]
-            
-            if self.model in model_names or any(self.model in name for name in model_names):
-                print(f"✓ Model '{self.model}' is available")
-                return True
-            else:
-                print(f"✗ Model '{self.model}' not found")
-                print(f"Available models: {model_names}")
-                return False
-                
+            return self._check_models(await self.async_client.list())
         except Exception as e:
             print(f"✗ Error connecting to Ollama: {e}")
             return False
@@ -0,0 +1,645 @@
+"""
+Deterministic local stand-in for the Ollama server
+Implements the /api/chat (streaming and non-streaming), /api/tags, /api/show
+and /api/ps subset used by OllamaVisionClient, answering with scripted or
+recorded tool calls after configurable load, prefill and decode latencies.
+Point config.OLLAMA_BASE_URL (or OLLAMA_HOST) at it to benchmark the agent
+loop without a GPU.
+"""
+import io
+import sys
+import json
+import math
+import time
+import select
+import socket
+import base64
+import random
+import logging
+import threading
+from collections import Counter
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Union
+from PIL import Image
+
+from utils.image_processing import smart_resize, QWEN3_VL_FACTOR, QWEN3_VL_MAX_PIXELS
+
+
+# Text tokens are estimated (and streamed) as chunks of this many characters
+CHARS_PER_TOKEN = 4
+
+DEFAULT_SCRIPT = [
+    {'action': 'left_click', 'coordinate': [500, 500]},
+    {'action': 'terminate', 'status': 'success'},
+]
+
+
+class Latency:
+    """Random delay (seconds) drawn from a seeded distribution"""
+    
+    DISTRIBUTIONS = ('constant', 'uniform', 'normal', 'lognormal', 'exponential')
+    
+    def __init__(self, distribution: str = 'constant', *params: float, seed: Optional[int] = None):
+        """
+        Args:
+            distribution: constant (value), uniform (low, high), normal (mean,
+                stddev), lognormal (median, sigma) or exponential (mean)
+            *params: Distribution parameters in seconds
+            seed: Random seed (None = nondeterministic)
+        """
+        if distribution not in self.DISTRIBUTIONS:
+            raise ValueError(f"Unknown latency distribution: {distribution}")
+        self.distribution = distribution
+        self.params = tuple(float(p) for p in params) or (0.0,)
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+    
+    @classmethod
+    def parse(cls, spec: Union[str, float, 'Latency', None], seed: Optional[int] = None) -> 'Latency':
+        """
+        Build a Latency from a spec such as "0.5", "uniform:0.2,0.8" or
+        "lognormal:1.5,0.3"
+        """
+        if isinstance(spec, Latency):
+            return spec
+        if spec is None:
+            return cls('constant', 0.0)
+        if isinstance(spec, (int, float)):
+            return cls('constant', spec)
+        name, _, params = str(spec).partition(':')
+        if not params:
+            return cls('constant', float(name))
+        return cls(name, *(float(p) for p in params.split(',')), seed=seed)
+    
+    def sample(self) -> float:
+        """One delay in seconds (never negative)"""
+        p = self.params
+        with self._lock:
+            if self.distribution == 'constant':
+                value = p[0]
+            elif self.distribution == 'uniform':
+                value = self._random.uniform(p[0], p[1])
+            elif self.distribution == 'normal':
+                value = self._random.gauss(p[0], p[1])
+            elif self.distribution == 'lognormal':
+                value = self._random.lognormvariate(math.log(p[0]), p[1]) if p[0] > 0 else 0.0
+            else:
+                value = self._random.expovariate(1.0 / p[0]) if p[0] > 0 else 0.0
+        return max(0.0, value)
+    
+    def __repr__(self) -> str:
+        return f"Latency({self.distribution!r}, {', '.join(map(str, self.params))})"
+
+
+def _tool_call(arguments: Dict[str, Any], name: str = 'computer_use') -> Dict[str, Any]:
+    return {'function': {'name': name, 'arguments': arguments}}
+
+
+def normalize_reply(item: Any) -> Dict[str, Any]:
+    """
+    Convert one script item into {'content': str, 'tool_calls': list}
+    
+    Accepts an Ollama response ({'message': ...}), a step from a spilled
+    history file ({'response': ...}), a message, a list of action argument
+    dictionaries, a single action ({'action': ...}) or plain text.
+    """
+    if isinstance(item, str):
+        return {'content': item, 'tool_calls': []}
+    if isinstance(item, list):
+        return {'content': '', 'tool_calls': [_tool_call(args) for args in item]}
+    if 'response' in item and isinstance(item['response'], dict):
+        return normalize_reply(item['response'])
+    if 'message' in item:
+        return normalize_reply(item['message'])
+    if 'action' in item:
+        return {'content': '', 'tool_calls': [_tool_call(item)]}
+    
+    tool_calls = []
+    for call in item.get('tool_calls') or []:
+        function = call.get('function', call)
+        tool_calls.append(_tool_call(function.get('arguments') or {}, function.get('name') or 'computer_use'))
+    return {'content': item.get('content') or '', 'tool_calls': tool_calls}
+
+
+def load_script(path: Union[str, Path]) -> List[Dict[str, Any]]:
+    """
+    Load scripted replies from a JSON list or a JSONL file
+    
+    JSONL history files written by the agent (history_*.jsonl) replay the
+    recorded responses in order; steps without a response are skipped.
+    """
+    text = Path(path).read_text(encoding='utf-8')
+    stripped = text.lstrip()
+    if stripped.startswith('['):
+        items = json.loads(stripped)
+    else:
+        items = [json.loads(line) for line in text.splitlines() if line.strip()]
+    
+    replies = []
+    last_response = None
+    for item in items:
+        if isinstance(item, dict) and 'iteration' in item:
+            # History entries: one per executed action, sharing the response of a batch
+            if not item.get('response') or item['response'] == last_response:
+                continue
+            last_response = item['response']
+        replies.append(normalize_reply(item))
+    return replies
+
+
+def _parse_keep_alive(value: Any, default: float) -> float:
+    """keep_alive ("30m", "10s", "1h", seconds, negative = forever) in seconds"""
+    if value is None:
+        return default
+    if isinstance(value, (int, float)):
+        return math.inf if value < 0 else float(value)
+    text = str(value).strip()
+    units = {'ms': 1e-3, 's': 1, 'm': 60, 'h': 3600}
+    for unit in ('ms', 's', 'm', 'h'):
+        if text.endswith(unit):
+            seconds = float(text[:-len(unit)]) * units[unit]
+            break
+    else:
+        seconds = float(text)
+    return math.inf if seconds < 0 else seconds
+
+
+class OllamaStandIn:
+    """
+    Scripted model behind the stand-in HTTP API
+    
+    Each chat request consumes the next scripted reply (cycling when the
+    script runs out). A request costs load latency when the model is not
+    loaded, then prefill latency, then decode latency per generated token;
+    streamed replies emit one chunk per token and stop as soon as the client
+    disconnects, so early stopping saves time as it would on a real server.
+    """
+    
+    def __init__(self,
+                 script: Optional[Sequence[Any]] = None,
+                 models: Sequence[str] = ('qwen3-vl:235b-cloud',),
+                 load: Union[str, float, Latency, None] = 0.0,
+                 prefill: Union[str, float, Latency, None] = 0.0,
+                 decode: Union[str, float, Latency, None] = 0.0,
+                 text_tool_calls: bool = False,
+                 default_keep_alive: Union[str, float] = '5m',
+                 seed: Optional[int] = 0,
+                 model_scripts: Optional[Dict[str, Sequence[Any]]] = None):
+        """
+        Args:
+            script: Replies in the formats accepted by normalize_reply
+                (default: one click, then terminate)
+            models: Model names reported as available
+            load: Model load latency (cold requests only)
+            prefill: Prompt processing latency per request
+            decode: Latency per generated token
+            text_tool_calls: Send tool calls as <tool_call> blocks in the
+                content instead of structured message.tool_calls
+            default_keep_alive: keep_alive used when a request sets none
+            seed: Seed for all latency distributions
+            model_scripts: Separate scripts for some models (e.g. the fast
+                and strong tier of a routed agent); other models use script
+        """
+        self.replies = [normalize_reply(item) for item in (script or DEFAULT_SCRIPT)]
+        self.model_replies = {
+            model: [normalize_reply(item) for item in replies]
+            for model, replies in (model_scripts or {}).items()
+        }
+        self.models = list(models) + [model for model in self.model_replies if model not in models]
+        self.load = Latency.parse(load, seed)
+        self.prefill = Latency.parse(prefill, None if seed is None else seed + 1)
+        self.decode = Latency.parse(decode, None if seed is None else seed + 2)
+        self.text_tool_calls = text_tool_calls
+        self.default_keep_alive = _parse_keep_alive(default_keep_alive, 300.0)
+        self.logger = logging.getLogger(__name__)
+        
+        self._lock = threading.Lock()
+        self._positions = Counter()
+        self._loaded_until: Dict[str, float] = {}
+        
+        # Statistics
+        self.requests = 0
+        self.chat_requests = 0
+        self.loads = 0
+        self.aborted = 0
+        self.tokens_generated = 0
+    
+    def next_reply(self, model: Optional[str] = None) -> Dict[str, Any]:
+        """Next scripted reply for a model (each script cycles)"""
+        key = model if model in self.model_replies else None
+        replies = self.model_replies[key] if key is not None else self.replies
+        with self._lock:
+            reply = replies[self._positions[key] % len(replies)]
+            self._positions[key] += 1
+            return reply
+    
+    def reset(self) -> None:
+        """Restart the script and unload all models"""
+        with self._lock:
+            self._positions.clear()
+            self._loaded_until.clear()
+    
+    def _ensure_loaded(self, model: str, keep_alive: Any) -> float:
+        """Load the model if needed; returns the load time in seconds"""
+        now = time.monotonic()
+        with self._lock:
+            cold = self._loaded_until.get(model, 0.0) < now
+        load_time = self.load.sample() if cold else 0.0
+        if load_time:
+            time.sleep(load_time)
+        with self._lock:
+            if cold:
+                self.loads += 1
+            self._loaded_until[model] = time.monotonic() + _parse_keep_alive(keep_alive, self.default_keep_alive)
+        return load_time
+    
+    def _unload(self, model: str) -> None:
+        with self._lock:
+            self._loaded_until.pop(model, None)
+    
+    def loaded_models(self) -> List[str]:
+        """Models currently loaded"""
+        now = time.monotonic()
+        with self._lock:
+            return [model for model, until in self._loaded_until.items() if until >= now]
+    
+    @staticmethod
+    def prompt_tokens(messages: List[Dict[str, Any]], tools: Optional[List[Any]]) -> int:
+        """Estimated prompt tokens: text at CHARS_PER_TOKEN plus Qwen3-VL patch-grid image tokens"""
+        chars = len(json.dumps(tools)) if tools else 0
+        tokens = 0
+        for message in messages:
+            chars += len(message.get('content') or '')
+            for image in message.get('images') or []:
+                try:
+                    with Image.open(io.BytesIO(base64.b64decode(image))) as img:
+                        width, height = img.size
+                except Exception:
+                    continue
+                height, width = smart_resize(height, width, max_pixels=QWEN3_VL_MAX_PIXELS)
+                tokens += (height // QWEN3_VL_FACTOR) * (width // QWEN3_VL_FACTOR)
+        return tokens + chars // CHARS_PER_TOKEN
+    
+    def render(self, reply: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """
+        Split a reply into streamed message pieces
+        
+        Returns:
+            One message dictionary per generated token; structured tool calls
+            are attached to the piece that completes them
+        """
+        pieces = []
+        content = reply['content']
+        for start in range(0, len(content), CHARS_PER_TOKEN):
+            pieces.append({'role': 'assistant', 'content': content[start:start + CHARS_PER_TOKEN]})
+        
+        for call in reply['tool_calls']:
+            text = json.dumps(
+                {'name': call['function']['name'], 'arguments': call['function']['arguments']}
+            )
+            if self.text_tool_calls:
+                text = f"\n<tool_call>\n{text}\n</tool_call>"
+            tokens = [text[i:i + CHARS_PER_TOKEN] for i in range(0, len(text), CHARS_PER_TOKEN)]
+            if self.text_tool_calls:
+                pieces.extend({'role': 'assistant', 'content': token} for token in tokens)
+            else:
+                # Ollama parses the call server-side and emits it once complete
+                pieces.extend({'role': 'assistant', 'content': ''} for _ in tokens[:-1])
+                pieces.append({'role': 'assistant', 'content': '', 'tool_calls': [call]})
+        return pieces
+    
+    def chat(self, request: Dict[str, Any]):
+        """
+        Serve one /api/chat request
+        
+        Yields:
+            Response chunks (a single final chunk when not streaming)
+        """
+        model = request.get('model')
+        messages = request.get('messages') or []
+        keep_alive = request.get('keep_alive')
+        stream = request.get('stream', True)
+        started = time.perf_counter()
+        with self._lock:
+            self.requests += 1
+        
+        if not messages:
+            # Load / unload request (empty chat)
+            if keep_alive is not None and _parse_keep_alive(keep_alive, 0) == 0:
+                self._unload(model)
+                reason, load_time = 'unload', 0.0
+            else:
+                reason, load_time = 'load', self._ensure_loaded(model, keep_alive)
+            yield self._final_chunk(model, {'role': 'assistant', 'content': ''}, reason,
+                                    started, load_time, 0, 0.0, 0, 0.0)
+            return
+        
+        with self._lock:
+            self.chat_requests += 1
+        load_time = self._ensure_loaded(model, keep_alive)
+        prompt_tokens = self.prompt_tokens(messages, request.get('tools'))
+        prefill_time = self.prefill.sample()
+        time.sleep(prefill_time)
+        
+        decode_start = time.perf_counter()
+        pieces = self.render(self.next_reply(model))
+        content = ''
+        tool_calls = []
+        for piece in pieces:
+            time.sleep(self.decode.sample())
+            with self._lock:
+                self.tokens_generated += 1
+            content += piece['content']
+            tool_calls.extend(piece.get('tool_calls') or [])
+            if stream:
+                yield self._chunk(model, piece)
+        
+        message = {'role': 'assistant', 'content': '' if stream else content}
+        if tool_calls and not stream:
+            message['tool_calls'] = tool_calls
+        yield self._final_chunk(model, message, 'stop', started, load_time,
+                                prompt_tokens, prefill_time, len(pieces), time.perf_counter() - decode_start)
+    
+    @staticmethod
+    def _timestamp() -> str:
+        return datetime.now(timezone.utc).isoformat().replace('+00:00', 'Z')
+    
+    def _chunk(self, model: str, message: Dict[str, Any]) -> Dict[str, Any]:
+        return {'model': model, 'created_at': self._timestamp(), 'message': message, 'done': False}
+    
+    def _final_chunk(self, model, message, reason, started, load_time,
+                     prompt_tokens, prefill_time, eval_tokens, eval_time) -> Dict[str, Any]:
+        chunk = self._chunk(model, message)
+        chunk.update({
+            'done': True,
+            'done_reason': reason,
+            'total_duration': int((time.perf_counter() - started) * 1e9),
+            'load_duration': int(load_time * 1e9),
+            'prompt_eval_count': prompt_tokens,
+            'prompt_eval_duration': int(prefill_time * 1e9),
+            'eval_count': eval_tokens,
+            'eval_duration': int(eval_time * 1e9),
+        })
+        return chunk
+    
+    def _details(self) -> Dict[str, Any]:
+        return {
+            'format': 'stand-in',
+            'family': 'qwen3vl',
+            'families': ['qwen3vl'],
+            'parameter_size': '',
+            'quantization_level': '',
+        }
+    
+    def tags(self) -> Dict[str, Any]:
+        """/api/tags body"""
+        return {'models': [
+            {'name': model, 'model': model, 'modified_at': self._timestamp(), 'size': 0,
+             'digest': f"stand-in-{index}", 'details': self._details()}
+            for index, model in enumerate(self.models)
+        ]}
+    
+    def show(self, model: str) -> Optional[Dict[str, Any]]:
+        """/api/show body, or None for an unknown model"""
+        if model not in self.models:
+            return None
+        return {
+            'modelfile': f"FROM {model}\n",
+            'parameters': '',
+            'template': '{{ .Prompt }}',
+            'details': self._details(),
+            'model_info': {'general.architecture': 'qwen3vl'},
+            'capabilities': ['completion', 'vision', 'tools'],
+            'modified_at': self._timestamp(),
+        }
+    
+    def ps(self) -> Dict[str, Any]:
+        """/api/ps body"""
+        return {'models': [
+            {'name': model, 'model': model, 'size': 0, 'digest': model, 'details': self._details()}
+            for model in self.loaded_models()
+        ]}
+    
+    def stats(self) -> Dict[str, Any]:
+        """
+        Request counters
+        
+        A stream counts as aborted when the client closes the connection
+        before the last chunk is sent; tokens_generated stops at that point.
+        Without decode latency a whole reply is written before the client
+        can react, so early stops are only visible with --decode set.
+        """
+        return {
+            'requests': self.requests,
+            'chat_requests': self.chat_requests,
+            'loads': self.loads,
+            'aborted_streams': self.aborted,
+            'tokens_generated': self.tokens_generated,
+            'replies_served': sum(self._positions.values()),
+        }
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    
+    @property
+    def stand_in(self) -> OllamaStandIn:
+        return self.server.stand_in
+    
+    def log_message(self, format, *args) -> None:
+        self.stand_in.logger.debug("%s - %s", self.address_string(), format % args)
+    
+    def _send_json(self, body: Any, status: int = 200) -> None:
+        payload = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+    
+    def _read_json(self) -> Dict[str, Any]:
+        length = int(self.headers.get('Content-Length') or 0)
+        return json.loads(self.rfile.read(length) or b'{}')
+    
+    def _client_gone(self) -> bool:
+        """
+        Whether the client has closed the connection
+        
+        Writes into the socket buffer succeed long after the client stopped
+        reading, so a stopped stream is detected by the peer's FIN/RST
+        instead of by a failed write.
+        """
+        try:
+            readable, _, _ = select.select([self.connection], [], [], 0)
+            return bool(readable) and not self.connection.recv(1, socket.MSG_PEEK)
+        except (OSError, ValueError):
+            return True
+    
+    def do_HEAD(self) -> None:
+        self.send_response(200)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+    
+    def do_GET(self) -> None:
+        if self.path == '/':
+            payload = b'Ollama is running'
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; charset=utf-8')
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+        elif self.path == '/api/tags':
+            self._send_json(self.stand_in.tags())
+        elif self.path == '/api/ps':
+            self._send_json(self.stand_in.ps())
+        elif self.path == '/api/version':
+            self._send_json({'version': '0.0.0-stand-in'})
+        else:
+            self._send_json({'error': 'not found'}, 404)
+    
+    def do_POST(self) -> None:
+        try:
+            request = self._read_json()
+        except ValueError as e:
+            self._send_json({'error': f'invalid JSON: {e}'}, 400)
+            return
+        
+        if self.path == '/api/show':
+            body = self.stand_in.show(request.get('model') or request.get('name'))
+            if body is None:
+                self._send_json({'error': f"model '{request.get('model')}' not found"}, 404)
+            else:
+                self._send_json(body)
+        elif self.path == '/api/chat':
+            self._chat(request)
+        else:
+            self._send_json({'error': 'not found'}, 404)
+    
+    def _chat(self, request: Dict[str, Any]) -> None:
+        if request.get('model') not in self.stand_in.models:
+            self._send_json({'error': f"model '{request.get('model')}' not found"}, 404)
+            return
+        
+        chunks = self.stand_in.chat(request)
+        if not request.get('stream', True):
+            *_, final = chunks
+            self._send_json(final)
+            return
+        
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/x-ndjson')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        try:
+            for chunk in chunks:
+                if self._client_gone():
+                    raise ConnectionResetError("client closed the stream")
+                line = json.dumps(chunk).encode('utf-8') + b'\n'
+                self.wfile.write(b'%x\r\n%s\r\n' % (len(line), line))
+                self.wfile.flush()
+            self.wfile.write(b'0\r\n\r\n')
+        except (BrokenPipeError, ConnectionResetError):
+            # Client stopped reading (e.g. early stop at the tool call)
+            chunks.close()
+            with self.stand_in._lock:
+                self.stand_in.aborted += 1
+            self.close_connection = True
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    
+    def handle_error(self, request, client_address) -> None:
+        # Clients close streams early on purpose (stop at the tool call)
+        if isinstance(sys.exc_info()[1], (BrokenPipeError, ConnectionResetError)):
+            return
+        super().handle_error(request, client_address)
+
+
+class StandInServer:
+    """
+    Threaded HTTP server around an OllamaStandIn
+    
+    Usable as a context manager; port 0 picks a free port (see url).
+    """
+    
+    def __init__(self, stand_in: Optional[OllamaStandIn] = None, host: str = '127.0.0.1', port: int = 11435):
+        """
+        Args:
+            stand_in: Scripted model (default: OllamaStandIn())
+            host: Interface to bind
+            port: TCP port (0 = any free port)
+        """
+        self.stand_in = stand_in or OllamaStandIn()
+        self._server = _Server((host, port), _Handler)
+        self._server.stand_in = self.stand_in
+        self._thread = None
+    
+    @property
+    def url(self) -> str:
+        """Base URL for OllamaVisionClient(host=...)"""
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+    
+    def start(self) -> 'StandInServer':
+        """Serve in a background thread"""
+        self._thread = threading.Thread(target=self._server.serve_forever, name='ollama-stand-in', daemon=True)
+        self._thread.start()
+        return self
+    
+    def serve_forever(self) -> None:
+        """Serve in the calling thread"""
+        self._server.serve_forever()
+    
+    def stop(self) -> None:
+        """Stop serving and close the socket"""
+        if self._thread is not None:
+            self._server.shutdown()
+            self._thread.join()
+            self._thread = None
+        self._server.server_close()
+    
+    def __enter__(self) -> 'StandInServer':
+        return self.start()
+    
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+
+if __name__ == "__main__":
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Serve scripted Ollama responses for benchmarking.")
+    parser.add_argument("--script", type=str, help="JSON/JSONL replies or an agent history_*.jsonl file")
+    parser.add_argument("--model", action="append", help="Model name to report (repeatable)")
+    parser.add_argument("--host", type=str, default="127.0.0.1", help="Interface to bind")
+    parser.add_argument("--port", type=int, default=11435, help="TCP port")
+    parser.add_argument("--load", type=str, default="0", help="Cold-load latency, e.g. 8 or uniform:5,10")
+    parser.add_argument("--prefill", type=str, default="0", help="Per-request prefill latency, e.g. lognormal:1.2,0.3")
+    parser.add_argument("--decode", type=str, default="0", help="Per-token decode latency, e.g. normal:0.03,0.005")
+    parser.add_argument("--text-tool-calls", action="store_true", help="Send <tool_call> blocks instead of structured calls")
+    parser.add_argument("--seed", type=int, default=0, help="Latency random seed")
+    args = parser.parse_args()
+    
+    logging.basicConfig(level=logging.INFO)
+    stand_in = OllamaStandIn(
+        script=load_script(args.script) if args.script else None,
+        models=args.model or ['qwen3-vl:235b-cloud'],
+        load=args.load,
+        prefill=args.prefill,
+        decode=args.decode,
+        text_tool_calls=args.text_tool_calls,
+        seed=args.seed
+    )
+    server = StandInServer(stand_in, args.host, args.port)
+    print(f"Ollama stand-in on {server.url} serving {stand_in.models} "
+          f"({len(stand_in.replies)} scripted replies)")
+    print(f"Set OLLAMA_BASE_URL = \"{server.url}\" in config.py to use it")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print(f"\n{stand_in.stats()}")
+    finally:
+        server.stop()
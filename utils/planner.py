@@ -0,0 +1,176 @@
+"""
+Planner/executor split
+One planner call turns the task into an ordered list of sub-goals. Each step
+then needs only a short grounding call ("where is X?") on a downscaled
+screenshot, or no model call at all for keyboard, wait and terminate steps.
+"""
+from typing import Any, Dict, List, Optional
+
+from utils.action_parser import loads_lenient
+
+
+PLANNER_PROMPT = """You plan tasks on a Windows 11 computer for an agent that controls the mouse and keyboard.
+
+Given the task and a screenshot of the current screen, reply with ONLY a JSON array of the remaining steps, in order. Each step is an object with:
+- "goal": short description of the step
+- "action": one of left_click, double_click, right_click, mouse_move, type, key, scroll, wait, terminate
+- "target": for click and mouse_move actions, a description of the UI element precise enough to find it on screen (e.g. "Save button in the dialog")
+- "text": for type, the text to type
+- "keys": for key, the list of keys (e.g. ["ctrl", "s"])
+- "pixels": for scroll, the amount (positive = up)
+- "time": for wait, seconds
+- "status": for terminate, "success" or "failure"
+
+End the plan with a terminate step."""
+
+GROUNDING_PROMPT = """You locate UI elements in screenshots.
+Reply with ONLY a JSON object {"coordinate": [x, y]} giving the center of the described element, with x and y from 0 to 1000 relative to the image width and height. Reply {"coordinate": null} if the element is not visible."""
+
+# Actions whose target must be located on screen before they can run
+GROUNDED_ACTIONS = ('left_click', 'right_click', 'middle_click', 'double_click',
+                    'triple_click', 'mouse_move', 'left_click_drag')
+
+# Actions that are not expected to change the screen
+NO_VISIBLE_EFFECT = ('mouse_move', 'wait', 'answer', 'terminate')
+
+# Plan fields that are not computer_use arguments
+_PLAN_FIELDS = ('goal', 'target', 'description')
+
+
+class SubGoal:
+    """One planned step: description, action arguments and the element to locate"""
+    
+    __slots__ = ('description', 'arguments', 'target')
+    
+    def __init__(self, description: str, arguments: Dict[str, Any], target: Optional[str] = None):
+        """
+        Args:
+            description: What the step achieves
+            arguments: computer_use arguments without the coordinate
+            target: Description of the element to locate (grounded actions)
+        """
+        self.description = description
+        self.arguments = arguments
+        self.target = target
+    
+    @property
+    def kind(self) -> Optional[str]:
+        return self.arguments.get('action')
+    
+    @property
+    def needs_grounding(self) -> bool:
+        """Whether a grounding call must locate the target first"""
+        return self.kind in GROUNDED_ACTIONS and 'coordinate' not in self.arguments
+    
+    @property
+    def expects_change(self) -> bool:
+        """Whether the step should visibly change the screen"""
+        return self.kind not in NO_VISIBLE_EFFECT
+    
+    def to_arguments(self, coordinate: Optional[List[int]] = None) -> Dict[str, Any]:
+        """computer_use arguments, with the grounded coordinate if given"""
+        arguments = dict(self.arguments)
+        if coordinate is not None:
+            arguments['coordinate'] = coordinate
+        return arguments
+    
+    def __repr__(self) -> str:
+        return f"SubGoal({self.description!r}, {self.arguments!r}, target={self.target!r})"
+
+
+def _content(response: Any) -> str:
+    message = response.get('message') if hasattr(response, 'get') else None
+    return (message or {}).get('content') or ''
+
+
+def _json_span(text: str, opener: str, closer: str) -> Optional[str]:
+    start = text.find(opener)
+    if start < 0:
+        return None
+    end = text.rfind(closer)
+    return text[start:end + 1] if end > start else text[start:]
+
+
+def parse_plan(response: Any) -> List[SubGoal]:
+    """
+    Parse a planner response
+    
+    Args:
+        response: Planner model response
+    
+    Returns:
+        Sub-goals in order (empty if the response holds no usable plan)
+    """
+    span = _json_span(_content(response), '[', ']')
+    if span is None:
+        return []
+    try:
+        steps = loads_lenient(span)
+    except ValueError:
+        return []
+    
+    goals = []
+    for step in steps if isinstance(steps, list) else []:
+        if not isinstance(step, dict) or not step.get('action'):
+            continue
+        arguments = {key: value for key, value in step.items() if key not in _PLAN_FIELDS}
+        description = step.get('goal') or step.get('description') or arguments['action']
+        goals.append(SubGoal(description, arguments, step.get('target')))
+    return goals
+
+
+def parse_point(response: Any) -> Optional[List[int]]:
+    """
+    Parse a grounding response
+    
+    Args:
+        response: Grounding model response
+    
+    Returns:
+        [x, y] in the model's 0-1000 coordinate space, or None if the element
+        was not found
+    """
+    span = _json_span(_content(response), '{', '}')
+    if span is None:
+        return None
+    try:
+        point = loads_lenient(span)
+    except ValueError:
+        return None
+    coordinate = point.get('coordinate') if isinstance(point, dict) else None
+    if not isinstance(coordinate, (list, tuple)) or len(coordinate) != 2:
+        return None
+    try:
+        return [int(round(float(value))) for value in coordinate]
+    except (TypeError, ValueError):
+        return None
+
+
+class Plan:
+    """Sub-goals with a cursor; the planner is asked again only when a step fails verification"""
+    
+    def __init__(self, goals: List[SubGoal]):
+        self.goals = goals
+        self.position = 0
+    
+    @property
+    def finished(self) -> bool:
+        return self.position >= len(self.goals)
+    
+    @property
+    def current(self) -> Optional[SubGoal]:
+        return None if self.finished else self.goals[self.position]
+    
+    @property
+    def completed(self) -> List[SubGoal]:
+        return self.goals[:self.position]
+    
+    def advance(self) -> SubGoal:
+        """Mark the current sub-goal as dispatched and return it"""
+        goal = self.goals[self.position]
+        self.position += 1
+        return goal
+    
+    def describe(self) -> str:
+        """Numbered list of the sub-goals"""
+        return "\n".join(f"{index + 1}. {goal.description}" for index, goal in enumerate(self.goals))
@@ -0,0 +1,268 @@
+"""
+Screenshot-keyed cache of model responses
+Keys combine the task, a hash of the prompt and tool definitions, and a
+perceptual hash of the screenshot, so re-running a workflow on an identical
+desktop can skip inference entirely
+"""
+import json
+import time
+import hashlib
+import sqlite3
+import threading
+import logging
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple, Union
+from PIL import Image
+
+from utils.screenshot_capture import Frame
+
+
+def perceptual_hash(image: Union[Image.Image, Frame], hash_size: int = 16) -> int:
+    """
+    Difference hash (dHash) of an image
+    
+    The image is box-filtered down to (hash_size + 1) x hash_size grayscale
+    cells and each bit records whether a cell is brighter than its right
+    neighbour. Small rendering noise leaves the hash unchanged. For a Frame the
+    hash is memoized on the frame.
+    
+    Args:
+        image: PIL Image or captured Frame
+        hash_size: Grid size; the hash has hash_size ** 2 bits
+    
+    Returns:
+        Hash as an integer
+    """
+    if isinstance(image, Frame):
+        return image.memo(('phash', hash_size), lambda: perceptual_hash(image.to_image(), hash_size))
+    
+    small = image.resize((hash_size + 1, hash_size), Image.Resampling.BOX).convert('L')
+    pixels = small.tobytes()
+    value = 0
+    for row in range(hash_size):
+        offset = row * (hash_size + 1)
+        for col in range(hash_size):
+            value = (value << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return value
+
+
+def to_plain(obj: Any) -> Any:
+    """Convert ollama response models into JSON-serializable structures"""
+    if hasattr(obj, 'model_dump'):
+        return to_plain(obj.model_dump(exclude_none=True))
+    if isinstance(obj, dict):
+        return {key: to_plain(value) for key, value in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [to_plain(value) for value in obj]
+    return obj
+
+
+class ResponseCache:
+    """
+    Two-tier response cache: in-memory LRU with TTL, optional sqlite file
+    
+    The sqlite tier can be shared by several processes (WAL mode); entries
+    found there are promoted into memory.
+    """
+    
+    def __init__(self,
+                 max_entries: int = 256,
+                 ttl: Optional[float] = 3600.0,
+                 db_path: Optional[Union[str, Path]] = None,
+                 hash_size: int = 16,
+                 max_distance: int = 0):
+        """
+        Initialize the cache
+        
+        Args:
+            max_entries: In-memory LRU capacity
+            ttl: Seconds an entry stays valid (None = forever)
+            db_path: sqlite file for the persistent tier (None = memory only)
+            hash_size: Perceptual hash grid size
+            max_distance: Hamming distance within which two screenshot hashes
+                count as the same screen (0 = exact match only)
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hash_size = hash_size
+        self.max_distance = max_distance
+        self.logger = logging.getLogger(__name__)
+        
+        self._entries: "OrderedDict[Tuple[str, int], Tuple[float, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+        
+        self._db = None
+        if db_path is not None:
+            self._db = sqlite3.connect(str(db_path), timeout=5.0, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "context TEXT NOT NULL, screen TEXT NOT NULL, created REAL NOT NULL, "
+                "response TEXT NOT NULL, PRIMARY KEY (context, screen))"
+            )
+            self._db.commit()
+        
+        # Statistics
+        self.hits = 0
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+        self.expired = 0
+    
+    def key(self,
+            task: str,
+            prompt: str,
+            tools: Optional[List[Dict[str, Any]]],
+            image: Union[Image.Image, Frame]) -> Tuple[str, int]:
+        """
+        Build the cache key of a model call
+        
+        Args:
+            task: Task text
+            prompt: Full prompt text (system + user)
+            tools: Tool definitions sent with the request
+            image: Screenshot sent with the request
+        
+        Returns:
+            (context digest, screenshot hash)
+        """
+        digest = hashlib.sha256()
+        for part in (task, prompt, json.dumps(tools, sort_keys=True, default=str)):
+            digest.update(part.encode('utf-8'))
+            digest.update(b'\0')
+        return digest.hexdigest(), perceptual_hash(image, self.hash_size)
+    
+    def _expired(self, created: float, now: float) -> bool:
+        return self.ttl is not None and now - created > self.ttl
+    
+    def get(self, key: Tuple[str, int]) -> Optional[Dict[str, Any]]:
+        """
+        Look up a response
+        
+        Args:
+            key: Key from key()
+        
+        Returns:
+            Cached response dictionary, or None on a miss
+        """
+        now = time.time()
+        with self._lock:
+            payload = self._get_memory(key, now)
+            if payload is not None:
+                self.hits += 1
+                self.memory_hits += 1
+                return json.loads(payload)
+            
+            payload = self._get_disk(key, now)
+            if payload is not None:
+                self.hits += 1
+                self.disk_hits += 1
+                self._put_memory(key, payload, now)
+                return json.loads(payload)
+            
+            self.misses += 1
+            return None
+    
+    def _get_memory(self, key: Tuple[str, int], now: float) -> Optional[str]:
+        entry_key = key
+        if key not in self._entries and self.max_distance:
+            entry_key = self._nearest(key, ((k[1], k) for k in self._entries if k[0] == key[0]))
+        entry = self._entries.get(entry_key)
+        if entry is None:
+            return None
+        created, payload = entry
+        if self._expired(created, now):
+            del self._entries[entry_key]
+            self.expired += 1
+            return None
+        self._entries.move_to_end(entry_key)
+        return payload
+    
+    def _get_disk(self, key: Tuple[str, int], now: float) -> Optional[str]:
+        if self._db is None:
+            return None
+        context, screen = key
+        row = self._db.execute(
+            "SELECT created, response FROM responses WHERE context = ? AND screen = ?",
+            (context, format(screen, 'x'))
+        ).fetchone()
+        if row is None and self.max_distance:
+            rows = self._db.execute(
+                "SELECT screen, created, response FROM responses WHERE context = ?", (context,)
+            ).fetchall()
+            nearest = self._nearest(key, ((int(r[0], 16), r) for r in rows))
+            row = nearest[1:] if nearest is not None else None
+        if row is None or self._expired(row[0], now):
+            return None
+        return row[1]
+    
+    def _nearest(self, key: Tuple[str, int], candidates) -> Optional[Any]:
+        """Closest candidate (by Hamming distance of screen hashes) within max_distance"""
+        best, best_distance = None, self.max_distance + 1
+        for screen, item in candidates:
+            distance = bin(screen ^ key[1]).count('1')
+            if distance < best_distance:
+                best, best_distance = item, distance
+        return best
+    
+    def _put_memory(self, key: Tuple[str, int], payload: str, now: float) -> None:
+        self._entries[key] = (now, payload)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+    
+    def put(self, key: Tuple[str, int], response: Any) -> None:
+        """
+        Store a response
+        
+        Args:
+            key: Key from key()
+            response: Model response (dict or ollama ChatResponse)
+        """
+        payload = json.dumps(to_plain(response), default=str)
+        now = time.time()
+        with self._lock:
+            self._put_memory(key, payload, now)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO responses (context, screen, created, response) VALUES (?, ?, ?, ?)",
+                    (key[0], format(key[1], 'x'), now, payload)
+                )
+                if self.ttl is not None:
+                    self._db.execute("DELETE FROM responses WHERE created < ?", (now - self.ttl,))
+                self._db.commit()
+            self.stores += 1
+    
+    def clear(self) -> None:
+        """Drop all entries (both tiers)"""
+        with self._lock:
+            self._entries.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM responses")
+                self._db.commit()
+    
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and current size"""
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'memory_hits': self.memory_hits,
+            'disk_hits': self.disk_hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'stores': self.stores,
+            'evictions': self.evictions,
+            'expired': self.expired,
+            'entries': len(self._entries),
+        }
+    
+    def close(self) -> None:
+        """Close the sqlite tier"""
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
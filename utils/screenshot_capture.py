@@ -4,18 +4,465 @@ Uses mss for efficient screen capture
 """
 import mss
 import mss.tools
+import numpy as np
 from PIL import Image
 import io
 import base64
-from typing import Tuple, Optional
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, Hashable, Iterator, List, Tuple, Optional
+
+
+class FramePool:
+    """Reusable pool of preallocated pixel buffers, keyed by array shape"""
+    
+    def __init__(self, max_buffers_per_shape: int = 4):
+        """
+        Initialize the pool
+        
+        Args:
+            max_buffers_per_shape: Maximum idle buffers kept for each shape
+        """
+        self.max_buffers_per_shape = max_buffers_per_shape
+        self._free: Dict[Tuple[int, ...], List[np.ndarray]] = {}
+        self._lock = threading.Lock()
+        self.allocations = 0
+    
+    def acquire(self, shape: Tuple[int, ...]) -> np.ndarray:
+        """
+        Get a uint8 buffer of the given shape, reusing an idle one if possible
+        
+        Args:
+            shape: Array shape, e.g. (height, width, 3)
+        
+        Returns:
+            Uninitialized uint8 array
+        """
+        with self._lock:
+            free = self._free.get(shape)
+            if free:
+                return free.pop()
+            self.allocations += 1
+        return np.empty(shape, dtype=np.uint8)
+    
+    def release(self, buffer: np.ndarray) -> None:
+        """
+        Return a buffer to the pool
+        
+        Args:
+            buffer: Array previously obtained from acquire()
+        """
+        with self._lock:
+            free = self._free.setdefault(buffer.shape, [])
+            if len(free) < self.max_buffers_per_shape:
+                free.append(buffer)
+
+
+class Frame:
+    """
+    A captured screen frame backed by the raw BGRA buffer returned by mss
+    
+    Pixel data is exposed without copying (memoryview / NumPy view). RGB and
+    PIL conversions happen lazily, only when a consumer asks for them, and the
+    RGB buffer is drawn from a FramePool so steady-state capture does not
+    allocate.
+    """
+    
+    __slots__ = ('raw', 'width', 'height', 'left', 'top', 'timestamp',
+                 '_pool', '_rgb', '_image', '_memo')
+    
+    def __init__(self,
+                 raw: bytearray,
+                 width: int,
+                 height: int,
+                 left: int = 0,
+                 top: int = 0,
+                 timestamp: Optional[float] = None,
+                 pool: Optional[FramePool] = None):
+        """
+        Wrap a raw BGRA buffer
+        
+        Args:
+            raw: BGRA pixel buffer (width * height * 4 bytes)
+            width: Frame width in pixels
+            height: Frame height in pixels
+            left: X offset of the captured region on the desktop
+            top: Y offset of the captured region on the desktop
+            timestamp: Capture time (time.monotonic()), defaults to now
+            pool: Pool used for lazily converted buffers
+        """
+        self.raw = raw
+        self.width = width
+        self.height = height
+        self.left = left
+        self.top = top
+        self.timestamp = time.monotonic() if timestamp is None else timestamp
+        self._pool = pool
+        self._rgb = None
+        self._image = None
+        self._memo = None
+    
+    @classmethod
+    def from_image(cls, image: Image.Image, pool: Optional[FramePool] = None) -> 'Frame':
+        """
+        Build a frame from a PIL Image (used when no live capture is available)
+        
+        Args:
+            image: PIL Image object
+            pool: Optional buffer pool
+        
+        Returns:
+            Frame holding the image pixels
+        """
+        raw = bytearray(image.convert('RGB').tobytes('raw', 'BGRX'))
+        frame = cls(raw, image.width, image.height, pool=pool)
+        frame._image = image
+        return frame
+    
+    @property
+    def size(self) -> Tuple[int, int]:
+        """Frame size as (width, height)"""
+        return self.width, self.height
+    
+    @property
+    def memoryview(self) -> memoryview:
+        """Zero-copy memoryview over the raw BGRA bytes"""
+        return memoryview(self.raw)
+    
+    @property
+    def bgra(self) -> np.ndarray:
+        """Zero-copy (height, width, 4) uint8 view over the raw BGRA bytes"""
+        return np.frombuffer(self.raw, dtype=np.uint8).reshape(self.height, self.width, 4)
+    
+    @property
+    def rgb_view(self) -> np.ndarray:
+        """Zero-copy, non-contiguous (height, width, 3) RGB view"""
+        return self.bgra[:, :, 2::-1]
+    
+    def to_rgb(self) -> np.ndarray:
+        """
+        Contiguous RGB array, converted once into a pooled buffer
+        
+        Returns:
+            (height, width, 3) uint8 array
+        """
+        if self._rgb is None:
+            shape = (self.height, self.width, 3)
+            rgb = self._pool.acquire(shape) if self._pool else np.empty(shape, dtype=np.uint8)
+            np.copyto(rgb, self.rgb_view)
+            self._rgb = rgb
+        return self._rgb
+    
+    def to_image(self) -> Image.Image:
+        """
+        PIL Image of the frame, decoded once straight from the BGRA buffer
+        
+        Returns:
+            PIL Image object (RGB)
+        """
+        if self._image is None:
+            self._image = Image.frombuffer('RGB', self.size, self.raw, 'raw', 'BGRX', 0, 1)
+        return self._image
+    
+    def memo(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        """
+        Compute a derived value once per frame (e.g. encoded bytes)
+        
+        Args:
+            key: Identifies the derivation (encoder, resize settings, ...)
+            compute: Called on the first request for key
+        
+        Returns:
+            Cached value for key
+        """
+        if self._memo is None:
+            self._memo = {}
+        if key not in self._memo:
+            self._memo[key] = compute()
+        return self._memo[key]
+    
+    def release(self) -> None:
+        """Return pooled buffers; the frame must not be used afterwards"""
+        if self._rgb is not None and self._pool is not None:
+            self._pool.release(self._rgb)
+        self._rgb = None
+        self._image = None
+
+
+class FrameRingBuffer:
+    """Bounded, thread-safe ring of timestamped frames; the oldest frame is dropped when full"""
+    
+    def __init__(self, capacity: int = 8):
+        """
+        Initialize the ring buffer
+        
+        Args:
+            capacity: Maximum number of frames kept
+        """
+        self._frames = deque(maxlen=capacity)
+        self._cond = threading.Condition()
+        self._next_seq = 0
+        self._closed = False
+    
+    def push(self, frame: Frame) -> int:
+        """
+        Append a frame and wake up waiting consumers
+        
+        Args:
+            frame: Newly captured frame
+        
+        Returns:
+            Sequence number assigned to the frame
+        """
+        with self._cond:
+            seq = self._next_seq
+            self._next_seq += 1
+            self._frames.append((seq, frame))
+            self._cond.notify_all()
+        return seq
+    
+    def latest(self) -> Optional[Frame]:
+        """Newest frame, or None if nothing was captured yet"""
+        with self._cond:
+            return self._frames[-1][1] if self._frames else None
+    
+    def frames(self) -> List[Frame]:
+        """Snapshot of the buffered frames, oldest first"""
+        with self._cond:
+            return [frame for _, frame in self._frames]
+    
+    def wait_for_frame(self,
+                       after_seq: int = -1,
+                       newer_than: Optional[float] = None,
+                       timeout: Optional[float] = None) -> Optional[Tuple[int, Frame]]:
+        """
+        Block until a frame newer than the given sequence number / timestamp exists
+        
+        Args:
+            after_seq: Only return frames with a higher sequence number
+            newer_than: Only return frames captured at or after this time.monotonic() value
+            timeout: Maximum time to wait (seconds)
+        
+        Returns:
+            Tuple of (sequence number, frame) for the newest frame, or None on timeout/close
+        """
+        def ready():
+            if not self._frames:
+                return False
+            seq, frame = self._frames[-1]
+            return seq > after_seq and (newer_than is None or frame.timestamp >= newer_than)
+        
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._closed or ready(), timeout) or not ready():
+                return None
+            return self._frames[-1]
+    
+    def close(self) -> None:
+        """Wake up all waiters; no more frames will arrive"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+    
+    @property
+    def closed(self) -> bool:
+        """Whether the producer has stopped"""
+        return self._closed
 
 
 class ScreenshotCapture:
     """Captures screenshots on Windows 11 using mss library"""
     
-    def __init__(self):
-        self.sct = mss.mss()
+    def __init__(self, pool: Optional[FramePool] = None):
+        """
+        Initialize screenshot capture
+        
+        Args:
+            pool: Optional shared buffer pool for frame conversions
+        """
+        self.frame_pool = pool or FramePool()
+        
+        # mss handles must not be shared across threads: one per calling thread
+        self._local = threading.local()
+        self._handles: List = []
+        self._handles_lock = threading.Lock()
+        # Open the constructing thread's handle now, so a missing display fails here
+        self.sct
+        
+        # Continuous capture state
+        self.ring_buffer: Optional[FrameRingBuffer] = None
+        self.capture_error: Optional[BaseException] = None
+        self._capture_thread: Optional[threading.Thread] = None
+        self._capture_monitor = None
+        self._stop_event = threading.Event()
+    
+    @property
+    def sct(self):
+        """mss handle of the calling thread (created on first use)"""
+        sct = getattr(self._local, 'sct', None)
+        if sct is None:
+            sct = self._local.sct = mss.mss()
+            with self._handles_lock:
+                self._handles.append(sct)
+        return sct
+    
+    @property
+    def continuous(self) -> bool:
+        """Whether the background capture thread is running"""
+        return self._capture_thread is not None and self._capture_thread.is_alive()
+    
+    def start_continuous_capture(self,
+                                 fps: float = 10.0,
+                                 buffer_size: int = 8,
+                                 monitor_number: int = 1) -> FrameRingBuffer:
+        """
+        Start a background thread that captures into a ring buffer
+        
+        The thread owns its own mss handle (mss handles must not be shared
+        across threads). While it runs, capture_frame() for the same monitor
+        is served from the ring buffer instead of calling grab().
+        
+        Args:
+            fps: Capture rate (frames per second)
+            buffer_size: Number of frames kept in the ring buffer
+            monitor_number: Monitor to capture
+        
+        Returns:
+            The ring buffer frames are written to
+        """
+        if self.continuous:
+            return self.ring_buffer
+        
+        self.ring_buffer = FrameRingBuffer(buffer_size)
+        self.capture_error = None
+        self._capture_monitor = monitor_number
+        self._stop_event.clear()
+        self._capture_thread = threading.Thread(
+            target=self._capture_loop,
+            args=(fps, monitor_number, self.ring_buffer),
+            name="ScreenshotCapture",
+            daemon=True
+        )
+        self._capture_thread.start()
+        return self.ring_buffer
+    
+    def stop_continuous_capture(self, timeout: float = 2.0) -> None:
+        """
+        Stop the background capture thread
+        
+        Args:
+            timeout: Maximum time to wait for the thread to exit
+        """
+        if self._capture_thread is None:
+            return
+        self._stop_event.set()
+        self._capture_thread.join(timeout)
+        self._capture_thread = None
+        self._capture_monitor = None
+    
+    def _capture_loop(self, fps: float, monitor_number: int, ring: FrameRingBuffer) -> None:
+        """Background capture loop, paced at fps"""
+        interval = 1.0 / fps
+        try:
+            with mss.mss() as sct:
+                monitor = sct.monitors[monitor_number]
+                next_tick = time.monotonic()
+                while not self._stop_event.is_set():
+                    timestamp = time.monotonic()
+                    screenshot = sct.grab(monitor)
+                    width, height = screenshot.size
+                    # Ring frames are shared between consumers, so they are
+                    # not tied to the pool (release() never recycles buffers)
+                    ring.push(Frame(
+                        screenshot.raw, width, height,
+                        left=screenshot.left, top=screenshot.top,
+                        timestamp=timestamp
+                    ))
+                    
+                    next_tick += interval
+                    delay = next_tick - time.monotonic()
+                    if delay > 0:
+                        self._stop_event.wait(delay)
+                    else:
+                        next_tick = time.monotonic()
+        except Exception as e:
+            self.capture_error = e
+        finally:
+            ring.close()
+    
+    def latest_frame(self) -> Optional[Frame]:
+        """
+        Newest frame from the background capture, without waiting
+        
+        Returns:
+            Frame, or None if continuous capture is not running or has no frame yet
+        """
+        if self.ring_buffer is None or not self.continuous:
+            return None
+        return self.ring_buffer.latest()
+    
+    def iter_frames(self, fps: Optional[float] = None, timeout: float = 5.0) -> Iterator[Frame]:
+        """
+        Yield frames from the background capture
+        
+        Applies backpressure: each frame is the newest one available when the
+        consumer asks for it, frames a slow consumer missed are skipped rather
+        than queued, and the generator never yields faster than fps.
+        
+        Args:
+            fps: Maximum rate to yield frames (None = as fast as they are captured)
+            timeout: Maximum time to wait for a new frame
+        
+        Yields:
+            Frame objects
+        """
+        if self.ring_buffer is None:
+            raise RuntimeError("Continuous capture is not running")
         
+        ring = self.ring_buffer
+        interval = 1.0 / fps if fps else 0.0
+        seq = -1
+        next_tick = time.monotonic()
+        while True:
+            item = ring.wait_for_frame(after_seq=seq, timeout=timeout)
+            if item is None:
+                if self.capture_error is not None:
+                    raise RuntimeError(f"Background capture failed: {self.capture_error}")
+                return
+            seq, frame = item
+            yield frame
+            
+            if interval:
+                next_tick = max(next_tick + interval, time.monotonic())
+                delay = next_tick - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+    
+    def capture_frame(self, monitor_number: int = 1) -> Frame:
+        """
+        Capture a zero-copy frame of the specified monitor
+        
+        Args:
+            monitor_number: Monitor to capture (1 = primary monitor)
+        
+        Returns:
+            Frame backed by the raw mss buffer
+        """
+        if self.continuous and monitor_number == self._capture_monitor:
+            # Serve from the background stream: first frame grabbed after this call
+            item = self.ring_buffer.wait_for_frame(newer_than=time.monotonic(), timeout=1.0)
+            if item is not None:
+                return item[1]
+        
+        monitor = self.sct.monitors[monitor_number]
+        screenshot = self.sct.grab(monitor)
+        width, height = screenshot.size
+        return Frame(
+            screenshot.raw, width, height,
+            left=screenshot.left, top=screenshot.top,
+            pool=self.frame_pool
+        )
+    
     def capture_screen(self, monitor_number: int = 1) -> Image.Image:
         """
         Capture screenshot of specified monitor
@@ -26,12 +473,7 @@ class ScreenshotCapture:
         Returns:
             PIL Image object
         """
-        monitor = self.sct.monitors[monitor_number]
-        screenshot = self.sct.grab(monitor)
-        
-        # Convert to PIL Image
-        img = Image.frombytes('RGB', screenshot.size, screenshot.rgb)
-        return img
+        return self.capture_frame(monitor_number).to_image()
     
     def capture_and_save(self, output_path: str, monitor_number: int = 1) -> str:
         """
@@ -48,19 +490,23 @@ class ScreenshotCapture:
         img.save(output_path)
         return output_path
     
-    def capture_to_base64(self, monitor_number: int = 1, format: str = 'PNG') -> str:
+    def capture_to_base64(self, monitor_number: int = 1, format: str = 'PNG', encoder=None) -> str:
         """
         Capture screenshot and encode as base64
         
         Args:
             monitor_number: Monitor to capture
             format: Image format (PNG, JPEG, etc.)
+            encoder: Optional ImageEncoder (utils.image_encoder); overrides format
             
         Returns:
             Base64 encoded string
         """
         img = self.capture_screen(monitor_number)
         
+        if encoder is not None:
+            return encoder.encode_to_base64(img)
+        
         # Convert to base64
         buffer = io.BytesIO()
         img.save(buffer, format=format)
@@ -93,8 +539,13 @@ class ScreenshotCapture:
     
     def __del__(self):
         """Cleanup mss instance"""
-        if hasattr(self, 'sct'):
-            self.sct.close()
+        if getattr(self, '_capture_thread', None) is not None:
+            self.stop_continuous_capture()
+        for sct in getattr(self, '_handles', ()):
+            try:
+                sct.close()
+            except Exception:
+                pass
 
 
 if __name__ == "__main__":
@@ -0,0 +1,176 @@
+"""
+Background screenshot persistence
+Bounded write queue served by worker threads, so disk I/O stays off the
+see-think-act critical path
+"""
+import threading
+import logging
+from collections import deque
+from pathlib import Path
+from typing import Callable, Optional, Union
+
+
+OVERFLOW_POLICIES = ('drop', 'block', 'thumbnail')
+
+
+class ScreenshotWriter:
+    """Writes screenshots to disk on background threads"""
+    
+    def __init__(self,
+                 workers: int = 1,
+                 max_queue: int = 8,
+                 overflow: str = 'thumbnail'):
+        """
+        Initialize the writer
+        
+        Args:
+            workers: Number of writer threads
+            max_queue: Maximum full-size screenshots waiting to be written
+            overflow: What to do when the queue is full:
+                'drop' - discard the screenshot
+                'block' - wait for a free slot
+                'thumbnail' - write only a small thumbnail (if one was given),
+                    using a separate queue of the same size
+        """
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy: {overflow} (choose from {', '.join(OVERFLOW_POLICIES)})")
+        
+        self.workers = workers
+        self.max_queue = max_queue
+        self.overflow = overflow
+        self.logger = logging.getLogger(__name__)
+        
+        self._jobs = deque()
+        self._cond = threading.Condition()
+        self._pending_full = 0
+        self._pending_thumbnails = 0
+        self._in_flight = 0
+        self._threads = []
+        self._closed = False
+        
+        # Statistics
+        self.written = 0
+        self.thumbnails = 0
+        self.dropped = 0
+        self.errors = 0
+    
+    def _start_workers(self) -> None:
+        while len(self._threads) < self.workers:
+            thread = threading.Thread(
+                target=self._worker,
+                name=f"ScreenshotWriter-{len(self._threads)}",
+                daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+    
+    def submit(self,
+               path: Union[str, Path],
+               data: Union[bytes, Callable[[], bytes]],
+               thumbnail: Optional[Callable[[], bytes]] = None,
+               thumbnail_path: Optional[Union[str, Path]] = None) -> bool:
+        """
+        Queue a screenshot for writing
+        
+        Args:
+            path: Destination file
+            data: Encoded bytes, or a callable producing them on the worker thread
+            thumbnail: Callable producing small encoded bytes, used by the
+                'thumbnail' overflow policy
+            thumbnail_path: Destination for the thumbnail (default: path with a
+                '_thumb' suffix)
+        
+        Returns:
+            True if the full screenshot was queued, False if it was dropped or
+            downgraded to a thumbnail
+        """
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("ScreenshotWriter is closed")
+            self._start_workers()
+            
+            if self._pending_full >= self.max_queue and self.overflow == 'block':
+                self._cond.wait_for(lambda: self._pending_full < self.max_queue)
+            
+            if self._pending_full < self.max_queue:
+                self._jobs.append((Path(path), data, False))
+                self._pending_full += 1
+                self._cond.notify_all()
+                return True
+            
+            if (self.overflow == 'thumbnail' and thumbnail is not None
+                    and self._pending_thumbnails < self.max_queue):
+                if thumbnail_path is None:
+                    path = Path(path)
+                    thumbnail_path = path.with_name(f"{path.stem}_thumb{path.suffix}")
+                self._jobs.append((Path(thumbnail_path), thumbnail, True))
+                self._pending_thumbnails += 1
+                self._cond.notify_all()
+                return False
+            
+            self.dropped += 1
+            self.logger.debug(f"Screenshot queue full, dropped {path}")
+            return False
+    
+    def _worker(self) -> None:
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._jobs or self._closed)
+                if not self._jobs:
+                    return
+                path, data, is_thumbnail = self._jobs.popleft()
+                self._in_flight += 1
+            
+            try:
+                payload = data() if callable(data) else data
+                path.write_bytes(payload)
+                self.logger.debug(f"Screenshot saved: {path}")
+                ok = True
+            except Exception as e:
+                self.logger.error(f"Error saving screenshot {path}: {e}")
+                ok = False
+            
+            with self._cond:
+                self._in_flight -= 1
+                if is_thumbnail:
+                    self._pending_thumbnails -= 1
+                    self.thumbnails += ok
+                else:
+                    self._pending_full -= 1
+                    self.written += ok
+                self.errors += not ok
+                self._cond.notify_all()
+    
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait until every queued screenshot has been written
+        
+        Args:
+            timeout: Maximum time to wait (seconds)
+        
+        Returns:
+            True if the queue drained in time
+        """
+        with self._cond:
+            return self._cond.wait_for(lambda: not self._jobs and self._in_flight == 0, timeout)
+    
+    def close(self, timeout: Optional[float] = None) -> None:
+        """
+        Flush pending writes and stop the worker threads
+        
+        Args:
+            timeout: Maximum time to wait for the flush
+        """
+        self.flush(timeout)
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+    
+    @property
+    def pending(self) -> int:
+        """Screenshots waiting to be written (full size and thumbnails)"""
+        with self._cond:
+            return len(self._jobs) + self._in_flight
@@ -0,0 +1,354 @@
+"""
+Delta-compressed session recording
+Stores periodic keyframes plus tile-level diffs in a single container file,
+with an index mapping iteration -> frame offset and a reader that rebuilds
+any frame on demand
+"""
+import json
+import queue
+import struct
+import threading
+import logging
+import zlib
+import numpy as np
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+from PIL import Image
+
+from utils.screenshot_capture import Frame
+from utils.change_detector import ChangeDetector
+
+
+FILE_MAGIC = b'STAREC\x00\x01'
+RECORD_MAGIC = b'FRM0'
+INDEX_MAGIC = b'STAINDEX'
+
+KEYFRAME = 0
+DELTA = 1
+
+# magic, kind, seq, iteration, timestamp, width, height, tile_size, payload length
+_RECORD = struct.Struct('<4sBIIdIIHI')
+# index offset, magic
+_FOOTER = struct.Struct('<Q8s')
+
+
+def _pad_to_tiles(rgb: np.ndarray, tile_size: int) -> np.ndarray:
+    """Pad an (h, w, 3) array so both sides are multiples of tile_size"""
+    height, width = rgb.shape[:2]
+    pad_y = -height % tile_size
+    pad_x = -width % tile_size
+    if pad_y or pad_x:
+        rgb = np.pad(rgb, ((0, pad_y), (0, pad_x), (0, 0)))
+    return rgb
+
+
+def _tiles_view(rgb: np.ndarray, tile_size: int) -> np.ndarray:
+    """(tiles_y, tiles_x, tile, tile, 3) view of a padded array"""
+    height, width = rgb.shape[:2]
+    return rgb.reshape(height // tile_size, tile_size, width // tile_size, tile_size, 3).swapaxes(1, 2)
+
+
+class SessionRecorder:
+    """
+    Records frames into a delta-compressed container
+    
+    Layout: file header, then one record per frame (fixed header + zlib
+    payload), then a JSON index and a footer pointing at it. Keyframes hold
+    the full RGB frame; delta records hold only the tiles that changed since
+    the previous frame. If the index is missing (e.g. the process died), the
+    reader rebuilds it by scanning the records.
+    """
+    
+    def __init__(self,
+                 path: Union[str, Path],
+                 keyframe_interval: int = 10,
+                 tile_size: int = 32,
+                 compress_level: int = 1,
+                 max_queue: int = 8):
+        """
+        Open a recording for writing
+        
+        Args:
+            path: Container file to create
+            keyframe_interval: Write a full keyframe every N frames
+            tile_size: Tile edge length for diffs
+            compress_level: zlib level for record payloads
+            max_queue: Frames waiting for the background encoder before record() blocks
+        """
+        self.path = Path(path)
+        self.keyframe_interval = keyframe_interval
+        self.tile_size = tile_size
+        self.compress_level = compress_level
+        self.logger = logging.getLogger(__name__)
+        
+        self._file = open(self.path, 'wb')
+        self._file.write(FILE_MAGIC)
+        self._detector = ChangeDetector(tile_size=tile_size)
+        self._previous_signature = None
+        self._frames_since_keyframe = 0
+        self._seq = 0
+        self.index: List[Dict[str, Any]] = []
+        self.bytes_written = len(FILE_MAGIC)
+        
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._thread = threading.Thread(target=self._worker, name="SessionRecorder", daemon=True)
+        self._thread.start()
+        self._closed = False
+    
+    def record(self, frame: Frame, iteration: int) -> None:
+        """
+        Queue a frame for recording (encoded on a background thread)
+        
+        Args:
+            frame: Captured frame
+            iteration: Agent iteration the frame belongs to
+        """
+        if self._closed:
+            raise RuntimeError("SessionRecorder is closed")
+        self._queue.put((frame, iteration))
+    
+    def _worker(self) -> None:
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    return
+                self.write_frame(*item)
+            except Exception as e:
+                self.logger.error(f"Error recording frame: {e}")
+            finally:
+                self._queue.task_done()
+    
+    def write_frame(self, frame: Frame, iteration: int) -> Dict[str, Any]:
+        """
+        Encode and append a frame synchronously
+        
+        Args:
+            frame: Captured frame
+            iteration: Agent iteration the frame belongs to
+        
+        Returns:
+            Index entry of the written record
+        """
+        result, signature = self._detector.compare(frame, self._previous_signature)
+        keyframe = (
+            self._previous_signature is None
+            or self._frames_since_keyframe + 1 >= self.keyframe_interval
+            or result.changed_fraction > 0.5
+        )
+        
+        rgb = _pad_to_tiles(frame.rgb_view, self.tile_size)
+        if keyframe:
+            kind = KEYFRAME
+            payload = np.ascontiguousarray(rgb).tobytes()
+            self._frames_since_keyframe = 0
+        else:
+            kind = DELTA
+            dirty = np.flatnonzero(result.dirty_mask).astype('<u4')
+            tiles = _tiles_view(rgb, self.tile_size)[result.dirty_mask]
+            payload = struct.pack('<I', len(dirty)) + dirty.tobytes() + np.ascontiguousarray(tiles).tobytes()
+            self._frames_since_keyframe += 1
+        self._previous_signature = signature
+        
+        compressed = zlib.compress(payload, self.compress_level)
+        offset = self._file.tell()
+        self._file.write(_RECORD.pack(
+            RECORD_MAGIC, kind, self._seq, iteration, frame.timestamp,
+            frame.width, frame.height, self.tile_size, len(compressed)
+        ))
+        self._file.write(compressed)
+        self.bytes_written += _RECORD.size + len(compressed)
+        
+        entry = {
+            'seq': self._seq,
+            'iteration': iteration,
+            'offset': offset,
+            'kind': kind,
+            'timestamp': frame.timestamp,
+        }
+        self.index.append(entry)
+        self._seq += 1
+        return entry
+    
+    def flush(self) -> None:
+        """Wait until every queued frame has been written"""
+        self._queue.join()
+        self._file.flush()
+    
+    def close(self) -> None:
+        """Flush pending frames, then write the index and footer"""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        self._thread.join()
+        
+        index_offset = self._file.tell()
+        self._file.write(json.dumps(self.index).encode('utf-8'))
+        self._file.write(_FOOTER.pack(index_offset, INDEX_MAGIC))
+        self._file.close()
+        self.logger.info(f"Session recorded: {self.path} ({len(self.index)} frames, {self.bytes_written} bytes)")
+    
+    def __enter__(self) -> 'SessionRecorder':
+        return self
+    
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+class SessionReader:
+    """Random access to frames of a recorded session"""
+    
+    def __init__(self, path: Union[str, Path]):
+        """
+        Open a recording
+        
+        Args:
+            path: Container file written by SessionRecorder
+        """
+        self.path = Path(path)
+        self._file = open(self.path, 'rb')
+        if self._file.read(len(FILE_MAGIC)) != FILE_MAGIC:
+            raise ValueError(f"Not a session recording: {self.path}")
+        self.index = self._read_index()
+        self._by_iteration = {entry['iteration']: entry for entry in self.index}
+        self._cache: Optional[Tuple[int, np.ndarray]] = None
+    
+    def _read_index(self) -> List[Dict[str, Any]]:
+        self._file.seek(0, 2)
+        size = self._file.tell()
+        if size >= len(FILE_MAGIC) + _FOOTER.size:
+            self._file.seek(size - _FOOTER.size)
+            index_offset, magic = _FOOTER.unpack(self._file.read(_FOOTER.size))
+            if magic == INDEX_MAGIC:
+                self._file.seek(index_offset)
+                return json.loads(self._file.read(size - _FOOTER.size - index_offset))
+        return self._scan_records(size)
+    
+    def _scan_records(self, size: int) -> List[Dict[str, Any]]:
+        """Rebuild the index from record headers (recording was not closed)"""
+        index = []
+        offset = len(FILE_MAGIC)
+        while offset + _RECORD.size <= size:
+            self._file.seek(offset)
+            header = _RECORD.unpack(self._file.read(_RECORD.size))
+            if header[0] != RECORD_MAGIC or offset + _RECORD.size + header[8] > size:
+                break
+            index.append({
+                'seq': header[2],
+                'iteration': header[3],
+                'offset': offset,
+                'kind': header[1],
+                'timestamp': header[4],
+            })
+            offset += _RECORD.size + header[8]
+        return index
+    
+    def _read_record(self, entry: Dict[str, Any]) -> Tuple[tuple, bytes]:
+        self._file.seek(entry['offset'])
+        header = _RECORD.unpack(self._file.read(_RECORD.size))
+        return header, zlib.decompress(self._file.read(header[8]))
+    
+    def _frame_array(self, position: int) -> np.ndarray:
+        """Reconstruct the padded RGB array of the frame at index position"""
+        start = position
+        while self.index[start]['kind'] != KEYFRAME:
+            start -= 1
+        if self._cache is not None and start <= self._cache[0] <= position:
+            start, rgb = self._cache[0] + 1, self._cache[1].copy()
+        else:
+            rgb = None
+        
+        for pos in range(start, position + 1):
+            header, payload = self._read_record(self.index[pos])
+            kind, width, height, tile_size = header[1], header[5], header[6], header[7]
+            padded_h = height + (-height % tile_size)
+            padded_w = width + (-width % tile_size)
+            if kind == KEYFRAME:
+                rgb = np.frombuffer(payload, dtype=np.uint8).reshape(padded_h, padded_w, 3).copy()
+                continue
+            count = struct.unpack_from('<I', payload)[0]
+            dirty = np.frombuffer(payload, dtype='<u4', count=count, offset=4)
+            tiles = np.frombuffer(payload, dtype=np.uint8, offset=4 + 4 * count)
+            tiles = tiles.reshape(count, tile_size, tile_size, 3)
+            view = _tiles_view(rgb, tile_size)
+            tiles_x = view.shape[1]
+            view[dirty // tiles_x, dirty % tiles_x] = tiles
+        
+        self._cache = (position, rgb)
+        return rgb
+    
+    def __len__(self) -> int:
+        return len(self.index)
+    
+    @property
+    def iterations(self) -> List[int]:
+        """Iterations that have a recorded frame"""
+        return sorted(self._by_iteration)
+    
+    def read(self, position: int) -> Image.Image:
+        """
+        Reconstruct a frame by its position in the recording
+        
+        Args:
+            position: 0-based frame number
+        
+        Returns:
+            PIL Image of the frame
+        """
+        entry = self.index[position]
+        self._file.seek(entry['offset'])
+        header = _RECORD.unpack(self._file.read(_RECORD.size))
+        width, height = header[5], header[6]
+        rgb = self._frame_array(position)
+        return Image.fromarray(np.ascontiguousarray(rgb[:height, :width]))
+    
+    def read_iteration(self, iteration: int) -> Image.Image:
+        """
+        Reconstruct the (last) frame recorded for an agent iteration
+        
+        Args:
+            iteration: Agent iteration number
+        
+        Returns:
+            PIL Image of the frame
+        """
+        entry = self._by_iteration.get(iteration)
+        if entry is None:
+            raise KeyError(f"No frame recorded for iteration {iteration}")
+        return self.read(self.index.index(entry))
+    
+    def frames(self) -> Iterator[Tuple[int, Image.Image]]:
+        """Yield (iteration, image) for every recorded frame, in order"""
+        for position, entry in enumerate(self.index):
+            yield entry['iteration'], self.read(position)
+    
+    def close(self) -> None:
+        """Close the underlying file"""
+        self._file.close()
+    
+    def __enter__(self) -> 'SessionReader':
+        return self
+    
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+if __name__ == "__main__":
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Inspect or export a recorded agent session.")
+    parser.add_argument("recording", type=str, help="Session file (.strec)")
+    parser.add_argument("--export", type=str, help="Directory to export frames as PNG")
+    args = parser.parse_args()
+    
+    with SessionReader(args.recording) as reader:
+        keyframes = sum(1 for entry in reader.index if entry['kind'] == KEYFRAME)
+        print(f"{args.recording}: {len(reader)} frames ({keyframes} keyframes), "
+              f"iterations {reader.iterations[:1]}..{reader.iterations[-1:]}")
+        if args.export:
+            out_dir = Path(args.export)
+            out_dir.mkdir(parents=True, exist_ok=True)
+            for position, (iteration, image) in enumerate(reader.frames()):
+                image.save(out_dir / f"frame_{position:04d}_iter_{iteration:03d}.png")
+            print(f"Exported to {out_dir}")
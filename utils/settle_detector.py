@@ -0,0 +1,105 @@
+"""
+"Wait until the UI settles" primitive
+Polls low-cost captures and returns as soon as the screen stops changing
+"""
+import time
+import numpy as np
+from typing import Optional
+
+from utils.screenshot_capture import ScreenshotCapture, Frame
+from utils.change_detector import ChangeDetector
+
+
+class SettleResult:
+    """Outcome of a settle wait"""
+    
+    __slots__ = ('settled', 'changed', 'elapsed', 'frame')
+    
+    def __init__(self, settled: bool, changed: bool, elapsed: float, frame: Frame):
+        """
+        Args:
+            settled: True if the screen was stable before the deadline
+            changed: True if the screen differed from the baseline at any point
+            elapsed: Seconds spent waiting
+            frame: Last captured frame (reusable as the next screenshot)
+        """
+        self.settled = settled
+        self.changed = changed
+        self.elapsed = elapsed
+        self.frame = frame
+    
+    def __repr__(self) -> str:
+        return (f"SettleResult(settled={self.settled}, changed={self.changed}, "
+                f"elapsed={self.elapsed:.3f}s)")
+
+
+class SettleDetector:
+    """Waits for the screen to be stable for a given time, bounded by a deadline"""
+    
+    def __init__(self,
+                 screenshot_capture: ScreenshotCapture,
+                 detector: Optional[ChangeDetector] = None,
+                 stable_time: float = 0.3,
+                 poll_interval: float = 0.05,
+                 monitor_number: int = 1):
+        """
+        Initialize settle detector
+        
+        Args:
+            screenshot_capture: Capture source used for polling
+            detector: Change detector used to diff frames (tile signatures)
+            stable_time: Seconds without change required to call the screen settled
+            poll_interval: Seconds between captures
+            monitor_number: Monitor to watch
+        """
+        self.screenshot_capture = screenshot_capture
+        self.detector = detector or ChangeDetector(tile_size=64)
+        self.stable_time = stable_time
+        self.poll_interval = poll_interval
+        self.monitor_number = monitor_number
+    
+    def _capture(self) -> Frame:
+        return self.screenshot_capture.capture_frame(self.monitor_number)
+    
+    def wait(self,
+             timeout: float,
+             require_change: bool = False,
+             baseline: Optional[np.ndarray] = None) -> SettleResult:
+        """
+        Block until the screen has been stable for stable_time, or timeout passes
+        
+        Args:
+            timeout: Upper bound on the wait (seconds)
+            require_change: Only consider the screen settled after it changed
+                from the baseline (useful for "wait for something to happen")
+            baseline: Tile signature to detect changes against; defaults to
+                the first polled frame
+        
+        Returns:
+            SettleResult with the last captured frame
+        """
+        start = time.monotonic()
+        deadline = start + max(0.0, timeout)
+        
+        frame = self._capture()
+        previous = self.detector.signature(frame)
+        changed = baseline is not None and (
+            baseline.shape != previous.shape or bool((baseline != previous).any())
+        )
+        stable_since = frame.timestamp
+        
+        while True:
+            now = time.monotonic()
+            if now - stable_since >= self.stable_time and (changed or not require_change):
+                return SettleResult(True, changed, now - start, frame)
+            if now >= deadline:
+                return SettleResult(False, changed, now - start, frame)
+            
+            time.sleep(min(self.poll_interval, max(0.0, deadline - now)))
+            
+            frame.release()
+            frame = self._capture()
+            result, previous = self.detector.compare(frame, previous)
+            if result.changed:
+                changed = True
+                stable_since = frame.timestamp
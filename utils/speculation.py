@@ -0,0 +1,166 @@
+"""
+Speculative next-step prediction
+While the agent executes action N, the model is already asked for action
+N+1 on the assumption that N succeeds. Once the UI has settled, a cheap
+comparison of the screen the prediction was made on with the actual screen
+decides whether the prediction is committed or thrown away.
+"""
+import time
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional
+
+from utils.action_parser import Action
+from utils.change_detector import ChangeResult
+
+
+# Actions that do not have to change the screen to have worked
+NO_VISIBLE_EFFECT = ('mouse_move', 'wait', 'answer')
+
+# Model coordinates are normalized to this range (see ComputerUse cfg)
+COORDINATE_SCALE = 1000
+
+
+class Speculation:
+    """One in-flight prediction"""
+    
+    __slots__ = ('actions', 'client', 'handle', 'cancel', 'started')
+    
+    def __init__(self, actions: List[Action], client: Any, handle: Any, cancel: Callable[[], Any]):
+        """
+        Args:
+            actions: Actions assumed to succeed (step N)
+            client: Model client the prediction was requested from
+            handle: Future or asyncio task resolving to (response, wall_time)
+            cancel: Called to abort the request when the prediction is dropped
+        """
+        self.actions = actions
+        self.client = client
+        self.handle = handle
+        self.cancel = cancel
+        self.started = time.perf_counter()
+
+
+class Speculator:
+    """
+    Bookkeeping and commit checks for speculative predictions
+    
+    A prediction is discarded when the actions it assumed had no visible
+    effect, when most of the screen changed (e.g. a new window opened, so
+    the prediction was made on a stale screen), or when it targets a
+    screen region that changed.
+    """
+    
+    def __init__(self, max_change: float = 0.35):
+        """
+        Args:
+            max_change: Largest fraction of screen tiles that may change for a
+                prediction to still apply
+        """
+        self.max_change = max_change
+        self.pending: Optional[Speculation] = None
+        self.reset()
+    
+    def reset(self) -> None:
+        """Drop the pending prediction and clear the statistics"""
+        if self.pending is not None:
+            self.pending.cancel()
+            self.pending = None
+        self.started = 0
+        self.committed = 0
+        self.discarded = Counter()
+        self.time_saved = 0.0
+        self.time_wasted = 0.0
+    
+    def begin(self, speculation: Speculation) -> None:
+        """Register a new prediction (replacing any pending one)"""
+        if self.pending is not None:
+            self.discard('superseded')
+        self.pending = speculation
+        self.started += 1
+    
+    def screen_check(self, change: Optional[ChangeResult]) -> Optional[str]:
+        """
+        Compare the screen the prediction assumed with the actual one
+        
+        Args:
+            change: Difference between the screen the prediction was made on
+                and the current screen
+        
+        Returns:
+            Reason to discard the prediction, or None
+        """
+        if change is None:
+            return 'no_comparison'
+        expects_change = any(action.kind not in NO_VISIBLE_EFFECT for action in self.pending.actions)
+        if expects_change and not change.changed:
+            return 'no_effect'
+        if change.changed_fraction > self.max_change:
+            return 'screen_changed'
+        return None
+    
+    def target_check(self, predicted: List[Action], change: ChangeResult) -> Optional[str]:
+        """
+        Check that the predicted actions do not target changed regions
+        
+        Args:
+            predicted: Actions of the prediction
+            change: Difference used in screen_check
+        
+        Returns:
+            Reason to discard the prediction, or None
+        """
+        if not predicted:
+            return 'no_action'
+        width, height = change.frame_size
+        tile = change.tile_size
+        for action in predicted:
+            coordinate = action.get('coordinate')
+            if not coordinate or len(coordinate) != 2:
+                continue
+            x = int(coordinate[0] * width / COORDINATE_SCALE)
+            y = int(coordinate[1] * height / COORDINATE_SCALE)
+            row = min(max(y // tile, 0), change.dirty_mask.shape[0] - 1)
+            col = min(max(x // tile, 0), change.dirty_mask.shape[1] - 1)
+            if change.dirty_mask[row, col]:
+                return 'target_changed'
+        return None
+    
+    def commit(self, wall_time: float, needed_at: float) -> Speculation:
+        """
+        Accept the pending prediction
+        
+        Args:
+            wall_time: Duration of the speculative model call
+            needed_at: time.perf_counter() when the agent started waiting
+                for the prediction
+        
+        Returns:
+            The committed speculation
+        """
+        speculation, self.pending = self.pending, None
+        self.committed += 1
+        # The part of the call that overlapped action execution and settling
+        self.time_saved += max(0.0, min(wall_time, needed_at - speculation.started))
+        return speculation
+    
+    def discard(self, reason: str) -> None:
+        """Drop the pending prediction and abort its request"""
+        if self.pending is None:
+            return
+        speculation, self.pending = self.pending, None
+        speculation.cancel()
+        self.discarded[reason] += 1
+        self.time_wasted += time.perf_counter() - speculation.started
+    
+    def stats(self) -> Dict[str, Any]:
+        """Committed vs discarded predictions and the time they saved or cost"""
+        resolved = self.committed + sum(self.discarded.values())
+        return {
+            'started': self.started,
+            'committed': self.committed,
+            'discarded': sum(self.discarded.values()),
+            'discard_reasons': dict(self.discarded),
+            'commit_ratio': self.committed / resolved if resolved else 0.0,
+            'time_saved': self.time_saved,
+            'time_wasted': self.time_wasted,
+        }
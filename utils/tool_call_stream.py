@@ -0,0 +1,131 @@
+"""
+Incremental tool-call detection for streamed chat responses
+Lets the client stop generation as soon as the model has emitted its tool
+calls, instead of waiting for any trailing text
+"""
+from typing import Any, Dict, List
+
+from utils.action_parser import loads_lenient
+
+
+class ToolCallStreamParser:
+    """
+    Accumulates streamed chat chunks and reports when the tool calls are complete
+    
+    Recognizes both structured calls (message.tool_calls, as parsed by Ollama)
+    and Qwen-style <tool_call>{...}</tool_call> blocks in the text content.
+    The calls count as complete once max_calls have arrived, or once the
+    model moves on to text that is not another tool call.
+    """
+    
+    OPEN_TAG = '<tool_call>'
+    CLOSE_TAG = '</tool_call>'
+    
+    def __init__(self, max_calls: int = 1):
+        """
+        Args:
+            max_calls: Stop after this many complete calls
+        """
+        self.max_calls = max_calls
+        self.content = ''
+        self.tool_calls: List[Any] = []
+        self.text_tool_calls: List[Dict[str, Any]] = []
+        self.chunks = 0
+        self.last_chunk = None
+        self._search_from = 0
+        self._calls_end = 0
+        self._trailing = False
+    
+    @property
+    def calls(self) -> int:
+        """Number of complete tool calls received"""
+        return len(self.tool_calls) + len(self.text_tool_calls)
+    
+    @property
+    def complete(self) -> bool:
+        """True once no further tool calls are expected"""
+        return self.calls >= self.max_calls or (self.calls > 0 and self._trailing)
+    
+    def feed(self, chunk) -> bool:
+        """
+        Add one streamed chunk
+        
+        Args:
+            chunk: Streamed ChatResponse (or dict with the same layout)
+        
+        Returns:
+            True if the tool calls are complete
+        """
+        self.chunks += 1
+        self.last_chunk = chunk
+        message = chunk.get('message') or {}
+        
+        tool_calls = message.get('tool_calls')
+        if tool_calls:
+            self.tool_calls.extend(tool_calls)
+        
+        text = message.get('content')
+        if text:
+            self.content += text
+            self._scan_text()
+            if self.tool_calls and not tool_calls and text.strip():
+                self._trailing = True
+        
+        return self.complete
+    
+    def _scan_text(self) -> None:
+        """Collect complete <tool_call> blocks from the text received so far"""
+        while True:
+            start = self.content.find(self.OPEN_TAG, self._search_from)
+            if start < 0:
+                # A tag may be split across chunks; rescan its possible prefix next time
+                self._search_from = max(self._search_from, len(self.content) - len(self.OPEN_TAG) + 1)
+                break
+            end = self.content.find(self.CLOSE_TAG, start + len(self.OPEN_TAG))
+            if end < 0:
+                self._search_from = start
+                break
+            body = self.content[start + len(self.OPEN_TAG):end].strip()
+            self._search_from = self._calls_end = end + len(self.CLOSE_TAG)
+            try:
+                self.text_tool_calls.append(loads_lenient(body))
+            except ValueError:
+                # Malformed block; keep scanning for the next one
+                continue
+        
+        # Anything after the last call other than (the start of) another call
+        if self.text_tool_calls:
+            tail = self.content[self._calls_end:].lstrip()
+            if tail and not (tail.startswith(self.OPEN_TAG) or self.OPEN_TAG.startswith(tail)):
+                self._trailing = True
+    
+    def response(self) -> Dict[str, Any]:
+        """
+        Assemble a non-streaming style response from the chunks received
+        
+        Returns:
+            Response dictionary ('message' with content and tool_calls) plus
+            'stopped_early' when generation was cut off after the tool calls
+            and the number of chunks received ('stream_chunks')
+        """
+        last = self.last_chunk or {}
+        done = bool(last.get('done'))
+        response = {
+            'model': last.get('model'),
+            'created_at': last.get('created_at'),
+            'message': {
+                'role': 'assistant',
+                'content': self.content,
+                'tool_calls': self.tool_calls,
+            },
+            'done': done,
+            'done_reason': last.get('done_reason') if done else 'tool_call',
+            'stopped_early': not done,
+            'stream_chunks': self.chunks,
+        }
+        if done:
+            # Final chunk carries timing and token counts
+            for key in ('total_duration', 'load_duration', 'prompt_eval_count',
+                        'prompt_eval_duration', 'eval_count', 'eval_duration'):
+                response[key] = last.get(key)
+        return response
@@ -0,0 +1,220 @@
+"""
+Recorded trajectories for model-free replay
+A successful run is stored as the actions it executed plus a perceptual hash
+of the screen before each step, keyed by task. Later runs of the same task
+replay the actions directly while the screens still match, and hand over to
+the model at the first divergence.
+"""
+import json
+import time
+import sqlite3
+import threading
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Union
+
+from utils.response_cache import perceptual_hash
+
+
+class TrajectoryStep:
+    """Screen hash before a step and the actions the step executed"""
+    
+    __slots__ = ('screen', 'actions')
+    
+    def __init__(self, screen: int, actions: List[Dict[str, Any]]):
+        """
+        Args:
+            screen: Perceptual hash of the screen the step started from
+            actions: computer_use arguments of the executed actions, in order
+        """
+        self.screen = screen
+        self.actions = actions
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {'screen': format(self.screen, 'x'), 'actions': self.actions}
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'TrajectoryStep':
+        return cls(int(data['screen'], 16), data['actions'])
+    
+    def __repr__(self) -> str:
+        return f"TrajectoryStep({self.screen:x}, {self.actions!r})"
+
+
+class TrajectoryStore:
+    """
+    Successful trajectories keyed by task: in memory, optionally in a sqlite file
+    
+    Like the response cache, the sqlite file can be shared by several
+    processes (WAL mode).
+    """
+    
+    def __init__(self, db_path: Optional[Union[str, Path]] = None, hash_size: int = 16):
+        """
+        Args:
+            db_path: sqlite file (None = in-memory only)
+            hash_size: Perceptual hash grid size of the step screens
+        """
+        self.hash_size = hash_size
+        self._trajectories: Dict[str, List[TrajectoryStep]] = {}
+        self._lock = threading.Lock()
+        
+        self._db = None
+        if db_path is not None:
+            self._db = sqlite3.connect(str(db_path), timeout=5.0, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS trajectories ("
+                "task TEXT PRIMARY KEY, created REAL NOT NULL, steps TEXT NOT NULL)"
+            )
+            self._db.commit()
+        
+        self.stores = 0
+    
+    @staticmethod
+    def key(task: str) -> str:
+        """Store key of a task (whitespace-normalized text)"""
+        return " ".join(task.split())
+    
+    def screen_hash(self, image) -> int:
+        """Perceptual hash of a screen (memoized on Frames)"""
+        return perceptual_hash(image, self.hash_size)
+    
+    def get(self, task: str) -> Optional[List[TrajectoryStep]]:
+        """
+        Look up the trajectory recorded for a task
+        
+        Args:
+            task: Task text
+        
+        Returns:
+            Steps in order, or None if the task has no trajectory
+        """
+        key = self.key(task)
+        with self._lock:
+            steps = self._trajectories.get(key)
+            if steps is None and self._db is not None:
+                row = self._db.execute("SELECT steps FROM trajectories WHERE task = ?", (key,)).fetchone()
+                if row is not None:
+                    steps = [TrajectoryStep.from_dict(step) for step in json.loads(row[0])]
+                    self._trajectories[key] = steps
+            return list(steps) if steps is not None else None
+    
+    def put(self, task: str, steps: List[TrajectoryStep]) -> None:
+        """
+        Record the trajectory of a successful run (replacing an older one)
+        
+        Args:
+            task: Task text
+            steps: Steps in order
+        """
+        key = self.key(task)
+        with self._lock:
+            self._trajectories[key] = list(steps)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO trajectories (task, created, steps) VALUES (?, ?, ?)",
+                    (key, time.time(), json.dumps([step.to_dict() for step in steps]))
+                )
+                self._db.commit()
+            self.stores += 1
+    
+    def remove(self, task: str) -> None:
+        """Forget the trajectory of a task"""
+        key = self.key(task)
+        with self._lock:
+            self._trajectories.pop(key, None)
+            if self._db is not None:
+                self._db.execute("DELETE FROM trajectories WHERE task = ?", (key,))
+                self._db.commit()
+    
+    def close(self) -> None:
+        """Close the sqlite file"""
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+
+class TrajectoryReplayer:
+    """
+    Steps through a recorded trajectory for one run
+    
+    Each step is replayed when the current screen hash is within
+    max_distance bits of the recorded one. On a mismatch the agent may wait
+    for the screen to change up to max_waits times per step (the UI can be
+    slower than during recording) before the replay counts as diverged.
+    """
+    
+    REPLAY = 'replay'
+    WAIT = 'wait'
+    DIVERGED = 'diverged'
+    
+    def __init__(self, max_distance: int = 8, max_waits: int = 2):
+        """
+        Args:
+            max_distance: Hash bits that may differ for a screen to match
+            max_waits: Settle waits per step before a mismatch is a divergence
+        """
+        self.max_distance = max_distance
+        self.max_waits = max_waits
+        self.reset()
+    
+    def reset(self, steps: Optional[List[TrajectoryStep]] = None) -> None:
+        """Start a run, replaying steps if given"""
+        self.steps = steps
+        self.length = len(steps) if steps else 0
+        self.position = 0
+        self.waits = 0
+        self.total_waits = 0
+        self.replayed = 0
+        self.divergence = None
+        self.diverged_at = None
+        self.distances = Counter()
+    
+    @property
+    def active(self) -> bool:
+        return self.steps is not None and self.position < len(self.steps)
+    
+    def next(self, screen: int):
+        """
+        Decide what to do with the next recorded step
+        
+        Args:
+            screen: Perceptual hash of the current screen
+        
+        Returns:
+            Tuple of (REPLAY, step), (WAIT, None) or (DIVERGED, None)
+        """
+        step = self.steps[self.position]
+        distance = bin(step.screen ^ screen).count('1')
+        if distance <= self.max_distance:
+            self.distances[distance] += 1
+            self.position += 1
+            self.replayed += 1
+            self.waits = 0
+            return self.REPLAY, step
+        if self.waits < self.max_waits:
+            self.waits += 1
+            self.total_waits += 1
+            return self.WAIT, None
+        self.diverge('screen_mismatch')
+        return self.DIVERGED, None
+    
+    def diverge(self, reason: str) -> None:
+        """Stop replaying; the model takes over from the current screen"""
+        if self.active:
+            self.divergence = reason
+            self.diverged_at = self.position
+        self.steps = None
+    
+    def stats(self) -> Dict[str, Any]:
+        """Replayed steps, waits and where (and why) the replay diverged"""
+        return {
+            'trajectory_steps': self.length,
+            'replayed_steps': self.replayed,
+            'waits': self.total_waits,
+            'divergence': self.divergence,
+            'diverged_at': self.diverged_at,
+            'match_distances': dict(self.distances),
+        }